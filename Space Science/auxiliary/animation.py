@@ -0,0 +1,457 @@
+# Standard libraries
+import collections
+import concurrent.futures
+import os
+import pathlib
+import typing as t
+
+# Installed libraries
+import numpy as np
+
+# Animations of parameter sweeps (e.g., the Tisserand parameter space of tutorial 020 for a range
+# of semi-major axes). The notebooks plotted one frame after another into temp/*.png, globbed the
+# files back and read every file again (once per occurrence) into a list of images before the GIF
+# was written. Here, every distinct frame is rendered once, by worker processes, directly into an
+# RGB array. The frames are passed to the encoder as soon as they arrive and written in the order
+# of a timeline of frame indices: holds and reversals refer to already rendered frames instead of
+# copies, and only frames that the timeline still needs are kept in memory (for GIFs as palette
+# images with one byte per pixel). GIFs are written frame by frame with Pillow; other formats
+# (e.g., MP4) are streamed with imageio.
+
+# Type of the functions that render a frame: parameter value -> RGB image of shape (H, W, 3)
+RenderFunc = t.Callable[[t.Any], np.ndarray]
+
+# The render function of a worker process, set by the pool initializer
+_WORKER: t.Dict[str, t.Any] = {}
+
+
+def figure_to_rgb(fig: t.Any) -> np.ndarray:
+    """
+    Draw a matplotlib figure (Agg canvas) and return its pixels.
+
+    Parameters
+    ----------
+    fig : matplotlib.figure.Figure
+        Figure with an Agg canvas (e.g., created with pyplot and the Agg backend, or attached to
+        matplotlib.backends.backend_agg.FigureCanvasAgg).
+
+    Returns
+    -------
+    rgb : numpy.ndarray
+        Image of shape (height, width, 3), uint8.
+    """
+    fig.canvas.draw()
+    return np.asarray(fig.canvas.buffer_rgba())[..., :3].copy()
+
+
+def back_and_forth(n_frames: int, hold: int = 0) -> np.ndarray:
+    """
+    Timeline that runs through the frames, holds the last one, runs back and holds the first one.
+
+    Parameters
+    ----------
+    n_frames : int
+        Number of distinct frames.
+    hold : int, optional
+        Number of additional repetitions of the last and of the first frame. The default is 0.
+
+    Returns
+    -------
+    timeline : numpy.ndarray
+        Frame indices, 2 * (n_frames + hold) entries.
+    """
+    forward = np.arange(n_frames)
+    return np.concatenate([forward, np.full(hold, n_frames - 1), forward[::-1], np.full(hold, 0)])
+
+
+def _init_worker(render: RenderFunc) -> None:
+    _WORKER["render"] = render
+
+
+def _render_frame(param: t.Any) -> np.ndarray:
+    return np.ascontiguousarray(_WORKER["render"](param), dtype=np.uint8)
+
+
+def render_sweep(
+    render: RenderFunc,
+    params: t.Iterable[t.Any],
+    max_workers: t.Optional[int] = None,
+    max_pending: t.Optional[int] = None,
+) -> t.Iterator[np.ndarray]:
+    """
+    Render a frame for every parameter value in worker processes.
+
+    The render function is passed to every worker once; only the parameter values and the frames
+    are sent between the processes. At most max_pending frames are rendered ahead of the consumer,
+    so the frames can be encoded while the workers are still rendering.
+
+    Parameters
+    ----------
+    render : callable
+        Function (or callable object) that returns the RGB image (H, W, 3) of a parameter value.
+        It must be importable from a module (or pickle-able) if the processes are not forked.
+    params : iterable
+        Parameter values of the frames (e.g., the semi-major axes).
+    max_workers : int, optional
+        Number of worker processes. The default is the number of CPUs.
+    max_pending : int, optional
+        Number of frames that are rendered ahead. The default is twice the number of workers.
+
+    Yields
+    ------
+    rgb : numpy.ndarray
+        Frames (uint8) in the order of params.
+    """
+    max_workers = max_workers or os.cpu_count() or 1
+    max_pending = max_pending or 2 * max_workers
+    params = iter(params)
+
+    with concurrent.futures.ProcessPoolExecutor(
+        max_workers=max_workers, initializer=_init_worker, initargs=(render,)
+    ) as executor:
+        pending = collections.deque(executor.submit(_render_frame, param)
+                                    for _, param in zip(range(max_pending), params))
+        while pending:
+            frame = pending.popleft().result()
+            for param in params:
+                pending.append(executor.submit(_render_frame, param))
+                break
+            yield frame
+
+
+class GifWriter:
+    """
+    Write an animated GIF frame by frame.
+
+    Pillow's GIF encoder (and imageio's, which uses it) keeps all frames until the file is closed.
+    This writer encodes and writes every frame immediately, each with its own palette. Like Pillow,
+    only the rectangle that differs from the previous frame is stored, with unchanged pixels set to
+    a transparent palette entry (which compresses well). Only the current and the previous frame
+    are held in memory.
+
+    Parameters
+    ----------
+    path : str or pathlib.Path
+        Output file.
+    loop : int, optional
+        Number of loops; 0 (the default) repeats forever.
+    colors : int, optional
+        Palette size of the frames including the transparent entry (at most 256, the default).
+    """
+
+    def __init__(self, path: t.Union[str, pathlib.Path], loop: int = 0, colors: int = 256) -> None:
+        from PIL import GifImagePlugin, Image
+
+        self._gif = GifImagePlugin
+        self._image = Image
+        self.colors = colors
+        self.loop = loop
+        self.n_frames = 0
+        self._previous: t.Optional[np.ndarray] = None
+        self._file = open(path, "wb")
+
+    def prepare(self, frame: np.ndarray) -> t.Any:
+        """Quantise an RGB frame to a palette image; the result can be appended several times."""
+        # The octree quantiser maps unchanged regions of successive frames to the same colours (so
+        # the changed rectangles stay small) and is faster than the default median cut
+        # The last palette entry is kept free for transparency
+        return self._image.fromarray(np.asarray(frame, dtype=np.uint8)).quantize(
+            self.colors - 1, method=self._image.Quantize.FASTOCTREE)
+
+    def append(self, frame: t.Any, duration: float) -> None:
+        """
+        Append a frame.
+
+        Parameters
+        ----------
+        frame : numpy.ndarray or PIL.Image.Image
+            RGB frame or a frame returned by prepare.
+        duration : float
+            Display time in seconds (GIFs store multiples of 10 ms).
+        """
+        if isinstance(frame, np.ndarray):
+            frame = self.prepare(frame)
+        rgb = np.asarray(frame.convert("RGB"))
+        params = {"duration": round(duration * 1000.0), "disposal": 1, "include_color_table": True}
+
+        if self.n_frames == 0:
+            header, _ = self._gif.getheader(frame, None, {"loop": self.loop})
+            self._file.writelines(header)
+            offset = (0, 0)
+        else:
+            # Bounding box of the changed pixels (a single pixel if nothing changed); the previous
+            # frame stays visible around it (disposal 1) and through its transparent pixels
+            changed = np.any(rgb != self._previous, axis=2)
+            rows, cols = np.flatnonzero(changed.any(axis=1)), np.flatnonzero(changed.any(axis=0))
+            if len(rows) == 0:
+                rows, cols = np.zeros(1, dtype=np.int64), np.zeros(1, dtype=np.int64)
+            top, bottom, left, right = int(rows[0]), int(rows[-1]) + 1, int(cols[0]), int(cols[-1]) + 1
+
+            indices = np.array(frame.crop((left, top, right, bottom)))
+            indices[~changed[top:bottom, left:right]] = self.colors - 1
+            palette = frame.getpalette()
+            frame = self._image.fromarray(indices, mode="P")
+            frame.putpalette(palette + [0] * (3 * self.colors - len(palette)))
+            params["transparency"] = self.colors - 1
+            offset = (left, top)
+
+        self._file.writelines(self._gif.getdata(frame, offset, **params))
+        self._previous = rgb
+        self.n_frames += 1
+
+    def close(self) -> None:
+        """Write the trailer and close the file."""
+        if not self._file.closed:
+            self._file.write(b";")
+            self._file.close()
+
+    def __enter__(self) -> "GifWriter":
+        return self
+
+    def __exit__(self, *exc_info: t.Any) -> None:
+        self.close()
+
+
+def write_animation(
+    path: t.Union[str, pathlib.Path],
+    frames: t.Iterable[np.ndarray],
+    timeline: t.Optional[t.Sequence[int]] = None,
+    duration: float = 0.04,
+    loop: int = 0,
+    **writer_kwargs: t.Any,
+) -> pathlib.Path:
+    """
+    Stream frames into a GIF or video file, following a timeline of frame indices.
+
+    Frames are consumed from the iterable only when the timeline needs them and are kept only as
+    long as the timeline refers to them again. For GIFs, repetitions of a frame are merged into a
+    single frame that is displayed longer; for videos, the frame is written again.
+
+    Parameters
+    ----------
+    path : str or pathlib.Path
+        Output file; the format follows the suffix (.gif or anything that imageio / ffmpeg writes,
+        e.g., .mp4).
+    frames : iterable of numpy.ndarray
+        Distinct RGB frames (e.g., from render_sweep).
+    timeline : sequence of int, optional
+        Indices into frames in display order (e.g., from back_and_forth). The default shows every
+        frame once.
+    duration : float, optional
+        Display time per timeline entry in seconds. The default is 0.04.
+    loop : int, optional
+        Number of loops of a GIF; 0 (the default) repeats forever.
+    **writer_kwargs
+        Further arguments of imageio.get_writer (videos only; e.g., quality or codec).
+
+    Returns
+    -------
+    path : pathlib.Path
+        Output file.
+    """
+    path = pathlib.Path(path)
+    if path.suffix.lower() == ".gif":
+        with GifWriter(path, loop=loop) as writer:
+            # Consecutive repetitions of a frame become one frame with a longer display time
+            for frame, repeats in _timeline_frames(frames, timeline, writer.prepare, merge=True):
+                writer.append(frame, repeats * duration)
+    else:
+        import imageio
+
+        with imageio.get_writer(path, fps=1.0 / duration, **writer_kwargs) as writer:
+            for frame, _ in _timeline_frames(frames, timeline, np.asarray, merge=False):
+                writer.append_data(frame)
+    return path
+
+
+def _timeline_frames(
+    frames: t.Iterable[np.ndarray],
+    timeline: t.Optional[t.Sequence[int]],
+    prepare: t.Callable[[np.ndarray], t.Any],
+    merge: bool,
+) -> t.Iterator[t.Tuple[t.Any, int]]:
+    """Yield (prepared frame, repetitions) in timeline order; see write_animation."""
+    if timeline is None:
+        for frame in frames:
+            yield prepare(frame), 1
+        return
+
+    timeline = np.asarray(timeline, dtype=np.int64)
+    if merge:
+        starts = np.flatnonzero(np.r_[True, timeline[1:] != timeline[:-1]])
+        runs = zip(starts, np.diff(np.r_[starts, len(timeline)]))
+    else:
+        runs = ((position, 1) for position in range(len(timeline)))
+
+    # Position of the last use of every frame; afterwards the frame is dropped
+    last_use = {int(index): position for position, index in enumerate(timeline)}
+
+    frames = iter(frames)
+    cache: t.Dict[int, t.Any] = {}
+    n_consumed = 0
+    for position, repeats in runs:
+        index = int(timeline[position])
+
+        # Consume frames up to the requested one; keep those that the timeline uses
+        while index not in cache:
+            frame = next(frames, None)
+            if frame is None:
+                raise IndexError(f"Timeline refers to frame {index}, but only {n_consumed} frames were given")
+            if n_consumed in last_use:
+                cache[n_consumed] = prepare(frame)
+            n_consumed += 1
+
+        yield cache[index], int(repeats)
+        if last_use[index] < position + repeats:
+            del cache[index]
+
+
+def build_animation(
+    path: t.Union[str, pathlib.Path],
+    render: RenderFunc,
+    params: t.Sequence[t.Any],
+    timeline: t.Optional[t.Sequence[int]] = None,
+    duration: float = 0.04,
+    max_workers: t.Optional[int] = None,
+    **kwargs: t.Any,
+) -> pathlib.Path:
+    """
+    Render a parameter sweep in parallel and stream it into an animation.
+
+    Parameters
+    ----------
+    path : str or pathlib.Path
+        Output file (.gif, .mp4, ...).
+    render : callable
+        Frame renderer, see render_sweep.
+    params : sequence
+        Parameter values of the distinct frames.
+    timeline : sequence of int, optional
+        Display order of the frames (indices into params), e.g., back_and_forth(len(params), 25).
+        The default shows every frame once.
+    duration : float, optional
+        Display time per timeline entry in seconds. The default is 0.04.
+    max_workers : int, optional
+        Number of worker processes. The default is the number of CPUs.
+    **kwargs
+        Further arguments of write_animation.
+
+    Returns
+    -------
+    path : pathlib.Path
+        Output file.
+    """
+    return write_animation(path, render_sweep(render, params, max_workers), timeline, duration, **kwargs)
+
+
+class ContourFrames:
+    """
+    Frame renderer for filled contour plots over a fixed grid (one figure per worker process).
+
+    The figure, axes, labels and colour bar are created once; per frame only the contour set and
+    the title are replaced. The parameter of a frame is a tuple (value, z) of the swept value
+    (shown in the title) and the data on the grid. Being a plain class with array attributes, the
+    renderer can be sent to worker processes regardless of the start method.
+
+    Parameters
+    ----------
+    x, y : numpy.ndarray
+        Grid (e.g., from numpy.meshgrid).
+    levels : numpy.ndarray
+        Contour levels; they also fix the colour scale of all frames.
+    title : str, optional
+        Title format, filled with the swept value (e.g., 'a = {:.2f} AU').
+    xlabel, ylabel, colorbar_label : str, optional
+        Axis and colour bar labels.
+    xlim, ylim : tuple of float, optional
+        Axis limits.
+    cmap : str, optional
+        Colormap name. The default is 'viridis'.
+    extend : str, optional
+        contourf's extend argument. The default is 'neither'.
+    figsize : tuple of float, optional
+        Figure size in inches. The default is (12, 8).
+    dpi : int, optional
+        Resolution. The default is 100.
+    style : str, optional
+        Matplotlib style (e.g., 'dark_background'). The default is 'default'.
+    rc : dict, optional
+        Further rcParams (e.g., {'font.size': 14}).
+    """
+
+    def __init__(
+        self,
+        x: np.ndarray,
+        y: np.ndarray,
+        levels: np.ndarray,
+        title: str = "{}",
+        xlabel: str = "",
+        ylabel: str = "",
+        colorbar_label: str = "",
+        xlim: t.Optional[t.Tuple[float, float]] = None,
+        ylim: t.Optional[t.Tuple[float, float]] = None,
+        cmap: str = "viridis",
+        extend: str = "neither",
+        figsize: t.Tuple[float, float] = (12.0, 8.0),
+        dpi: int = 100,
+        style: str = "default",
+        rc: t.Optional[t.Dict[str, t.Any]] = None,
+    ) -> None:
+        self.x = np.asarray(x)
+        self.y = np.asarray(y)
+        self.levels = np.asarray(levels)
+        self.title = title
+        self.xlabel = xlabel
+        self.ylabel = ylabel
+        self.colorbar_label = colorbar_label
+        self.xlim = xlim
+        self.ylim = ylim
+        self.cmap = cmap
+        self.extend = extend
+        self.figsize = figsize
+        self.dpi = dpi
+        self.style = style
+        self.rc = rc or {}
+        self._figure: t.Optional[t.Dict[str, t.Any]] = None
+
+    def __getstate__(self) -> t.Dict[str, t.Any]:
+        # The figure is created anew in every process
+        return {**self.__dict__, "_figure": None}
+
+    def _context(self) -> t.Any:
+        import matplotlib.style
+
+        return matplotlib.style.context([self.style, self.rc])
+
+    def _draw_contours(self, z: np.ndarray) -> t.Any:
+        return self._figure["ax"].contourf(self.x, self.y, z, levels=self.levels, cmap=self.cmap,
+                                           vmin=self.levels[0], vmax=self.levels[-1],
+                                           extend=self.extend)
+
+    def __call__(self, param: t.Tuple[t.Any, np.ndarray]) -> np.ndarray:
+        value, z = param
+        with self._context():
+            if self._figure is None:
+                from matplotlib.backends.backend_agg import FigureCanvasAgg
+                from matplotlib.figure import Figure
+
+                fig = Figure(figsize=self.figsize, dpi=self.dpi)
+                FigureCanvasAgg(fig)
+                ax = fig.add_subplot()
+                ax.set_xlabel(self.xlabel)
+                ax.set_ylabel(self.ylabel)
+                if self.xlim is not None:
+                    ax.set_xlim(self.xlim)
+                if self.ylim is not None:
+                    ax.set_ylim(self.ylim)
+                self._figure = {"fig": fig, "ax": ax, "contours": None}
+                self._figure["contours"] = self._draw_contours(z)
+                colorbar = fig.colorbar(self._figure["contours"], ax=ax)
+                colorbar.ax.set_ylabel(self.colorbar_label)
+                self._figure["title"] = ax.set_title("")
+            else:
+                self._figure["contours"].remove()
+                self._figure["contours"] = self._draw_contours(z)
+
+            self._figure["title"].set_text(self.title.format(value))
+            return figure_to_rgb(self._figure["fig"])
@@ -0,0 +1,380 @@
+# Standard libraries
+import datetime
+import gzip
+import hashlib
+import json
+import math
+import pathlib
+import sqlite3
+import typing as t
+
+# Installed libraries
+import numpy as np
+import pandas as pd
+import spiceypy
+
+# Local modules
+import instrumentation
+import kernel_manager
+import time_scales
+
+# Ingest of the Minor Planet Center comet file (cometels.json.gz) into the comet database
+# (tutorial 016). The file is decoded as a stream and processed in batches; all derived
+# quantities are computed column-wise and only rows that differ from the database are written.
+
+# Default locations within the repository
+_ROOT_DIR = pathlib.Path(__file__).resolve().parents[1]
+COMET_JSON_PATH = _ROOT_DIR / "Project_General" / "016-Comet-Database" / "raw_data" / "cometels.json.gz"
+COMET_DB_PATH = _ROOT_DIR / "databases" / "comets" / "mpc_comets.db"
+
+# Columns of comets_main that are written by the ingest (in insert order); NAME is the key
+DB_COLUMNS = [
+    "NAME",
+    "ORBIT_TYPE",
+    "PERIHELION_AU",
+    "SEMI_MAJOR_AXIS_AU",
+    "APHELION_AU",
+    "ECCENTRICITY",
+    "INCLINATION_DEG",
+    "ARG_OF_PERIH_DEG",
+    "LONG_OF_ASC_NODE_DEG",
+    "EPOCH_UTC",
+    "EPOCH_ET",
+    "ABSOLUTE_MAGNITUDE",
+    "SLOPE_PARAMETER",
+]
+
+# Columns that are frequently used in WHERE clauses of the tutorials
+INDEXED_COLUMNS = ["ECCENTRICITY", "PERIHELION_AU", "ORBIT_TYPE"]
+
+
+def iter_json_records(path: t.Union[str, pathlib.Path], chunk_size: int = 1 << 16) -> t.Iterator[dict]:
+    """
+    Yield the objects of a (g-zipped) JSON array one by one without loading the whole file.
+
+    Parameters
+    ----------
+    path : str or pathlib.Path
+        Path of the .json or .json.gz file that contains a JSON array of objects.
+    chunk_size : int, optional
+        Number of characters that are decompressed and read at once. The default is 65536.
+
+    Yields
+    ------
+    record : dict
+        One element of the JSON array.
+    """
+    opener = gzip.open if str(path).endswith(".gz") else open
+    decoder = json.JSONDecoder()
+
+    with opener(path, "rt", encoding="utf-8") as json_file:
+        buffer = ""
+        pos = 0
+        started = False
+        eof = False
+        while True:
+            # Skip whitespace and the array delimiters between two elements
+            while pos < len(buffer) and buffer[pos] in " \t\r\n,[]":
+                if buffer[pos] == "[":
+                    started = True
+                pos += 1
+
+            if pos < len(buffer) and started:
+                try:
+                    record, end = decoder.raw_decode(buffer, pos)
+                except json.JSONDecodeError:
+                    # Incomplete element at the end of the buffer: read more, unless there is
+                    # nothing left to read
+                    if eof:
+                        raise
+                else:
+                    pos = end
+                    yield record
+                    continue
+
+            if eof:
+                return
+
+            chunk = json_file.read(chunk_size)
+            eof = chunk == ""
+            buffer = buffer[pos:] + chunk
+            pos = 0
+
+
+def iter_batches(records: t.Iterable[dict], batch_size: int) -> t.Iterator[pd.DataFrame]:
+    """Group a stream of records into DataFrames of (at most) batch_size rows."""
+    batch = []
+    for record in records:
+        batch.append(record)
+        if len(batch) == batch_size:
+            yield pd.DataFrame.from_records(batch)
+            batch = []
+    if batch:
+        yield pd.DataFrame.from_records(batch)
+
+
+def epoch_utc_strings(year: np.ndarray, month: np.ndarray, day: np.ndarray) -> np.ndarray:
+    """
+    Create the EPOCH_UTC strings of the comet database from the perihelion date columns.
+
+    The format matches the one of tutorial 016: 'YYYY-M-DTHH:MM:SS' with a non-padded month and
+    day; the fraction of the day is rounded to microseconds (like datetime.timedelta) and then
+    truncated to seconds.
+
+    Parameters
+    ----------
+    year, month : array_like
+        Year and month of the perihelion passage.
+    day : array_like
+        Day of the perihelion passage including the fraction of the day (DAY.FRACTION_OF_DAY).
+
+    Returns
+    -------
+    epoch_utc : numpy.ndarray
+        UTC date-time strings.
+    """
+    day = np.asarray(day, dtype=np.float64)
+
+    # Seconds of the day, computed in integer microseconds
+    total_us = np.round(day * 86400e6).astype(np.int64)
+    sec_of_day = (total_us // 1_000_000) % 86400
+
+    date_str = pd.Series(np.asarray(year)).astype(str) + "-" \
+        + pd.Series(np.asarray(month)).astype(str) + "-" \
+        + pd.Series(np.floor(day).astype(np.int64)).astype(str)
+    time_str = pd.Series(sec_of_day // 3600).astype(str).str.zfill(2) + ":" \
+        + pd.Series((sec_of_day // 60) % 60).astype(str).str.zfill(2) + ":" \
+        + pd.Series(sec_of_day % 60).astype(str).str.zfill(2)
+
+    return (date_str + "T" + time_str).to_numpy()
+
+
+def utc2et_array(utc: np.ndarray) -> np.ndarray:
+    """Convert UTC strings to ET. Every distinct string is converted only once."""
+    unique_utc, inverse = np.unique(np.asarray(utc, dtype=str), return_inverse=True)
+    unique_et = np.array([spiceypy.utc2et(utc_str) for utc_str in unique_utc])
+    return unique_et[inverse.ravel()]
+
+
+def epoch_et(year: np.ndarray, month: np.ndarray, day: np.ndarray) -> np.ndarray:
+    """
+    Compute EPOCH_ET from the perihelion date columns without SPICE calls per row.
+
+    The epochs are truncated to seconds like the EPOCH_UTC strings (see epoch_utc_strings) and
+    converted with time_scales.utc_to_et. SPICE reads dates before 1582-10-15 in the Julian
+    calendar; these (rare) rows are converted with utc2et_array instead.
+
+    Parameters
+    ----------
+    year, month : array_like
+        Year and month of the perihelion passage.
+    day : array_like
+        Day of the perihelion passage including the fraction of the day (DAY.FRACTION_OF_DAY).
+
+    Returns
+    -------
+    epoch_et : numpy.ndarray
+        Ephemeris time of the perihelion passage in seconds past J2000.
+    """
+    year = np.asarray(year)
+    month = np.asarray(month)
+    day = np.asarray(day, dtype=np.float64)
+
+    total_us = np.round(day * 86400e6).astype(np.int64)
+    sec_of_day = (total_us // 1_000_000) % 86400
+    utc = time_scales.calendar_to_datetime64(year, month, np.floor(day), sec_of_day)
+    epoch = time_scales.utc_to_et(utc)
+
+    julian = utc < time_scales.GREGORIAN_START
+    if julian.any():
+        epoch[julian] = utc2et_array(epoch_utc_strings(year[julian], month[julian], day[julian]))
+    return epoch
+
+
+def derive_columns(comets_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Compute the comets_main columns from a batch of MPC records.
+
+    Parameters
+    ----------
+    comets_df : pandas.DataFrame
+        Batch of records of cometels.json.gz.
+
+    Returns
+    -------
+    db_df : pandas.DataFrame
+        DataFrame with the columns DB_COLUMNS.
+    """
+    ecc = comets_df["e"].to_numpy(dtype=np.float64)
+    perihelion = comets_df["Perihelion_dist"].to_numpy(dtype=np.float64)
+
+    # Semi-major axis and aphelion are only defined for closed orbits
+    closed = ecc < 1.0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        semi_major_axis = np.where(closed, perihelion / (1.0 - ecc), np.nan)
+        aphelion = np.where(closed, (1.0 + ecc) * semi_major_axis, np.nan)
+
+    year = comets_df["Year_of_perihelion"].to_numpy()
+    month = comets_df["Month_of_perihelion"].to_numpy()
+    day = comets_df["Day_of_perihelion"].to_numpy()
+
+    return pd.DataFrame({
+        "NAME": comets_df["Designation_and_name"].to_numpy(),
+        "ORBIT_TYPE": comets_df["Orbit_type"].to_numpy(),
+        "PERIHELION_AU": perihelion,
+        "SEMI_MAJOR_AXIS_AU": semi_major_axis,
+        "APHELION_AU": aphelion,
+        "ECCENTRICITY": ecc,
+        "INCLINATION_DEG": comets_df["i"].to_numpy(dtype=np.float64),
+        "ARG_OF_PERIH_DEG": comets_df["Peri"].to_numpy(dtype=np.float64),
+        "LONG_OF_ASC_NODE_DEG": comets_df["Node"].to_numpy(dtype=np.float64),
+        "EPOCH_UTC": epoch_utc_strings(year, month, day),
+        "EPOCH_ET": epoch_et(year, month, day),
+        "ABSOLUTE_MAGNITUDE": comets_df["H"].to_numpy(dtype=np.float64),
+        "SLOPE_PARAMETER": comets_df["G"].to_numpy(dtype=np.float64),
+    })
+
+
+def connect(db_path: t.Union[str, pathlib.Path] = COMET_DB_PATH) -> sqlite3.Connection:
+    """
+    Open the comet database with tuned settings and make sure that the schema exists.
+
+    The database uses write-ahead logging with synchronous=NORMAL, which is safe against
+    application crashes and avoids an fsync per transaction. Indexes are created on the columns
+    INDEXED_COLUMNS.
+    """
+    pathlib.Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+    con = sqlite3.connect(db_path, factory=instrumentation.InstrumentedConnection)
+    con.execute("PRAGMA journal_mode=WAL")
+    con.execute("PRAGMA synchronous=NORMAL")
+    con.execute("PRAGMA temp_store=MEMORY")
+
+    con.execute("CREATE TABLE IF NOT EXISTS "
+                "comets_main(NAME TEXT PRIMARY KEY, "
+                "ORBIT_TYPE TEXT, "
+                "PERIHELION_AU REAL, "
+                "SEMI_MAJOR_AXIS_AU REAL, "
+                "APHELION_AU REAL, "
+                "ECCENTRICITY REAL, "
+                "INCLINATION_DEG REAL, "
+                "ARG_OF_PERIH_DEG REAL, "
+                "LONG_OF_ASC_NODE_DEG REAL, "
+                "MEAN_ANOMALY_DEG REAL DEFAULT 0.0, "
+                "EPOCH_UTC TEXT, "
+                "EPOCH_ET REAL, "
+                "ABSOLUTE_MAGNITUDE REAL, "
+                "SLOPE_PARAMETER REAL)")
+    for column in INDEXED_COLUMNS:
+        con.execute(f"CREATE INDEX IF NOT EXISTS idx_comets_main_{column.lower()} "
+                    f"ON comets_main({column})")
+
+    # Book-keeping of the ingested source files
+    con.execute("CREATE TABLE IF NOT EXISTS "
+                "ingest_log(SOURCE TEXT PRIMARY KEY, SHA256 TEXT, INGESTED_UTC TEXT)")
+    con.commit()
+
+    return con
+
+
+def _file_sha256(path: t.Union[str, pathlib.Path]) -> str:
+    sha = hashlib.sha256()
+    with open(path, "rb") as source_file:
+        for block in iter(lambda: source_file.read(1 << 20), b""):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+def _normalise(row: t.Iterable[t.Any]) -> tuple:
+    # SQLite stores NaN as NULL; convert NumPy scalars to Python types for comparison / insert
+    values = []
+    for value in row:
+        if isinstance(value, (float, np.floating)):
+            value = None if math.isnan(value) else float(value)
+        elif isinstance(value, np.integer):
+            value = int(value)
+        values.append(value)
+    return tuple(values)
+
+
+def ingest(
+    json_path: t.Union[str, pathlib.Path] = COMET_JSON_PATH,
+    db_path: t.Union[str, pathlib.Path] = COMET_DB_PATH,
+    batch_size: int = 5000,
+    force: bool = False,
+) -> t.Dict[str, int]:
+    """
+    Ingest the MPC comet file into comets_main, writing only new or changed rows.
+
+    If the source file is identical (SHA-256) to the last ingested one, nothing is done unless
+    force is set. Otherwise the file is streamed in batches; each batch is compared with the
+    stored rows and the differing rows are upserted in one transaction. Columns of comets_main
+    that are not written by the ingest (e.g., TISSERAND_JUP of tutorial 019) are left untouched.
+
+    Parameters
+    ----------
+    json_path : str or pathlib.Path, optional
+        Path of cometels.json.gz. The default is the file of tutorial 016.
+    db_path : str or pathlib.Path, optional
+        Path of the SQLite database. The default is databases/comets/mpc_comets.db.
+    batch_size : int, optional
+        Number of records per batch / transaction. The default is 5000.
+    force : bool, optional
+        Compare all rows even if the source file did not change. The default is False.
+
+    Returns
+    -------
+    stats : dict
+        Number of 'inserted', 'updated' and 'unchanged' rows.
+    """
+    stats = {"inserted": 0, "updated": 0, "unchanged": 0}
+    source = str(pathlib.Path(json_path).resolve())
+    sha256 = _file_sha256(json_path)
+
+    con = connect(db_path)
+    try:
+        logged = con.execute("SELECT SHA256 FROM ingest_log WHERE SOURCE = ?", (source,)).fetchone()
+        if logged is not None and logged[0] == sha256 and not force:
+            return stats
+
+        # Leap seconds are needed for the UTC -> ET conversion
+        kernel_manager.load("naif0012.tls")
+
+        columns = ", ".join(DB_COLUMNS)
+        updates = ", ".join(f"{column} = excluded.{column}" for column in DB_COLUMNS[1:])
+        upsert_sql = (f"INSERT INTO comets_main({columns}) "
+                      f"VALUES({', '.join('?' * len(DB_COLUMNS))}) "
+                      f"ON CONFLICT(NAME) DO UPDATE SET {updates}")
+
+        for batch_df in iter_batches(iter_json_records(json_path), batch_size):
+            db_df = derive_columns(batch_df)
+            rows = [_normalise(row) for row in db_df.itertuples(index=False, name=None)]
+
+            # Fetch the stored version of this batch's rows
+            names = [row[0] for row in rows]
+            stored = {}
+            for i in range(0, len(names), 900):
+                name_chunk = names[i:i + 900]
+                query = (f"SELECT {columns} FROM comets_main "
+                         f"WHERE NAME IN ({', '.join('?' * len(name_chunk))})")
+                stored.update((row[0], row) for row in con.execute(query, name_chunk))
+
+            changed = [row for row in rows if stored.get(row[0]) != row]
+            stats["inserted"] += sum(1 for row in changed if row[0] not in stored)
+            stats["updated"] += sum(1 for row in changed if row[0] in stored)
+            stats["unchanged"] += len(rows) - len(changed)
+
+            with con:
+                con.executemany(upsert_sql, changed)
+
+        with con:
+            con.execute("INSERT OR REPLACE INTO ingest_log(SOURCE, SHA256, INGESTED_UTC) "
+                        "VALUES(?, ?, ?)",
+                        (source, sha256, datetime.datetime.now(datetime.UTC).isoformat()))
+    finally:
+        con.close()
+
+    return stats
+
+
+if __name__ == "__main__":
+    print(ingest())
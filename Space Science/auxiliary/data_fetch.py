@@ -1,6 +1,12 @@
 # Import the modules
+import concurrent.futures
 import datetime
+import hashlib
+import json
 import pathlib
+import re
+import threading
+import time
 import urllib.request
 import os
 
@@ -8,23 +14,61 @@ import os
 import numpy as np
 import spiceypy
 
+import instrumentation
+
+# Files larger than this are downloaded in parallel HTTP Range chunks of this size (if the server
+# supports ranges)
+CHUNK_SIZE = 8 * 1024 * 1024
+
+# Number of parallel connections per file and number of files downloaded at once
+MAX_CONNECTIONS = 4
+MAX_FILES = 4
+
+# Timeout (in seconds) of a single HTTP request
+TIMEOUT = 60
+
 # We define a function that is useful for downloading files. Some files, like
 # SPICE kernel files, are large and cannot be uploaded on the GitHub
 # repository. Thus, this helper function shall support you for the future
 # file and kernel management (if needed).
-def download_file(dl_path, dl_url):
+def download_file(dl_path, dl_url, size=None, sha256=None, max_connections=MAX_CONNECTIONS,
+                  chunk_size=CHUNK_SIZE, verbose=True):
     """
     download_file(dl_path, dl_url)
 
     This helper function supports one to download files from the Internet and
     stores them in a local directory.
 
+    The file is first written to "<file name>.part" and only renamed to its
+    final name after the size (and, if given, the SHA-256 checksum) has been
+    verified; thus, an interrupted download is never mistaken for a complete
+    file. If the server supports HTTP Range requests, large files are
+    downloaded in parallel chunks and an interrupted download is resumed with
+    the missing chunks only.
+
     Parameters
     ----------
     dl_path : str
         Download path on the local machine, relative to this function.
     dl_url : str
         Download url of the requested file.
+    size : int, optional
+        Expected file size in bytes. If not given, the size reported by the
+        server is used.
+    sha256 : str, optional
+        Expected SHA-256 checksum (hex digest) of the file.
+    max_connections : int, optional
+        Number of parallel connections for a chunked download.
+    chunk_size : int, optional
+        Size of the HTTP Range chunks in bytes.
+    verbose : bool, optional
+        Print the throughput of the download.
+
+    Returns
+    -------
+    stats : dict
+        File path, downloaded bytes, duration in seconds and whether the file
+        was already present ("skipped").
     """
 
     # Obtain the file name from the url string. The url is split at
@@ -35,9 +79,192 @@ def download_file(dl_path, dl_url):
     # Create necessary sub-directories in the DL_PATH direction (if not
     # existing)
     pathlib.Path(dl_path).mkdir(parents=True, exist_ok=True)
+    file_path = pathlib.Path(dl_path) / file_name
+    part_path = file_path.with_name(file_name + '.part')
+    state_path = file_path.with_name(file_name + '.part.json')
+
+    # If the file is present in the download directory and matches the
+    # expected size / checksum -> done, without contacting the server
+    skipped = {'path': str(file_path), 'bytes': 0, 'seconds': 0.0, 'skipped': True}
+    if file_path.is_file() and (size is not None or sha256 is not None) \
+            and _verify(file_path, size, sha256):
+        return skipped
+
+    # Ask the server for the size and whether it supports Range requests
+    remote_size, accepts_ranges = _remote_info(dl_url)
+    if size is None:
+        size = remote_size
+
+    # Without expectations, an existing file is complete if it has the size
+    # reported by the server (or if the server cannot tell)
+    if file_path.is_file() and _verify(file_path, size, sha256):
+        return skipped
+
+    start_time = time.perf_counter()
+    if accepts_ranges and size is not None and size > chunk_size:
+        downloaded = _download_chunked(dl_url, part_path, state_path, size, chunk_size,
+                                       max_connections)
+    else:
+        downloaded = _download_single(dl_url, part_path)
+    seconds = time.perf_counter() - start_time
+
+    if not _verify(part_path, size, sha256):
+        part_path.unlink()
+        state_path.unlink(missing_ok=True)
+        raise IOError(f'Verification of {file_name} failed (size / checksum mismatch)')
+
+    # Atomic rename: the final file name only ever refers to a complete file
+    os.replace(part_path, file_path)
+    state_path.unlink(missing_ok=True)
+
+    if verbose:
+        rate = downloaded / max(seconds, 1e-9) / 1e6
+        print(f'{file_name}: {downloaded / 1e6:.1f} MB in {seconds:.1f} s ({rate:.1f} MB/s)')
+
+    return {'path': str(file_path), 'bytes': downloaded, 'seconds': seconds, 'skipped': False}
+
+
+def download_files(dl_path, dl_urls, manifest=None, max_files=MAX_FILES,
+                   max_connections=MAX_CONNECTIONS, chunk_size=CHUNK_SIZE):
+    """
+    download_files(dl_path, dl_urls, manifest=None)
+
+    Downloads several files concurrently (see download_file) and reports the
+    total throughput.
+
+    Parameters
+    ----------
+    dl_path : str
+        Download path on the local machine.
+    dl_urls : list of str
+        Download urls of the requested files.
+    manifest : dict or str, optional
+        Expected sizes / checksums per file name, e.g.
+        {"de432s.bsp": {"size": 10895360, "sha256": "..."}}, or the path of a
+        JSON file with this content.
+    max_files : int, optional
+        Number of files downloaded at the same time.
+    max_connections : int, optional
+        Number of parallel connections per file.
+    chunk_size : int, optional
+        Size of the HTTP Range chunks in bytes.
+
+    Returns
+    -------
+    stats : list of dict
+        Statistics of every download (see download_file), in the order of
+        dl_urls.
+    """
+    if isinstance(manifest, (str, pathlib.Path)):
+        with open(manifest, 'r') as manifest_file:
+            manifest = json.load(manifest_file)
+    manifest = manifest or {}
+
+    start_time = time.perf_counter()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_files) as executor:
+        futures = []
+        for dl_url in dl_urls:
+            expected = manifest.get(dl_url.split('/')[-1], {})
+            futures.append(executor.submit(download_file, dl_path, dl_url,
+                                           size=expected.get('size'),
+                                           sha256=expected.get('sha256'),
+                                           max_connections=max_connections,
+                                           chunk_size=chunk_size))
+        stats = [future.result() for future in futures]
+    seconds = time.perf_counter() - start_time
+
+    total_bytes = sum(entry['bytes'] for entry in stats)
+    print(f'Downloaded {len(stats) - sum(entry["skipped"] for entry in stats)} of '
+          f'{len(stats)} files, {total_bytes / 1e6:.1f} MB in {seconds:.1f} s '
+          f'({total_bytes / max(seconds, 1e-9) / 1e6:.1f} MB/s)')
+
+    return stats
+
+
+def _open_url(dl_url, headers=None):
+    request = urllib.request.Request(dl_url, headers=headers or {})
+    # Time to the response headers; the body is streamed by the caller
+    with instrumentation.span("http.download"):
+        return urllib.request.urlopen(request, timeout=TIMEOUT)
+
+
+def _remote_info(dl_url):
+    # A request for the very first byte returns the total size in the
+    # Content-Range header, if the server supports ranges (status 206)
+    try:
+        with _open_url(dl_url, {'Range': 'bytes=0-0'}) as response:
+            if response.status == 206:
+                match = re.search(r'/(\d+)$', response.headers.get('Content-Range', ''))
+                return (int(match.group(1)) if match else None), match is not None
+            length = response.headers.get('Content-Length')
+            return (int(length) if length is not None else None), False
+    except OSError:
+        return None, False
+
+
+def _verify(file_path, size, sha256):
+    if size is not None and os.path.getsize(file_path) != size:
+        return False
+    if sha256 is not None:
+        digest = hashlib.sha256()
+        with open(file_path, 'rb') as file:
+            for block in iter(lambda: file.read(1024 * 1024), b''):
+                digest.update(block)
+        if digest.hexdigest() != sha256.lower():
+            return False
+    return True
+
+
+def _download_single(dl_url, part_path):
+    downloaded = 0
+    with _open_url(dl_url) as response, open(part_path, 'wb') as part_file:
+        for block in iter(lambda: response.read(1024 * 1024), b''):
+            part_file.write(block)
+            downloaded += len(block)
+    return downloaded
+
+
+def _download_chunked(dl_url, part_path, state_path, size, chunk_size, max_connections):
+    n_chunks = (size + chunk_size - 1) // chunk_size
+
+    # Resume: the state file lists the chunks that are already complete. It
+    # is only valid for the same url, size and chunking
+    done = set()
+    if part_path.is_file() and state_path.is_file():
+        with open(state_path, 'r') as state_file:
+            state = json.load(state_file)
+        if (state.get('url'), state.get('size'), state.get('chunk_size')) == (dl_url, size, chunk_size):
+            done = set(state['done'])
+    if not done or os.path.getsize(part_path) != size:
+        done = set()
+        with open(part_path, 'wb') as part_file:
+            part_file.truncate(size)
+
+    lock = threading.Lock()
+
+    def fetch_chunk(index):
+        first = index * chunk_size
+        last = min(first + chunk_size, size) - 1
+        received = 0
+        with _open_url(dl_url, {'Range': f'bytes={first}-{last}'}) as response, \
+                open(part_path, 'r+b') as part_file:
+            if response.status != 206:
+                raise IOError(f'Server ignored the Range request for {dl_url}')
+            part_file.seek(first)
+            for block in iter(lambda: response.read(1024 * 1024), b''):
+                part_file.write(block)
+                received += len(block)
+        if received != last - first + 1:
+            raise IOError(f'Incomplete chunk {index} of {dl_url}')
 
-    # If the file is not present in the download directory -> download it
-    if not os.path.isfile(dl_path + file_name):
+        # Record the progress after every chunk
+        with lock:
+            done.add(index)
+            with open(state_path, 'w') as state_file:
+                json.dump({'url': dl_url, 'size': size, 'chunk_size': chunk_size,
+                           'done': sorted(done)}, state_file)
+        return received
 
-        # Download the file with the urllib  package
-        urllib.request.urlretrieve(dl_url, dl_path + file_name)
\ No newline at end of file
+    missing = [index for index in range(n_chunks) if index not in done]
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_connections) as executor:
+        return sum(executor.map(fetch_chunk, missing))
@@ -0,0 +1,347 @@
+# Standard libraries
+import pathlib
+import typing as t
+
+# Installed libraries
+import numpy as np
+import spiceypy
+
+# Piecewise Chebyshev interpolation of SPICE ephemerides. Notebooks that need the state of a body
+# at thousands of epochs (e.g., Jupiter every hour over decades) call spiceypy.spkgeo once per
+# epoch. Instead, the state is sampled once over the requested time span, fitted segment-wise with
+# Chebyshev polynomials (the same representation that the SPK files use internally) and then
+# evaluated for whole ET arrays with NumPy.
+
+# Number of query epochs that are evaluated at once
+_EVAL_CHUNK = 16384
+
+# Default fit parameters of ChebyshevEphemeris.fit (also used by cached_ephemeris to decide whether
+# a stored interpolant is good enough)
+_POS_TOL = 1e-3
+_VEL_TOL = 1e-9
+_DEGREE = 12
+
+
+def _cheb_nodes(degree: int) -> np.ndarray:
+    """Chebyshev nodes of the first kind in (-1, 1), ascending."""
+    k = np.arange(degree + 1)
+    return np.cos(np.pi * (k + 0.5) / (degree + 1))[::-1]
+
+
+def _sample_states(
+    target: int, ets: np.ndarray, ref: str, observer: int
+) -> np.ndarray:
+    """Geometric states (km, km/s) of the target w.r.t. the observer, shape (len(ets), 6)."""
+    return np.array([spiceypy.spkgeo(targ=target, et=et, ref=ref, obs=observer)[0] for et in ets])
+
+
+def _clenshaw(coeffs: np.ndarray, seg_idx: np.ndarray, tau: np.ndarray) -> np.ndarray:
+    """
+    Evaluate Chebyshev series with the Clenshaw recurrence.
+
+    coeffs has shape (M, degree + 1, C) for M segments and C components; every query point
+    uses the coefficients of its segment seg_idx and the normalised time tau in [-1, 1].
+    Returns an array of shape (len(tau), C).
+    """
+    b_k1 = np.zeros((len(tau), coeffs.shape[2]))
+    b_k2 = np.zeros_like(b_k1)
+    tau2 = 2.0 * tau[:, np.newaxis]
+    for k in range(coeffs.shape[1] - 1, 0, -1):
+        b_k1, b_k2 = coeffs[seg_idx, k] + tau2 * b_k1 - b_k2, b_k1
+    return coeffs[seg_idx, 0] + tau[:, np.newaxis] * b_k1 - b_k2
+
+
+class ChebyshevEphemeris:
+    """
+    Piecewise Chebyshev interpolant of a body's geometric state vector.
+
+    Use ChebyshevEphemeris.fit to create an interpolant from the currently loaded SPICE kernels,
+    or ChebyshevEphemeris.load to read one that has been stored with save. After the fit, no SPICE
+    kernels are needed for the evaluation.
+
+    Attributes
+    ----------
+    target, observer : int
+        NAIF IDs of the target and the observer (centre).
+    ref : str
+        Reference frame of the states.
+    boundaries : numpy.ndarray
+        ET boundaries of the M segments, shape (M + 1,).
+    coeffs : numpy.ndarray
+        Chebyshev coefficients, shape (M, degree + 1, 6) for (x, y, z, vx, vy, vz).
+    max_pos_error : float
+        Largest position error in km found on the check grid during the fit.
+    max_vel_error : float
+        Largest velocity error in km/s found on the check grid during the fit.
+    pos_tol, vel_tol : float
+        Position (km) and velocity (km/s) tolerances of the fit; inf if unknown (e.g., files
+        stored before the tolerances were recorded).
+    """
+
+    def __init__(
+        self,
+        target: int,
+        observer: int,
+        ref: str,
+        boundaries: np.ndarray,
+        coeffs: np.ndarray,
+        max_pos_error: float,
+        max_vel_error: float,
+        pos_tol: float = np.inf,
+        vel_tol: float = np.inf,
+    ) -> None:
+        self.target = int(target)
+        self.observer = int(observer)
+        self.ref = str(ref)
+        self.boundaries = np.asarray(boundaries, dtype=np.float64)
+        self.coeffs = np.asarray(coeffs, dtype=np.float64)
+        self.max_pos_error = float(max_pos_error)
+        self.max_vel_error = float(max_vel_error)
+        self.pos_tol = float(pos_tol)
+        self.vel_tol = float(vel_tol)
+
+    @property
+    def et_start(self) -> float:
+        """First ET covered by the interpolant."""
+        return float(self.boundaries[0])
+
+    @property
+    def et_end(self) -> float:
+        """Last ET covered by the interpolant."""
+        return float(self.boundaries[-1])
+
+    @property
+    def degree(self) -> int:
+        """Polynomial degree per segment."""
+        return self.coeffs.shape[1] - 1
+
+    @classmethod
+    def fit(
+        cls,
+        target: int,
+        et_start: float,
+        et_end: float,
+        observer: int = 10,
+        ref: str = "ECLIPJ2000",
+        pos_tol: float = _POS_TOL,
+        vel_tol: float = _VEL_TOL,
+        degree: int = _DEGREE,
+        seg_length: float = 16.0 * 86400.0,
+        min_seg_length: float = 60.0,
+    ) -> "ChebyshevEphemeris":
+        """
+        Sample a body's state from the loaded SPK kernels and fit piecewise Chebyshev polynomials.
+
+        The span is first split into segments of (at most) seg_length seconds. For every segment
+        the state is sampled at degree + 1 Chebyshev nodes and interpolated. The interpolant is
+        then compared to SPICE at the midpoints between the nodes (and the segment borders); any
+        segment that exceeds pos_tol or vel_tol is bisected and fitted again, down to
+        min_seg_length.
+
+        Parameters
+        ----------
+        target : int
+            NAIF ID of the target body (e.g., 5 for Jupiter's barycentre).
+        et_start : float
+            Start of the time span (ET).
+        et_end : float
+            End of the time span (ET).
+        observer : int, optional
+            NAIF ID of the observer (centre). The default is 10 (Sun).
+        ref : str, optional
+            Reference frame. The default is 'ECLIPJ2000'.
+        pos_tol : float, optional
+            Position tolerance in km. The default is 1e-3 (1 m).
+        vel_tol : float, optional
+            Velocity tolerance in km/s. The default is 1e-9.
+        degree : int, optional
+            Polynomial degree per segment. The default is 12.
+        seg_length : float, optional
+            Initial segment length in seconds. The default is 16 days.
+        min_seg_length : float, optional
+            Shortest segment length in seconds. The default is 60.
+
+        Returns
+        -------
+        ephemeris : ChebyshevEphemeris
+            Fitted interpolant.
+
+        Raises
+        ------
+        ValueError
+            If a segment would have to be bisected below min_seg_length (e.g., tolerances below
+            the noise of the kernel data); the message gives the best errors reached.
+        """
+        nodes = _cheb_nodes(degree)
+
+        # Check points: the midpoints between neighbouring nodes plus both segment borders
+        checks = np.concatenate([[-1.0], 0.5 * (nodes[1:] + nodes[:-1]), [1.0]])
+        vander = np.polynomial.chebyshev.chebvander(nodes, degree)
+        check_vander = np.polynomial.chebyshev.chebvander(checks, degree)
+
+        n_init = max(1, int(np.ceil((et_end - et_start) / seg_length)))
+        pending = list(zip(np.linspace(et_start, et_end, n_init + 1)[:-1],
+                           np.linspace(et_start, et_end, n_init + 1)[1:]))
+
+        segments = []
+        max_pos_error = 0.0
+        max_vel_error = 0.0
+        while pending:
+            seg_a = np.array([seg[0] for seg in pending])
+            seg_b = np.array([seg[1] for seg in pending])
+            half = 0.5 * (seg_b - seg_a)[:, np.newaxis]
+            mid = 0.5 * (seg_b + seg_a)[:, np.newaxis]
+
+            # Sample the nodes and check points of all pending segments in one go
+            node_states = _sample_states(target, (mid + half * nodes).ravel(), ref, observer)
+            check_states = _sample_states(target, (mid + half * checks).ravel(), ref, observer)
+            node_states = node_states.reshape(len(pending), degree + 1, 6)
+            check_states = check_states.reshape(len(pending), len(checks), 6)
+
+            # Interpolate; the node matrix is square, so a solve gives the exact interpolant
+            seg_coeffs = np.linalg.solve(vander[np.newaxis], node_states)
+            residuals = np.abs(check_vander @ seg_coeffs - check_states)
+            pos_err = residuals[:, :, :3].max(axis=(1, 2))
+            vel_err = residuals[:, :, 3:].max(axis=(1, 2))
+
+            next_pending = []
+            for i, (a, b) in enumerate(pending):
+                if pos_err[i] <= pos_tol and vel_err[i] <= vel_tol:
+                    segments.append((a, b, seg_coeffs[i]))
+                    max_pos_error = max(max_pos_error, pos_err[i])
+                    max_vel_error = max(max_vel_error, vel_err[i])
+                elif 0.5 * (b - a) < min_seg_length:
+                    raise ValueError(f"Chebyshev fit of target {target} does not converge in "
+                                     f"[{a:.3f}, {b:.3f}] (ET): best errors {pos_err[i]:.3e} km, "
+                                     f"{vel_err[i]:.3e} km/s with segments of {b - a:.3f} s "
+                                     f"(pos_tol={pos_tol}, vel_tol={vel_tol}, "
+                                     f"min_seg_length={min_seg_length})")
+                else:
+                    next_pending += [(a, 0.5 * (a + b)), (0.5 * (a + b), b)]
+            pending = next_pending
+
+        segments.sort(key=lambda seg: seg[0])
+        boundaries = np.array([seg[0] for seg in segments] + [segments[-1][1]])
+        coeffs = np.stack([seg[2] for seg in segments])
+
+        return cls(target, observer, ref, boundaries, coeffs, max_pos_error, max_vel_error,
+                   pos_tol, vel_tol)
+
+    def state(self, et: t.Union[float, np.ndarray]) -> np.ndarray:
+        """
+        Evaluate the state vectors for arbitrary ETs.
+
+        Parameters
+        ----------
+        et : float or array_like
+            Ephemeris time(s) within [et_start, et_end].
+
+        Returns
+        -------
+        state : numpy.ndarray
+            State vectors (km, km/s) with shape et.shape + (6,).
+        """
+        et = np.asarray(et, dtype=np.float64)
+        flat_et = et.ravel()
+        if flat_et.size and (flat_et.min() < self.boundaries[0] or flat_et.max() > self.boundaries[-1]):
+            raise ValueError("ET outside of the interpolated time span "
+                             f"[{self.boundaries[0]}, {self.boundaries[-1]}]")
+
+        seg_idx = np.clip(np.searchsorted(self.boundaries, flat_et, side="right") - 1,
+                          0, len(self.coeffs) - 1)
+        seg_a = self.boundaries[seg_idx]
+        seg_b = self.boundaries[seg_idx + 1]
+        tau = (2.0 * flat_et - (seg_a + seg_b)) / (seg_b - seg_a)
+
+        # Evaluate in chunks, so that the intermediate arrays of the recurrence stay in the cache
+        states = np.empty((len(flat_et), 6))
+        for i in range(0, len(flat_et), _EVAL_CHUNK):
+            chunk = slice(i, i + _EVAL_CHUNK)
+            states[chunk] = _clenshaw(self.coeffs, seg_idx[chunk], tau[chunk])
+
+        return states.reshape(et.shape + (6,))
+
+    def position(self, et: t.Union[float, np.ndarray]) -> np.ndarray:
+        """Position vectors (km) with shape et.shape + (3,). See state."""
+        return self.state(et)[..., :3]
+
+    def save(self, path: t.Union[str, pathlib.Path]) -> None:
+        """Store the interpolant as a NumPy .npz file."""
+        with open(path, "wb") as npz_file:
+            np.savez(
+                npz_file,
+                target=self.target,
+                observer=self.observer,
+                ref=self.ref,
+                boundaries=self.boundaries,
+                coeffs=self.coeffs,
+                max_pos_error=self.max_pos_error,
+                max_vel_error=self.max_vel_error,
+                pos_tol=self.pos_tol,
+                vel_tol=self.vel_tol,
+            )
+
+    @classmethod
+    def load(cls, path: t.Union[str, pathlib.Path]) -> "ChebyshevEphemeris":
+        """Read an interpolant that has been stored with save."""
+        with np.load(path) as data:
+            return cls(
+                int(data["target"]),
+                int(data["observer"]),
+                str(data["ref"]),
+                data["boundaries"],
+                data["coeffs"],
+                float(data["max_pos_error"]),
+                float(data["max_vel_error"]),
+                float(data["pos_tol"]) if "pos_tol" in data.files else np.inf,
+                float(data["vel_tol"]) if "vel_tol" in data.files else np.inf,
+            )
+
+
+def cached_ephemeris(
+    path: t.Union[str, pathlib.Path],
+    target: int,
+    et_start: float,
+    et_end: float,
+    observer: int = 10,
+    ref: str = "ECLIPJ2000",
+    **fit_kwargs: t.Any,
+) -> ChebyshevEphemeris:
+    """
+    Load an interpolant from disk, or fit and store it if it does not exist (or does not match).
+
+    A stored interpolant is reused if it has the same target, observer, frame and degree, covers
+    the requested span and was fitted to tolerances at least as tight as the requested ones.
+    Fitting requires the corresponding SPICE kernels to be loaded.
+
+    Parameters
+    ----------
+    path : str or pathlib.Path
+        Location of the .npz file.
+    target, et_start, et_end, observer, ref, **fit_kwargs
+        See ChebyshevEphemeris.fit.
+
+    Returns
+    -------
+    ephemeris : ChebyshevEphemeris
+        The loaded or newly fitted interpolant.
+    """
+    path = pathlib.Path(path)
+    if path.is_file():
+        ephemeris = ChebyshevEphemeris.load(path)
+        if (
+            ephemeris.target == target
+            and ephemeris.observer == observer
+            and ephemeris.ref == ref
+            and ephemeris.et_start <= et_start
+            and ephemeris.et_end >= et_end
+            and ephemeris.degree == fit_kwargs.get("degree", _DEGREE)
+            and ephemeris.pos_tol <= fit_kwargs.get("pos_tol", _POS_TOL)
+            and ephemeris.vel_tol <= fit_kwargs.get("vel_tol", _VEL_TOL)
+        ):
+            return ephemeris
+
+    ephemeris = ChebyshevEphemeris.fit(target, et_start, et_end, observer, ref, **fit_kwargs)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    ephemeris.save(path)
+    return ephemeris
@@ -0,0 +1,252 @@
+# Standard libraries
+import typing as t
+
+# Installed libraries
+import numpy as np
+
+# Event finding on vectorised functions of time. The notebooks search for events (e.g., a comet
+# entering the sphere of influence of Jupiter) by stepping one hour at a time until a distance
+# threshold flips, which needs one SPICE call per hour of simulated time. Here, a function is
+# first evaluated on a coarse time grid in one call; every sign change is then bracketed and all
+# brackets are refined simultaneously. The functions passed to this module must therefore accept
+# a NumPy array of ETs and return an array of the same shape (e.g., a distance based on
+# ephemeris.ChebyshevEphemeris.position).
+
+# Type of the functions of time that are searched
+TimeFunc = t.Callable[[np.ndarray], np.ndarray]
+
+# Inverse of the golden ratio, needed for the golden-section search
+_INV_PHI = (np.sqrt(5.0) - 1.0) / 2.0
+
+
+def time_grid(et_start: float, et_end: float, step: float) -> np.ndarray:
+    """
+    Create a coarse search grid from et_start to et_end (both included).
+
+    Parameters
+    ----------
+    et_start : float
+        Start of the search window (ET).
+    et_end : float
+        End of the search window (ET).
+    step : float
+        Grid step in seconds. The step must be smaller than the shortest event (or the shortest
+        distance between two events) that shall be found.
+
+    Returns
+    -------
+    grid : numpy.ndarray
+        ET grid.
+    """
+    n_steps = max(1, int(np.ceil((et_end - et_start) / step)))
+    return np.linspace(et_start, et_end, n_steps + 1)
+
+
+def _bisect_sign_change(
+    func: TimeFunc, et_a: np.ndarray, et_b: np.ndarray, rising: np.ndarray, tol: float
+) -> np.ndarray:
+    """
+    Refine all brackets [et_a, et_b] at once by bisection until they are narrower than tol.
+
+    rising is True for brackets where func changes from negative to non-negative.
+    """
+    et_a = et_a.copy()
+    et_b = et_b.copy()
+    while et_a.size and np.max(et_b - et_a) > tol:
+        et_m = 0.5 * (et_a + et_b)
+        above = func(et_m) >= 0.0
+
+        # For a rising bracket the root is left of the midpoint if func(mid) >= 0
+        left = above == rising
+        et_b = np.where(left, et_m, et_b)
+        et_a = np.where(left, et_a, et_m)
+
+    return 0.5 * (et_a + et_b)
+
+
+def find_crossings(
+    func: TimeFunc,
+    et_start: float,
+    et_end: float,
+    step: float,
+    threshold: float = 0.0,
+    tol: float = 1e-3,
+) -> t.Tuple[np.ndarray, np.ndarray]:
+    """
+    Find all times where a function crosses a threshold.
+
+    Parameters
+    ----------
+    func : callable
+        Vectorised function of ET.
+    et_start : float
+        Start of the search window (ET).
+    et_end : float
+        End of the search window (ET).
+    step : float
+        Coarse grid step in seconds.
+    threshold : float, optional
+        Threshold value. The default is 0.0.
+    tol : float, optional
+        Precision of the event times in seconds. The default is 1e-3.
+
+    Returns
+    -------
+    event_ets : numpy.ndarray
+        ETs of the crossings, in ascending order.
+    direction : numpy.ndarray
+        +1 where the function rises above the threshold, -1 where it falls below it.
+    """
+    grid = time_grid(et_start, et_end, step)
+    above = (np.asarray(func(grid)) - threshold) >= 0.0
+
+    idx = np.flatnonzero(above[1:] != above[:-1])
+    rising = above[idx + 1]
+
+    event_ets = _bisect_sign_change(
+        lambda ets: np.asarray(func(ets)) - threshold, grid[idx], grid[idx + 1], rising, tol
+    )
+    return event_ets, np.where(rising, 1, -1)
+
+
+def find_soi_events(
+    distance: TimeFunc,
+    soi_radius: float,
+    et_start: float,
+    et_end: float,
+    step: float,
+    tol: float = 1e-3,
+) -> t.Tuple[np.ndarray, np.ndarray]:
+    """
+    Find the entries into and exits out of a sphere of influence (or any sphere).
+
+    Parameters
+    ----------
+    distance : callable
+        Vectorised function of ET that returns the distance to the sphere's centre.
+    soi_radius : float
+        Radius of the sphere, in the unit of distance.
+    et_start, et_end, step, tol
+        See find_crossings.
+
+    Returns
+    -------
+    entry_ets : numpy.ndarray
+        ETs where the distance falls below the radius.
+    exit_ets : numpy.ndarray
+        ETs where the distance rises above the radius.
+    """
+    event_ets, direction = find_crossings(distance, et_start, et_end, step, soi_radius, tol)
+    return event_ets[direction < 0], event_ets[direction > 0]
+
+
+def find_minima(
+    func: TimeFunc,
+    et_start: float,
+    et_end: float,
+    step: float,
+    tol: float = 1e-3,
+) -> t.Tuple[np.ndarray, np.ndarray]:
+    """
+    Find the local minima of a function, e.g., the closest approaches of two bodies.
+
+    Local minima of the coarse grid are refined by a golden-section search between the
+    neighbouring grid points. Minima at the window borders are not reported.
+
+    Parameters
+    ----------
+    func : callable
+        Vectorised function of ET.
+    et_start, et_end, step, tol
+        See find_crossings.
+
+    Returns
+    -------
+    min_ets : numpy.ndarray
+        ETs of the minima, in ascending order.
+    min_values : numpy.ndarray
+        Function values at the minima.
+    """
+    grid = time_grid(et_start, et_end, step)
+    values = np.asarray(func(grid))
+
+    idx = np.flatnonzero((values[1:-1] < values[:-2]) & (values[1:-1] <= values[2:])) + 1
+
+    # Vectorised golden-section search on all brackets [grid[i-1], grid[i+1]]
+    et_a = grid[idx - 1]
+    et_b = grid[idx + 1]
+    et_c = et_b - _INV_PHI * (et_b - et_a)
+    et_d = et_a + _INV_PHI * (et_b - et_a)
+    val_c = np.asarray(func(et_c))
+    val_d = np.asarray(func(et_d))
+    while et_a.size and np.max(et_b - et_a) > tol:
+        left = val_c < val_d
+
+        # Minimum in [a, d]: d becomes the new b, c the new d
+        # Minimum in [c, b]: c becomes the new a, d the new c
+        et_b = np.where(left, et_d, et_b)
+        et_a = np.where(left, et_a, et_c)
+        new_c = np.where(left, et_b - _INV_PHI * (et_b - et_a), et_d)
+        new_d = np.where(left, et_c, et_a + _INV_PHI * (et_b - et_a))
+
+        # Only one of both points is new per bracket; evaluate both in one call anyway, which is
+        # cheaper than splitting the brackets
+        new_val = np.asarray(func(np.where(left, new_c, new_d)))
+        val_c, val_d = np.where(left, new_val, val_d), np.where(left, val_c, new_val)
+        et_c, et_d = new_c, new_d
+
+    min_ets = 0.5 * (et_a + et_b)
+    return min_ets, np.asarray(func(min_ets))
+
+
+def find_intervals(
+    predicate: t.Callable[[np.ndarray], np.ndarray],
+    et_start: float,
+    et_end: float,
+    step: float,
+    tol: float = 1e-3,
+) -> t.Tuple[np.ndarray, np.ndarray]:
+    """
+    Find the time intervals where a boolean predicate holds.
+
+    The predicate is evaluated on the coarse grid, consecutive True samples are merged into
+    intervals (run-length logic) and the interval edges are refined by bisection. Intervals that
+    touch the window borders start / end at the border.
+
+    Parameters
+    ----------
+    predicate : callable
+        Vectorised function of ET that returns a boolean array, e.g., a combination of several
+        conditions such as (phase angle < 30 deg) & (elongation > 45 deg).
+    et_start, et_end, step, tol
+        See find_crossings.
+
+    Returns
+    -------
+    starts : numpy.ndarray
+        Start ETs of the intervals.
+    ends : numpy.ndarray
+        End ETs of the intervals.
+    """
+    grid = time_grid(et_start, et_end, step)
+    inside = np.asarray(predicate(grid), dtype=bool)
+
+    # Run-length edges: +1 where a run starts, -1 after a run ends
+    edges = np.diff(inside.astype(np.int8))
+    rise_idx = np.flatnonzero(edges > 0)
+    fall_idx = np.flatnonzero(edges < 0)
+
+    def as_sign(ets: np.ndarray) -> np.ndarray:
+        return np.where(np.asarray(predicate(ets), dtype=bool), 1.0, -1.0)
+
+    starts = _bisect_sign_change(as_sign, grid[rise_idx], grid[rise_idx + 1],
+                                 np.ones(len(rise_idx), dtype=bool), tol)
+    ends = _bisect_sign_change(as_sign, grid[fall_idx], grid[fall_idx + 1],
+                               np.zeros(len(fall_idx), dtype=bool), tol)
+
+    if inside[0]:
+        starts = np.concatenate([[grid[0]], starts])
+    if inside[-1]:
+        ends = np.concatenate([ends, [grid[-1]]])
+
+    return starts, ends
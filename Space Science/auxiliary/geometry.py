@@ -0,0 +1,380 @@
+# Standard libraries
+import pathlib
+import typing as t
+
+# Installed libraries
+import numpy as np
+import spiceypy
+
+# Local modules
+import ephemeris
+import events
+
+# Observation geometry for whole arrays of epochs. Tutorial 008 computes the angles between Venus,
+# the Moon and the Sun as seen from the Earth with one spiceypy.phaseq call per hour and flags the
+# "photogenic" hours row by row. Here, the barycentric states of all bodies are taken from
+# Chebyshev interpolants (ephemeris.ChebyshevEphemeris, fitted once from the SPICE kernels), and
+# the light-time iteration and the stellar aberration correction of SPICE are applied to all
+# epochs at once. Conditions on these angles are combined into observing windows whose edges are
+# refined by bisection (events.find_intervals), so that the coarse grid can be much wider than the
+# requested precision of the window edges.
+
+# Type of the functions that return barycentric states (km, km/s) with shape et.shape + (6,)
+StateFunc = t.Callable[[np.ndarray], np.ndarray]
+
+# Type of the functions of time that are searched (see events)
+TimeFunc = events.TimeFunc
+
+# Aberration corrections that are supported (reception case, as for spiceypy.phaseq)
+ABCORRS = ("NONE", "LT", "LT+S", "CN", "CN+S")
+
+# Light-time iterations of the converged Newtonian correction (as in SPICE)
+_CN_MAX_ITER = 5
+
+# Number of epochs per evaluation when searching windows; keeps the state arrays in memory small
+_EVAL_CHUNK = 1 << 18
+
+# Comparison operators of a Condition
+_RELATIONS = {"<": np.less, "<=": np.less_equal, ">": np.greater, ">=": np.greater_equal}
+
+
+class Condition(t.NamedTuple):
+    """
+    Condition "func(et) <relation> value", e.g., Condition(venus_sun_angle, ">", 30.0).
+
+    Attributes
+    ----------
+    func : callable
+        Vectorised function of ET.
+    relation : str
+        One of '<', '<=', '>' and '>='.
+    value : float
+        Threshold, in the unit of func.
+    """
+
+    func: TimeFunc
+    relation: str
+    value: float
+
+
+class Windows(t.NamedTuple):
+    """
+    Time intervals where a set of conditions holds.
+
+    Attributes
+    ----------
+    starts : numpy.ndarray
+        Start ETs of the intervals.
+    ends : numpy.ndarray
+        End ETs of the intervals.
+    durations : numpy.ndarray
+        Durations of the intervals in seconds.
+    """
+
+    starts: np.ndarray
+    ends: np.ndarray
+    durations: np.ndarray
+
+
+def body_states(
+    bodies: t.Iterable[int],
+    et_start: float,
+    et_end: float,
+    ref: str = "J2000",
+    margin: float = 86400.0,
+    cache_dir: t.Optional[t.Union[str, pathlib.Path]] = None,
+    **fit_kwargs: t.Any,
+) -> t.Dict[int, StateFunc]:
+    """
+    Fit the barycentric states of several bodies from the loaded SPICE kernels.
+
+    Parameters
+    ----------
+    bodies : iterable of int
+        NAIF IDs of the bodies (e.g., 10, 299, 301 and 399 for the Sun, Venus, Moon and Earth).
+    et_start : float
+        Start of the time span (ET).
+    et_end : float
+        End of the time span (ET).
+    ref : str, optional
+        Inertial reference frame. The default is 'J2000'.
+    margin : float, optional
+        Seconds that are added before et_start and after et_end, since light-time corrected
+        states are evaluated at earlier epochs. The default is one day.
+    cache_dir : str or pathlib.Path, optional
+        If given, the interpolants are stored in (and reused from) this directory, see
+        ephemeris.cached_ephemeris.
+    **fit_kwargs
+        See ephemeris.ChebyshevEphemeris.fit. The default velocity tolerance is 1e-6 km/s, since
+        the velocities only enter the stellar aberration (v / c).
+
+    Returns
+    -------
+    states : dict
+        State function per NAIF ID (the state method of the interpolant).
+    """
+    et_start, et_end = et_start - margin, et_end + margin
+    fit_kwargs.setdefault("vel_tol", 1e-6)
+
+    states = {}
+    for body in bodies:
+        if cache_dir is None:
+            interp = ephemeris.ChebyshevEphemeris.fit(body, et_start, et_end, observer=0, ref=ref,
+                                                      **fit_kwargs)
+        else:
+            interp = ephemeris.cached_ephemeris(pathlib.Path(cache_dir) / f"{body}_{ref}.npz",
+                                                body, et_start, et_end, observer=0, ref=ref,
+                                                **fit_kwargs)
+        states[body] = interp.state
+    return states
+
+
+def _check_abcorr(abcorr: str) -> str:
+    """Normalise an aberration correction string and check that it is supported."""
+    abcorr = abcorr.upper().replace(" ", "")
+    if abcorr not in ABCORRS:
+        raise ValueError(f"Unsupported aberration correction '{abcorr}', use one of {ABCORRS}")
+    return abcorr
+
+
+def _stellar_aberration(pos: np.ndarray, obs_vel: np.ndarray) -> np.ndarray:
+    """
+    Apply the stellar aberration correction to position vectors, like spiceypy.stelab.
+
+    The vectors are rotated towards the observer's velocity about u x v / c by the angle
+    asin(|u x v / c|), where u is the unit vector of the position.
+    """
+    unit = pos / np.linalg.norm(pos, axis=-1, keepdims=True)
+    axis = np.cross(unit, obs_vel / spiceypy.clight())
+    sin_phi = np.linalg.norm(axis, axis=-1, keepdims=True)
+    phi = np.arcsin(sin_phi)
+
+    # Rotation about an axis that is perpendicular to the vector (Rodrigues' formula without the
+    # parallel term)
+    axis = np.divide(axis, sin_phi, out=np.zeros_like(axis), where=sin_phi > 0.0)
+    return pos * np.cos(phi) + np.cross(axis, pos) * np.sin(phi)
+
+
+def apparent_position(
+    target: StateFunc,
+    observer_state: np.ndarray,
+    et: np.ndarray,
+    abcorr: str = "LT+S",
+) -> t.Tuple[np.ndarray, np.ndarray]:
+    """
+    Position of a target relative to an observer, like spiceypy.spkezp for the reception case.
+
+    Parameters
+    ----------
+    target : callable
+        Barycentric state function of the target.
+    observer_state : numpy.ndarray
+        Barycentric states of the observer at et, shape et.shape + (6,).
+    et : numpy.ndarray
+        Epochs of observation (ET).
+    abcorr : str, optional
+        Aberration correction, one of ABCORRS. The default is 'LT+S'.
+
+    Returns
+    -------
+    position : numpy.ndarray
+        Observer-to-target vectors (km) with shape et.shape + (3,).
+    light_time : numpy.ndarray
+        One-way light time (s) between the observer and the target.
+    """
+    abcorr = _check_abcorr(abcorr)
+    et = np.asarray(et, dtype=np.float64)
+    obs_pos = observer_state[..., :3]
+
+    position = target(et)[..., :3] - obs_pos
+    light_time = np.linalg.norm(position, axis=-1) / spiceypy.clight()
+    if abcorr == "NONE":
+        return position, light_time
+
+    # One iteration for LT, up to _CN_MAX_ITER iterations (until convergence) for CN
+    converged = abcorr.startswith("CN")
+    for _ in range(_CN_MAX_ITER if converged else 1):
+        position = target(et - light_time)[..., :3] - obs_pos
+        new_light_time = np.linalg.norm(position, axis=-1) / spiceypy.clight()
+        change = np.max(np.abs(new_light_time - light_time), initial=0.0)
+        light_time = new_light_time
+        if change <= 1e-15 * np.max(light_time, initial=0.0):
+            break
+
+    if abcorr.endswith("+S"):
+        position = _stellar_aberration(position, observer_state[..., 3:])
+
+    return position, light_time
+
+
+def angle_between(vec_a: np.ndarray, vec_b: np.ndarray) -> np.ndarray:
+    """
+    Angle (rad) between two arrays of vectors, like spiceypy.vsep (precise for all angles).
+    """
+    unit_a = vec_a / np.linalg.norm(vec_a, axis=-1, keepdims=True)
+    unit_b = vec_b / np.linalg.norm(vec_b, axis=-1, keepdims=True)
+    acute = np.sum(unit_a * unit_b, axis=-1) > 0.0
+    return np.where(acute,
+                    2.0 * np.arcsin(np.clip(0.5 * np.linalg.norm(unit_a - unit_b, axis=-1), 0.0, 1.0)),
+                    np.pi - 2.0 * np.arcsin(np.clip(0.5 * np.linalg.norm(unit_a + unit_b, axis=-1),
+                                                    0.0, 1.0)))
+
+
+def phase_angle(
+    target: StateFunc,
+    illuminator: StateFunc,
+    observer: StateFunc,
+    et: np.ndarray,
+    abcorr: str = "LT+S",
+) -> np.ndarray:
+    """
+    Phase angle at the target between the illuminator and the observer, like spiceypy.phaseq.
+
+    The target's position is corrected for the light time to the observer; the illuminator's
+    position is seen from the target at the epoch the light left the target.
+
+    Parameters
+    ----------
+    target, illuminator, observer : callable
+        Barycentric state functions of the three bodies (see body_states).
+    et : array_like
+        Epochs of observation (ET).
+    abcorr : str, optional
+        Aberration correction, one of ABCORRS. The default is 'LT+S'.
+
+    Returns
+    -------
+    phase_angle : numpy.ndarray
+        Phase angles in radians, with the shape of et.
+    """
+    et = np.asarray(et, dtype=np.float64)
+    obs_to_target, light_time = apparent_position(target, observer(et), et, abcorr)
+
+    et_target = et - light_time if _check_abcorr(abcorr) != "NONE" else et
+    target_to_illum, _ = apparent_position(illuminator, target(et_target), et_target, abcorr)
+
+    return angle_between(-obs_to_target, target_to_illum)
+
+
+def separation_angle(
+    target_a: StateFunc,
+    target_b: StateFunc,
+    observer: StateFunc,
+    et: np.ndarray,
+    abcorr: str = "LT+S",
+) -> np.ndarray:
+    """
+    Angular separation of two targets as seen by an observer, e.g., the elongation of a planet
+    (target_b is the Sun). Both positions are corrected for their own light time.
+
+    Parameters
+    ----------
+    target_a, target_b, observer : callable
+        Barycentric state functions of the three bodies (see body_states).
+    et : array_like
+        Epochs of observation (ET).
+    abcorr : str, optional
+        Aberration correction, one of ABCORRS. The default is 'LT+S'.
+
+    Returns
+    -------
+    separation : numpy.ndarray
+        Angular separations in radians, with the shape of et.
+    """
+    et = np.asarray(et, dtype=np.float64)
+    observer_state = observer(et)
+    pos_a, _ = apparent_position(target_a, observer_state, et, abcorr)
+    pos_b, _ = apparent_position(target_b, observer_state, et, abcorr)
+    return angle_between(pos_a, pos_b)
+
+
+def all_of(
+    conditions: t.Sequence[t.Union[Condition, t.Callable[[np.ndarray], np.ndarray]]],
+) -> t.Callable[[np.ndarray], np.ndarray]:
+    """
+    Combine conditions into one vectorised predicate that holds if all of them hold.
+
+    Every condition is only evaluated at the epochs where all previous ones hold, so the cheapest
+    or most selective condition should come first.
+
+    Parameters
+    ----------
+    conditions : sequence
+        Condition tuples or vectorised predicates (functions of ET that return booleans).
+
+    Returns
+    -------
+    predicate : callable
+        Vectorised function of ET that returns a boolean array.
+    """
+    predicates = []
+    for condition in conditions:
+        if isinstance(condition, Condition):
+            if condition.relation not in _RELATIONS:
+                raise ValueError(f"Unknown relation '{condition.relation}', "
+                                 f"use one of {tuple(_RELATIONS)}")
+            predicates.append(lambda ets, cond=condition:
+                              _RELATIONS[cond.relation](np.asarray(cond.func(ets)), cond.value))
+        else:
+            predicates.append(condition)
+
+    def predicate(ets: np.ndarray) -> np.ndarray:
+        ets = np.asarray(ets, dtype=np.float64)
+        holds = np.ones(ets.shape, dtype=bool)
+        for pred in predicates:
+            idx = np.flatnonzero(holds)
+            if not idx.size:
+                break
+            holds.flat[idx] = np.asarray(pred(ets.flat[idx]), dtype=bool)
+        return holds
+
+    return predicate
+
+
+def find_windows(
+    conditions: t.Sequence[t.Union[Condition, t.Callable[[np.ndarray], np.ndarray]]],
+    et_start: float,
+    et_end: float,
+    step: float,
+    tol: float = 1.0,
+    min_duration: float = 0.0,
+) -> Windows:
+    """
+    Find the time windows where all conditions hold, e.g., observing windows.
+
+    The combined predicate (see all_of) is evaluated chunk-wise on a grid with the given step,
+    consecutive samples that fulfil it are merged into intervals, and the interval edges are
+    refined by bisection to tol. Windows (or gaps between windows) that are shorter than step may
+    be missed.
+
+    Parameters
+    ----------
+    conditions : sequence
+        Condition tuples or vectorised predicates.
+    et_start : float
+        Start of the search window (ET).
+    et_end : float
+        End of the search window (ET).
+    step : float
+        Coarse grid step in seconds.
+    tol : float, optional
+        Precision of the window edges in seconds. The default is 1.0.
+    min_duration : float, optional
+        Windows shorter than this (in seconds) are dropped. The default is 0.0.
+
+    Returns
+    -------
+    windows : Windows
+        Starts, ends and durations of the windows.
+    """
+    predicate = all_of(conditions)
+
+    def chunked(ets: np.ndarray) -> np.ndarray:
+        return np.concatenate([predicate(ets[i:i + _EVAL_CHUNK])
+                               for i in range(0, len(ets), _EVAL_CHUNK)] or [np.zeros(0, dtype=bool)])
+
+    starts, ends = events.find_intervals(chunked, et_start, et_end, step, tol)
+    durations = ends - starts
+
+    keep = durations >= min_duration
+    return Windows(starts[keep], ends[keep], durations[keep])
@@ -0,0 +1,481 @@
+# Standard libraries
+import collections
+import contextlib
+import functools
+import json
+import os
+import pathlib
+import sqlite3
+import sys
+import threading
+import time
+import typing as t
+import urllib.error
+
+# Installed libraries
+import numpy as np
+
+# Opt-in accounting of the hot paths: SPICE calls, SGP4 batches, HTTP fetches and database
+# operations. Every instrumented call records its latency and error code (if any) under a name such
+# as 'spiceypy.spkgeo' or 'sgp4.propagate_catalog'. Recording is off by default; while it is off,
+# an instrumented call costs one extra function call and a flag check. Set the environment variable
+# SPACE_SCIENCE_INSTRUMENTATION=1 (or call enable) to record, and export the results with
+# snapshot / to_json or as Prometheus text with to_prometheus. In a notebook, wrap a cell in
+# profile_cell to see where its time goes.
+
+# Latency percentiles are computed from the most recent samples of every call name
+RESERVOIR_SIZE = 10000
+
+# Quantiles of the JSON snapshot and of the Prometheus summaries
+QUANTILES = (0.5, 0.9, 0.99)
+
+# Prefix of the Prometheus metric names
+PROMETHEUS_PREFIX = "space_science"
+
+
+def _error_code(exc: BaseException) -> str:
+    """Short error code of an exception: the SPICE error, the SQLite error or the HTTP status."""
+    if getattr(exc, "short", None):
+        return str(exc.short)
+    if getattr(exc, "sqlite_errorname", None):
+        return str(exc.sqlite_errorname)
+    response = getattr(exc, "response", None)
+    if getattr(response, "status_code", None) is not None:
+        return f"HTTP {response.status_code}"
+    if isinstance(exc, urllib.error.HTTPError):
+        return f"HTTP {exc.code}"
+    return type(exc).__name__
+
+
+class _Metric:
+    """Counters of one call name."""
+
+    __slots__ = ("count", "total", "max", "samples", "errors")
+
+    def __init__(self, reservoir_size: int) -> None:
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.samples: t.Deque[float] = collections.deque(maxlen=reservoir_size)
+        self.errors: t.Counter[str] = collections.Counter()
+
+
+class Registry:
+    """
+    Thread-safe store of call counts, latencies and error codes per call name.
+
+    Parameters
+    ----------
+    reservoir_size : int, optional
+        Number of most recent latency samples per call name that the percentiles are computed
+        from. The default is RESERVOIR_SIZE.
+    """
+
+    def __init__(self, reservoir_size: int = RESERVOIR_SIZE) -> None:
+        self.reservoir_size = reservoir_size
+        self._metrics: t.Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def record(self, name: str, seconds: float, errors: t.Optional[t.Mapping[str, int]] = None) -> None:
+        """
+        Record one call.
+
+        Parameters
+        ----------
+        name : str
+            Call name, e.g., 'spiceypy.spkgeo'.
+        seconds : float
+            Latency of the call.
+        errors : mapping, optional
+            Number of occurrences per error code (e.g., the SGP4 error codes of a batch).
+        """
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = _Metric(self.reservoir_size)
+            metric.count += 1
+            metric.total += seconds
+            metric.max = max(metric.max, seconds)
+            metric.samples.append(seconds)
+            if errors:
+                metric.errors.update(errors)
+
+    def reset(self) -> None:
+        """Remove all recorded calls."""
+        with self._lock:
+            self._metrics.clear()
+
+    def snapshot(self) -> t.Dict[str, t.Dict[str, t.Any]]:
+        """
+        Summarise all recorded calls.
+
+        Returns
+        -------
+        snapshot : dict
+            Per call name: 'count', 'total_s', 'mean_s', 'max_s', the latency quantiles
+            ('p50_s', 'p90_s', 'p99_s') and 'errors' (occurrences per error code).
+        """
+        with self._lock:
+            metrics = {name: (metric.count, metric.total, metric.max, np.array(metric.samples),
+                              dict(metric.errors))
+                       for name, metric in self._metrics.items()}
+
+        summary = {}
+        for name, (count, total, max_s, samples, errors) in sorted(metrics.items()):
+            entry = {"count": count, "total_s": total, "mean_s": total / count, "max_s": max_s}
+            for quantile, value in zip(QUANTILES, np.quantile(samples, QUANTILES)):
+                entry[f"p{quantile * 100:g}_s"] = float(value)
+            entry["errors"] = errors
+            summary[name] = entry
+        return summary
+
+    def to_json(self, path: t.Optional[t.Union[str, pathlib.Path]] = None) -> str:
+        """Return the snapshot as a JSON string; it is also written to path if given."""
+        text = json.dumps({"created_unix": time.time(), "calls": self.snapshot()}, indent=2)
+        if path is not None:
+            pathlib.Path(path).write_text(text + "\n")
+        return text
+
+    def to_prometheus(self, prefix: str = PROMETHEUS_PREFIX) -> str:
+        """
+        Return the snapshot in the Prometheus text exposition format.
+
+        Latencies are exported as the summary <prefix>_call_duration_seconds and errors as the
+        counter <prefix>_call_errors_total, both labelled with the call name.
+        """
+        def label(value: str) -> str:
+            return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+        snapshot = self.snapshot()
+        duration, errors = f"{prefix}_call_duration_seconds", f"{prefix}_call_errors_total"
+        lines = [f"# HELP {duration} Latency of instrumented calls.", f"# TYPE {duration} summary"]
+        for name, entry in snapshot.items():
+            call = f'call="{label(name)}"'
+            for quantile in QUANTILES:
+                lines.append(f'{duration}{{{call},quantile="{quantile:g}"}} '
+                             f'{entry[f"p{quantile * 100:g}_s"]:.9g}')
+            lines.append(f"{duration}_sum{{{call}}} {entry['total_s']:.9g}")
+            lines.append(f"{duration}_count{{{call}}} {entry['count']}")
+
+        lines += [f"# HELP {errors} Errors of instrumented calls by error code.", f"# TYPE {errors} counter"]
+        for name, entry in snapshot.items():
+            for code, count in sorted(entry["errors"].items()):
+                lines.append(f'{errors}{{call="{label(name)}",code="{label(code)}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+    def report(self, top: int = 20, wall_s: t.Optional[float] = None, title: t.Optional[str] = None) -> str:
+        """Return a table of the top call names by cumulative time."""
+        snapshot = sorted(self.snapshot().items(), key=lambda item: -item[1]["total_s"])
+        header = title or "Instrumented calls"
+        if wall_s is not None:
+            header += f" (wall time {wall_s:.3f} s)"
+        lines = [header, f"{'call':<36} {'count':>9} {'total s':>9} {'mean us':>9} {'p50 us':>9} "
+                         f"{'p99 us':>9}  errors"]
+        for name, entry in snapshot[:top]:
+            errors = ", ".join(f"{code}: {count}" for code, count in entry["errors"].items())
+            lines.append(f"{name:<36} {entry['count']:>9} {entry['total_s']:>9.3f} "
+                         f"{entry['mean_s'] * 1e6:>9.1f} {entry['p50_s'] * 1e6:>9.1f} "
+                         f"{entry['p99_s'] * 1e6:>9.1f}  {errors}")
+        if len(snapshot) > top:
+            lines.append(f"... {len(snapshot) - top} more")
+        return "\n".join(lines)
+
+
+class Span:
+    """
+    Timer of one instrumented block, created by span. Errors that are not exceptions (e.g., SGP4
+    error codes or HTTP status codes) are added with error / error_codes.
+    """
+
+    __slots__ = ("name", "registry", "errors", "_start")
+
+    def __init__(self, name: str, registry: Registry) -> None:
+        self.name = name
+        self.registry = registry
+        self.errors: t.Optional[t.Counter[str]] = None
+        self._start = 0.0
+
+    def __enter__(self) -> "Span":
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback) -> bool:
+        seconds = time.perf_counter() - self._start
+        if exc is not None:
+            self.error(_error_code(exc))
+        self.registry.record(self.name, seconds, self.errors)
+        return False
+
+    def error(self, code: t.Any, count: int = 1) -> None:
+        """Count an error code."""
+        if self.errors is None:
+            self.errors = collections.Counter()
+        self.errors[str(code)] += count
+
+    def error_codes(self, codes: np.ndarray) -> None:
+        """Count the non-zero entries of an array of error codes (e.g., of SatrecArray.sgp4)."""
+        codes = np.asarray(codes)
+        failed = codes[codes != 0]
+        if failed.size:
+            for code, count in zip(*np.unique(failed, return_counts=True)):
+                self.error(int(code), int(count))
+
+
+class _NullSpan:
+    """Stand-in for Span while recording is off."""
+
+    __slots__ = ()
+
+    def __enter__(self) -> "_NullSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, traceback) -> bool:
+        return False
+
+    def error(self, code: t.Any, count: int = 1) -> None:
+        pass
+
+    def error_codes(self, codes: np.ndarray) -> None:
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+_registry = Registry()
+_enabled = os.environ.get("SPACE_SCIENCE_INSTRUMENTATION", "") not in ("", "0")
+
+# Original spiceypy functions that have been replaced by instrumented ones
+_spice_originals: t.Dict[str, t.Callable] = {}
+
+
+def enable() -> None:
+    """Start recording."""
+    global _enabled
+    _enabled = True
+
+
+def disable() -> None:
+    """Stop recording; the recorded calls are kept."""
+    global _enabled
+    _enabled = False
+
+
+def is_enabled() -> bool:
+    """True while calls are recorded."""
+    return _enabled
+
+
+def registry() -> Registry:
+    """The registry that calls are currently recorded in."""
+    return _registry
+
+
+def reset() -> None:
+    """Remove all recorded calls of the current registry."""
+    _registry.reset()
+
+
+def snapshot() -> t.Dict[str, t.Dict[str, t.Any]]:
+    """Summary of the current registry, see Registry.snapshot."""
+    return _registry.snapshot()
+
+
+def to_json(path: t.Optional[t.Union[str, pathlib.Path]] = None) -> str:
+    """JSON snapshot of the current registry, see Registry.to_json."""
+    return _registry.to_json(path)
+
+
+def to_prometheus(prefix: str = PROMETHEUS_PREFIX) -> str:
+    """Prometheus text of the current registry, see Registry.to_prometheus."""
+    return _registry.to_prometheus(prefix)
+
+
+def span(name: str) -> t.Union[Span, _NullSpan]:
+    """
+    Time a block of code under a call name.
+
+    Exceptions raised in the block are recorded with their error code and re-raised.
+
+    Parameters
+    ----------
+    name : str
+        Call name, e.g., 'sgp4.propagate_catalog'.
+
+    Returns
+    -------
+    span : Span
+        Context manager; a no-op while recording is off.
+
+    Examples
+    --------
+    >>> with span("sgp4.batch") as timer:
+    ...     e, r, v = satellites.sgp4(jd, fr)
+    ...     timer.error_codes(e)
+    """
+    return Span(name, _registry) if _enabled else _NULL_SPAN
+
+
+def timed(function: t.Callable, name: t.Optional[str] = None) -> t.Callable:
+    """
+    Wrap a function so that its calls are recorded under name (default: module.qualname).
+
+    While recording is off, the wrapper only adds one function call and a flag check.
+    """
+    name = name or f"{function.__module__}.{function.__qualname__}"
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        if not _enabled:
+            return function(*args, **kwargs)
+        start = time.perf_counter()
+        try:
+            result = function(*args, **kwargs)
+        except Exception as exc:
+            _registry.record(name, time.perf_counter() - start, {_error_code(exc): 1})
+            raise
+        _registry.record(name, time.perf_counter() - start)
+        return result
+
+    return wrapper
+
+
+def instrument_spiceypy(names: t.Optional[t.Iterable[str]] = None) -> t.List[str]:
+    """
+    Replace spiceypy functions by instrumented ones (recorded as 'spiceypy.<name>').
+
+    Only calls through the spiceypy package (spiceypy.spkgeo(...)) are recorded, which is how the
+    notebooks and the auxiliary modules call SPICE; functions imported with 'from spiceypy import'
+    before this call are not affected.
+
+    Parameters
+    ----------
+    names : iterable of str, optional
+        Functions to instrument. The default is every public function of spiceypy.
+
+    Returns
+    -------
+    wrapped : list of str
+        Names of the functions that have been instrumented by this call.
+    """
+    import spiceypy
+
+    if names is None:
+        names = [name for name, value in vars(spiceypy).items()
+                 if not name.startswith("_") and callable(value)
+                 and getattr(value, "__module__", "") == "spiceypy.spiceypy"]
+
+    wrapped = []
+    for name in names:
+        if name in _spice_originals:
+            continue
+        original = getattr(spiceypy, name)
+        _spice_originals[name] = original
+        setattr(spiceypy, name, timed(original, f"spiceypy.{name}"))
+        wrapped.append(name)
+    return wrapped
+
+
+def uninstrument_spiceypy(names: t.Optional[t.Iterable[str]] = None) -> None:
+    """Restore the original spiceypy functions (default: all instrumented ones)."""
+    import spiceypy
+
+    for name in list(_spice_originals) if names is None else names:
+        original = _spice_originals.pop(name, None)
+        if original is not None:
+            setattr(spiceypy, name, original)
+
+
+def instrument_session(session: t.Any, name: str = "http") -> t.Any:
+    """
+    Record every request of a requests.Session under name.
+
+    Responses with a status of 400 or higher are counted as errors ('HTTP <status>'), as are
+    exceptions (timeouts, connection errors). Returns the session.
+    """
+    if getattr(session, "_instrumented_as", None) is not None:
+        return session
+    request = session.request
+
+    def instrumented_request(method, url, *args, **kwargs):
+        if not _enabled:
+            return request(method, url, *args, **kwargs)
+        with span(name) as timer:
+            response = request(method, url, *args, **kwargs)
+            if response.status_code >= 400:
+                timer.error(f"HTTP {response.status_code}")
+            return response
+
+    session.request = instrumented_request
+    session._instrumented_as = name
+    return session
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    """
+    SQLite connection that records execute, executemany, executescript and commit as
+    'sqlite.<method>'. Pass it as the factory of sqlite3.connect. Statements executed through
+    cursor objects are not recorded.
+    """
+
+    def execute(self, sql, parameters=(), /):
+        with span("sqlite.execute"):
+            return super().execute(sql, parameters)
+
+    def executemany(self, sql, parameters, /):
+        with span("sqlite.executemany"):
+            return super().executemany(sql, parameters)
+
+    def executescript(self, sql_script, /):
+        with span("sqlite.executescript"):
+            return super().executescript(sql_script)
+
+    def commit(self):
+        with span("sqlite.commit"):
+            return super().commit()
+
+
+@contextlib.contextmanager
+def profile_cell(
+    title: t.Optional[str] = None, spice: bool = True, top: int = 20, file: t.Optional[t.TextIO] = None
+) -> t.Iterator[Registry]:
+    """
+    Profile a block of code (e.g., the body of a notebook cell).
+
+    Calls are recorded in a new registry (independent of the global one and of enable/disable) and
+    all spiceypy functions are instrumented for the duration of the block. Afterwards a table of the
+    top calls by cumulative time is printed.
+
+    Parameters
+    ----------
+    title : str, optional
+        Title of the printed table.
+    spice : bool, optional
+        Instrument the spiceypy functions. The default is True.
+    top : int, optional
+        Number of call names in the table. The default is 20.
+    file : file-like, optional
+        Output of the table. The default is sys.stdout.
+
+    Yields
+    ------
+    registry : Registry
+        The registry of the block, e.g., for registry.to_json() after the block.
+
+    Examples
+    --------
+    >>> with profile_cell("SOI search"):
+    ...     for et in ets:
+    ...         spiceypy.spkgeo(5, et, "ECLIPJ2000", 10)
+    """
+    global _registry, _enabled
+    previous = _registry, _enabled
+    cell_registry = Registry()
+    _registry, _enabled = cell_registry, True
+    wrapped = instrument_spiceypy() if spice else []
+    start = time.perf_counter()
+    try:
+        yield cell_registry
+    finally:
+        wall_s = time.perf_counter() - start
+        uninstrument_spiceypy(wrapped)
+        _registry, _enabled = previous
+        print(cell_registry.report(top, wall_s, title), file=file or sys.stdout)
@@ -0,0 +1,350 @@
+# Standard libraries
+import pathlib
+import sqlite3
+import typing as t
+
+# Installed libraries
+import numpy as np
+import pandas as pd
+
+# Local modules
+import comet_ingest
+
+# Two-body propagation of many orbits to many epochs. The notebooks turn one element set at a time
+# into a state vector with spiceypy.conics, i.e., one SPICE call per object and epoch. Here, the
+# same elements (conics order: perihelion, eccentricity, inclination, longitude of the ascending
+# node, argument of perihelion, mean anomaly, epoch, GM) are propagated for all objects and epochs
+# at once with the universal-variable formulation of Kepler's equation, which covers elliptic,
+# parabolic and hyperbolic orbits without case distinctions near e = 1. The work is split into
+# blocks of at most _CHUNK_STATES states, so the memory of the intermediate arrays is bounded; the
+# results can be written into a memory-mapped array or reduced block by block (iter_propagate).
+
+# Gravitational parameter of the Sun (km^3/s^2), as in sky_map
+GM_SUN = 1.32712440041e11
+
+# Number of states that are computed per block
+_CHUNK_STATES = 1 << 18
+
+# Stumpff functions are evaluated by their series for |z| < _SERIES_LIMIT (avoids cancellation)
+_SERIES_LIMIT = 1.0
+_SERIES_TERMS = 12
+
+# Iteration limit of the Kepler equation solver (the bisection fallback converges long before)
+_MAX_ITER = 100
+
+# Columns of comets_main that are needed for the elements
+COMET_COLUMNS = ["NAME", "PERIHELION_AU", "ECCENTRICITY", "INCLINATION_DEG", "LONG_OF_ASC_NODE_DEG",
+                 "ARG_OF_PERIH_DEG", "MEAN_ANOMALY_DEG", "EPOCH_ET"]
+
+# Kilometres per AU (as in SPICE's convrt)
+_AU_KM = 149597870.7
+
+
+def comet_elements(comets_df: pd.DataFrame, gm: float = GM_SUN) -> np.ndarray:
+    """
+    Conics elements (ECLIPJ2000, w.r.t. the Sun) of comets_main rows of mpc_comets.db.
+
+    Parameters
+    ----------
+    comets_df : pandas.DataFrame
+        Rows with the columns of COMET_COLUMNS (except NAME). EPOCH_ET is the epoch of the mean
+        anomaly, i.e., the time of the perihelion passage for MEAN_ANOMALY_DEG = 0.
+    gm : float, optional
+        Gravitational parameter of the Sun in km^3/s^2. The default is GM_SUN.
+
+    Returns
+    -------
+    elements : numpy.ndarray
+        Elements with shape (N, 8), see spiceypy.conics: perihelion (km), eccentricity,
+        inclination, node, argument of perihelion, mean anomaly (rad), epoch (ET) and gm.
+    """
+    mean_anomaly = comets_df["MEAN_ANOMALY_DEG"] if "MEAN_ANOMALY_DEG" in comets_df else 0.0
+    return np.column_stack(np.broadcast_arrays(
+        comets_df["PERIHELION_AU"].to_numpy(dtype=np.float64) * _AU_KM,
+        comets_df["ECCENTRICITY"].to_numpy(dtype=np.float64),
+        np.radians(comets_df["INCLINATION_DEG"].to_numpy(dtype=np.float64)),
+        np.radians(comets_df["LONG_OF_ASC_NODE_DEG"].to_numpy(dtype=np.float64)),
+        np.radians(comets_df["ARG_OF_PERIH_DEG"].to_numpy(dtype=np.float64)),
+        np.radians(np.asarray(mean_anomaly, dtype=np.float64)),
+        comets_df["EPOCH_ET"].to_numpy(dtype=np.float64),
+        gm,
+    ))
+
+
+def load_comets(
+    db_path: t.Union[str, pathlib.Path] = comet_ingest.COMET_DB_PATH,
+    where: t.Optional[str] = None,
+) -> pd.DataFrame:
+    """
+    Read the columns COMET_COLUMNS of comets_main.
+
+    Parameters
+    ----------
+    db_path : str or pathlib.Path, optional
+        Path of the comet database. The default is databases/comets/mpc_comets.db.
+    where : str, optional
+        SQL condition, e.g., 'ECCENTRICITY < 1'. The default selects all rows.
+
+    Returns
+    -------
+    comets_df : pandas.DataFrame
+        One row per comet, ordered by NAME.
+    """
+    query = f"SELECT {', '.join(COMET_COLUMNS)} FROM comets_main"
+    if where:
+        query += f" WHERE {where}"
+    with sqlite3.connect(db_path) as con:
+        return pd.read_sql(query + " ORDER BY NAME", con)
+
+
+def _stumpff(z: np.ndarray) -> t.Tuple[np.ndarray, np.ndarray]:
+    """Stumpff functions C(z) = (1 - cos(sqrt(z))) / z and S(z) = (sqrt(z) - sin(sqrt(z))) / z^1.5."""
+    c_z = np.empty_like(z)
+    s_z = np.empty_like(z)
+
+    ell = z >= _SERIES_LIMIT
+    sqrt_z = np.sqrt(z[ell])
+    c_z[ell] = (1.0 - np.cos(sqrt_z)) / z[ell]
+    s_z[ell] = (sqrt_z - np.sin(sqrt_z)) / (z[ell] * sqrt_z)
+
+    hyp = z <= -_SERIES_LIMIT
+    sqrt_z = np.sqrt(-z[hyp])
+    c_z[hyp] = (np.cosh(sqrt_z) - 1.0) / -z[hyp]
+    s_z[hyp] = (np.sinh(sqrt_z) - sqrt_z) / (-z[hyp] * sqrt_z)
+
+    # C = sum (-z)^k / (2k + 2)!, S = sum (-z)^k / (2k + 3)!, evaluated with Horner's scheme
+    small = ~(ell | hyp)
+    z_small = z[small]
+    c_sum = np.zeros_like(z_small)
+    s_sum = np.zeros_like(z_small)
+    for k in range(_SERIES_TERMS, 0, -1):
+        c_sum = (1.0 - z_small * c_sum) / ((2 * k + 1) * (2 * k + 2))
+        s_sum = (1.0 - z_small * s_sum) / ((2 * k + 2) * (2 * k + 3))
+    c_z[small] = (1.0 - z_small * c_sum) / 2.0
+    s_z[small] = (1.0 - z_small * s_sum) / 6.0
+
+    return c_z, s_z
+
+
+def _solve_universal(
+    target: np.ndarray,
+    peri: np.ndarray,
+    ecc: np.ndarray,
+    alpha: np.ndarray,
+    guess: np.ndarray,
+    bound: np.ndarray,
+) -> np.ndarray:
+    """
+    Solve sqrt(GM) dt = e chi^3 S(alpha chi^2) + q chi for the universal anomaly chi.
+
+    This is the universal Kepler equation for a start at perihelion q, where the radial velocity
+    vanishes. Its derivative w.r.t. chi is the radius (> 0), so the root is unique and bracketed
+    by 0 and +-bound (the sign of target). Laguerre steps are used inside the bracket and
+    bisection otherwise.
+    """
+    lower = np.where(target < 0.0, -bound, 0.0)
+    upper = np.where(target < 0.0, 0.0, bound)
+    chi = np.clip(guess, lower, upper)
+
+    active = np.arange(len(chi))
+    for _ in range(_MAX_ITER):
+        x, q, e, a = chi[active], peri[active], ecc[active], alpha[active]
+        c_z, s_z = _stumpff(a * x * x)
+        func = e * x ** 3 * s_z + q * x - target[active]
+        deriv = q + e * x * x * c_z
+        deriv2 = e * x * (1.0 - a * x * x * s_z)
+
+        # Shrink the bracket
+        below = func < 0.0
+        lower[active] = np.where(below, x, lower[active])
+        upper[active] = np.where(below, upper[active], x)
+
+        # Laguerre step (n = 5); deriv is positive, so the sign in the denominator is +
+        step = 5.0 * func / (deriv + np.sqrt(np.abs(16.0 * deriv ** 2 - 20.0 * func * deriv2)))
+        new_x = x - step
+        outside = (new_x < lower[active]) | (new_x > upper[active])
+        new_x = np.where(outside, 0.5 * (lower[active] + upper[active]), new_x)
+
+        done = np.abs(new_x - x) <= 4.0 * np.finfo(np.float64).eps * np.abs(x)
+        chi[active] = new_x
+        active = active[~done]
+        if not active.size:
+            break
+
+    return chi
+
+
+def _propagate_block(elements: np.ndarray, ets: np.ndarray) -> np.ndarray:
+    """States (km, km/s) of all element sets (n, 8) at all epochs (m,), shape (n, m, 6)."""
+    peri, ecc, inc, lnode, argp, m0, t0, gm = (col[:, np.newaxis] for col in elements.T)
+
+    # Perihelion direction p and the direction of the perihelion velocity q in the reference frame
+    sin_node, cos_node = np.sin(lnode), np.cos(lnode)
+    sin_argp, cos_argp = np.sin(argp), np.cos(argp)
+    sin_inc, cos_inc = np.sin(inc), np.cos(inc)
+    p_vec = np.stack([cos_node * cos_argp - sin_node * sin_argp * cos_inc,
+                      sin_node * cos_argp + cos_node * sin_argp * cos_inc,
+                      sin_argp * sin_inc], axis=-1)
+    q_vec = np.stack([-cos_node * sin_argp - sin_node * cos_argp * cos_inc,
+                      -sin_node * sin_argp + cos_node * cos_argp * cos_inc,
+                      cos_argp * sin_inc], axis=-1)
+
+    # Inverse semi-major axis, mean motion and time since the perihelion passage, as in conics.
+    # Elliptic orbits are reduced to the revolution that is closest to the perihelion passage
+    alpha = (1.0 - ecc) / peri
+    elliptic = ecc < 1.0
+    mean_motion = np.where(ecc == 1.0, np.sqrt(gm / (2.0 * peri)) / peri,
+                           np.sqrt(gm * np.abs(alpha)) * np.abs(alpha))
+    dt = ets[np.newaxis, :] - t0 + m0 / mean_motion
+    period = 2.0 * np.pi / mean_motion
+    dt = np.where(elliptic, dt - period * np.round(dt / np.where(elliptic, period, 1.0)), dt)
+
+    # Initial guesses: Danby's start value of the eccentric anomaly for elliptic orbits, and the
+    # parabolic (Barker) solution for the others
+    sqrt_gm = np.sqrt(gm)
+    mean_anomaly = mean_motion * dt
+    ecc_anomaly = mean_anomaly + 0.85 * ecc * np.sign(np.sin(mean_anomaly))
+    barker = 1.5 * sqrt_gm * np.abs(dt) / (peri * np.sqrt(2.0 * peri))
+    cube = np.cbrt(barker + np.sqrt(1.0 + barker ** 2))
+    guess = np.where(elliptic, ecc_anomaly / np.sqrt(np.where(elliptic, alpha, 1.0)),
+                     np.sign(dt) * np.sqrt(2.0 * peri) * (cube - 1.0 / cube))
+
+    # Bounds of |chi|: |target| / q holds for all orbits (the radius is at least q). Far from the
+    # perihelion, |E| <= |M| + e (elliptic) and sinh(H) <= |M| / (e - 1) (hyperbolic) are much
+    # tighter and keep cosh and sinh of the bisection points finite. The bounds are widened a bit
+    # against rounding
+    inv_sqrt_alpha = 1.0 / np.sqrt(np.where(ecc == 1.0, 1.0, np.abs(alpha)))
+    bound = sqrt_gm * np.abs(dt) / peri
+    bound = np.where(elliptic, np.minimum(bound, (np.abs(mean_anomaly) + ecc) * inv_sqrt_alpha),
+                     bound)
+    bound = np.where(ecc > 1.0, np.minimum(bound, np.arcsinh(
+        np.abs(mean_anomaly) / np.where(ecc > 1.0, ecc - 1.0, 1.0)) * inv_sqrt_alpha), bound)
+    bound = bound * (1.0 + 1e-9)
+
+    shape = dt.shape
+
+    def full(arr: np.ndarray) -> np.ndarray:
+        return np.broadcast_to(arr, shape).ravel()
+
+    chi = _solve_universal(full(sqrt_gm * dt), full(peri), full(ecc), full(alpha), full(guess),
+                           full(bound)).reshape(shape)
+
+    # Lagrange coefficients for a start at perihelion (radial velocity 0)
+    z = alpha * chi ** 2
+    c_z, s_z = _stumpff(z.ravel())
+    c_z, s_z = c_z.reshape(shape), s_z.reshape(shape)
+    one_minus_zs = 1.0 - z * s_z
+    radius = peri + ecc * chi ** 2 * c_z
+    f = 1.0 - chi ** 2 * c_z / peri
+    g = peri * chi * one_minus_zs / sqrt_gm
+    f_dot = -sqrt_gm * chi * one_minus_zs / (radius * peri)
+    g_dot = 1.0 - chi ** 2 * c_z / radius
+
+    # Perihelion position peri * p and velocity v_peri * q
+    v_peri = np.sqrt(gm * (1.0 + ecc) / peri)
+    pos = (f * peri)[..., np.newaxis] * p_vec \
+        + (g * v_peri)[..., np.newaxis] * q_vec
+    vel = (f_dot * peri)[..., np.newaxis] * p_vec \
+        + (g_dot * v_peri)[..., np.newaxis] * q_vec
+    return np.concatenate([pos, vel], axis=-1)
+
+
+def iter_propagate(
+    elements: np.ndarray, ets: np.ndarray, chunk_states: int = _CHUNK_STATES
+) -> t.Iterator[t.Tuple[slice, slice, np.ndarray]]:
+    """
+    Propagate element sets block by block, e.g., to reduce the states without storing them all.
+
+    Parameters
+    ----------
+    elements : numpy.ndarray
+        Conics elements with shape (N, 8) (see comet_elements).
+    ets : numpy.ndarray
+        Epochs (ET), shape (M,).
+    chunk_states : int, optional
+        Maximum number of states per block. The default is _CHUNK_STATES.
+
+    Yields
+    ------
+    objects : slice
+        Rows of elements that the block covers.
+    epochs : slice
+        Epochs that the block covers.
+    states : numpy.ndarray
+        States (km, km/s) with shape (rows, epochs, 6).
+    """
+    elements = np.atleast_2d(np.asarray(elements, dtype=np.float64))
+    ets = np.atleast_1d(np.asarray(ets, dtype=np.float64))
+
+    epochs_per_block = max(1, min(len(ets), chunk_states))
+    objects_per_block = max(1, chunk_states // epochs_per_block)
+    for i in range(0, len(elements), objects_per_block):
+        objects = slice(i, min(i + objects_per_block, len(elements)))
+        for j in range(0, len(ets), epochs_per_block):
+            epochs = slice(j, min(j + epochs_per_block, len(ets)))
+            yield objects, epochs, _propagate_block(elements[objects], ets[epochs])
+
+
+def propagate(
+    elements: np.ndarray,
+    ets: t.Union[float, np.ndarray],
+    out: t.Optional[np.ndarray] = None,
+    chunk_states: int = _CHUNK_STATES,
+) -> np.ndarray:
+    """
+    Propagate element sets to epochs, like spiceypy.conics for every pair of both.
+
+    Parameters
+    ----------
+    elements : numpy.ndarray
+        Conics elements with shape (8,) or (N, 8) (see comet_elements).
+    ets : float or numpy.ndarray
+        Epochs (ET), shape (M,).
+    out : numpy.ndarray, optional
+        Array of shape (N, M, 6) that receives the states, e.g., a memory-mapped .npy file
+        (numpy.lib.format.open_memmap) for more states than fit into memory.
+    chunk_states : int, optional
+        Maximum number of states that are computed at once. The default is _CHUNK_STATES.
+
+    Returns
+    -------
+    states : numpy.ndarray
+        States (km, km/s) in the frame of the elements, shape (N, M, 6).
+    """
+    elements = np.atleast_2d(np.asarray(elements, dtype=np.float64))
+    ets = np.atleast_1d(np.asarray(ets, dtype=np.float64))
+    if out is None:
+        out = np.empty((len(elements), len(ets), 6))
+
+    for objects, epochs, states in iter_propagate(elements, ets, chunk_states):
+        out[objects, epochs] = states
+    return out
+
+
+def propagate_comets(
+    ets: t.Union[float, np.ndarray],
+    db_path: t.Union[str, pathlib.Path] = comet_ingest.COMET_DB_PATH,
+    where: t.Optional[str] = None,
+    out: t.Optional[np.ndarray] = None,
+) -> t.Tuple[np.ndarray, np.ndarray]:
+    """
+    Heliocentric states (ECLIPJ2000) of all comets of the database at the given epochs.
+
+    Parameters
+    ----------
+    ets : float or numpy.ndarray
+        Epochs (ET), shape (M,).
+    db_path, where
+        See load_comets.
+    out
+        See propagate.
+
+    Returns
+    -------
+    names : numpy.ndarray
+        Comet names, shape (N,).
+    states : numpy.ndarray
+        States (km, km/s) with shape (N, M, 6).
+    """
+    comets_df = load_comets(db_path, where)
+    return comets_df["NAME"].to_numpy(), propagate(comet_elements(comets_df), ets, out=out)
@@ -0,0 +1,251 @@
+# Standard libraries
+import concurrent.futures
+import functools
+import pathlib
+import re
+import typing as t
+
+# Installed libraries
+import spiceypy
+
+# Central SPICE kernel management. The notebooks used to clear the kernel pool and furnsh their
+# own lists of relative paths (or per-folder meta files whose relative paths only work from the
+# notebook folder). Here, kernels are resolved from the repository's kernels/ tree, every file is
+# loaded only once and a process pool can be created whose workers start with the same kernels
+# loaded. CSPICE is not thread-safe, so SPICE work can only be parallelised over processes.
+
+# The kernels/ folder next to this auxiliary/ folder
+KERNELS_DIR = pathlib.Path(__file__).resolve().parents[1] / "kernels"
+
+# Sub-directory of kernels/ per file extension (lower case)
+KERNEL_TYPE_DIRS = {
+    ".bsp": "spk",
+    ".bpc": "pck",
+    ".tpc": "pck",
+    ".tls": "lsk",
+    ".tf": "fk",
+    ".tm": "mk",
+    ".bds": "dsk",
+    ".obj": "dsk",
+}
+
+
+def kernel_path(name: str, kernel_type: t.Optional[str] = None) -> pathlib.Path:
+    """
+    Resolve a kernel file name within the kernels/ tree.
+
+    Parameters
+    ----------
+    name : str
+        File name (e.g., 'de432s.bsp'), a path relative to kernels/ (e.g., 'spk/de432s.bsp') or
+        an absolute / relative file path that exists.
+    kernel_type : str, optional
+        Sub-directory of kernels/ (e.g., 'spk', 'lsk', 'misc'). Derived from the file extension
+        if not given; if the file is not found there, the whole tree is searched.
+
+    Returns
+    -------
+    path : pathlib.Path
+        Absolute path of the kernel.
+    """
+    path = pathlib.Path(name)
+    if path.is_file():
+        return path.resolve()
+    if (KERNELS_DIR / path).is_file():
+        return (KERNELS_DIR / path).resolve()
+
+    kernel_type = kernel_type or KERNEL_TYPE_DIRS.get(path.suffix.lower())
+    if kernel_type is not None and (KERNELS_DIR / kernel_type / path.name).is_file():
+        return (KERNELS_DIR / kernel_type / path.name).resolve()
+
+    matches = sorted(KERNELS_DIR.rglob(path.name))
+    if not matches:
+        raise FileNotFoundError(f"Kernel {name} not found in {KERNELS_DIR}")
+    return matches[0].resolve()
+
+
+def loaded_kernels() -> t.List[str]:
+    """
+    Return the files in the kernel pool, in load order.
+
+    The kernel pool itself is queried (instead of keeping a separate list), so kernels loaded or
+    cleared by other code are reflected as well.
+    """
+    kernels = []
+    for i in range(spiceypy.ktotal("ALL")):
+        file, file_type, _, _ = spiceypy.kdata(i, "ALL")
+
+        # Meta kernels are represented by the files they load
+        if file_type != "META":
+            kernels.append(file)
+    return kernels
+
+
+def load(*names: str) -> t.List[str]:
+    """
+    Load kernels into the kernel pool, skipping files that are already loaded.
+
+    Parameters
+    ----------
+    *names : str
+        Kernel names or paths, see kernel_path.
+
+    Returns
+    -------
+    kernels : list of str
+        Absolute paths of the requested kernels.
+    """
+    loaded = {str(pathlib.Path(kernel).resolve()) for kernel in loaded_kernels()}
+
+    kernels = []
+    for name in names:
+        path = str(kernel_path(name))
+        if path not in loaded:
+            spiceypy.furnsh(path)
+            loaded.add(path)
+        kernels.append(path)
+
+    return kernels
+
+
+def meta_kernel_files(meta_path: t.Union[str, pathlib.Path]) -> t.List[str]:
+    """
+    Read the KERNELS_TO_LOAD entries of a meta kernel, resolved relative to the meta kernel.
+
+    SPICE resolves relative paths of a meta kernel w.r.t. the current working directory, which
+    breaks as soon as a notebook is not run from its own folder. The entries are therefore
+    resolved here relative to the meta kernel's folder (falling back to the kernels/ tree).
+
+    Parameters
+    ----------
+    meta_path : str or pathlib.Path
+        Path of the meta kernel (e.g., a notebook's kernel_meta.txt).
+
+    Returns
+    -------
+    kernels : list of str
+        Absolute paths of the listed kernels.
+    """
+    meta_path = pathlib.Path(meta_path).resolve()
+    text = meta_path.read_text()
+
+    # Only the \begindata blocks contain assignments
+    data = "".join(re.findall(r"\\begindata(.*?)(?:\\begintext|$)", text, flags=re.S))
+    match = re.search(r"KERNELS_TO_LOAD\s*=\s*\((.*?)\)", data, flags=re.S)
+    if match is None:
+        return []
+
+    kernels = []
+    for entry in re.findall(r"'([^']*)'", match.group(1)):
+        candidate = meta_path.parent / entry
+        kernels.append(str(candidate.resolve()) if candidate.is_file() else str(kernel_path(entry)))
+    return kernels
+
+
+def load_meta(meta_path: t.Union[str, pathlib.Path]) -> t.List[str]:
+    """Load all kernels of a meta kernel (see meta_kernel_files), each file only once."""
+    return load(*meta_kernel_files(meta_path))
+
+
+def clear() -> None:
+    """Unload all kernels."""
+    spiceypy.kclear()
+
+
+@functools.lru_cache(maxsize=None)
+def _spk_coverage_cached(path: str, mtime_ns: int, idcode: int) -> t.Tuple[t.Tuple[float, float], ...]:
+    cover = spiceypy.spkcov(path, idcode)
+    n_intervals = spiceypy.wncard(cover)
+    return tuple(spiceypy.wnfetd(cover, i) for i in range(n_intervals))
+
+
+def spk_bodies(name: str) -> t.List[int]:
+    """Return the NAIF IDs of all bodies in an SPK file."""
+    return list(spiceypy.spkobj(str(kernel_path(name))))
+
+
+def spk_coverage(name: str, idcode: int) -> t.List[t.Tuple[float, float]]:
+    """
+    Return the coverage windows (ET start, ET end) of a body in an SPK file.
+
+    The result is cached per file (and modification time), so repeated queries do not re-read
+    the file.
+    """
+    path = kernel_path(name)
+    return list(_spk_coverage_cached(str(path), path.stat().st_mtime_ns, idcode))
+
+
+def coverage(idcode: int) -> t.List[t.Tuple[float, float]]:
+    """
+    Return the coverage windows of a body over all loaded SPK kernels, merged and sorted.
+
+    Parameters
+    ----------
+    idcode : int
+        NAIF ID of the body.
+
+    Returns
+    -------
+    windows : list of tuple
+        Sorted, non-overlapping (ET start, ET end) windows.
+    """
+    windows = []
+    for i in range(spiceypy.ktotal("SPK")):
+        path = spiceypy.kdata(i, "SPK")[0]
+        windows += spk_coverage(path, idcode)
+
+    merged = []
+    for start, end in sorted(windows):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def covers(idcode: int, et_start: float, et_end: float) -> bool:
+    """Return True if the loaded SPK kernels cover a body for the whole span [et_start, et_end]."""
+    return any(start <= et_start and et_end <= end for start, end in coverage(idcode))
+
+
+def _init_worker(kernels: t.Sequence[str]) -> None:
+    # Runs once in every worker process before it accepts tasks
+    spiceypy.kclear()
+    for kernel in kernels:
+        spiceypy.furnsh(kernel)
+
+
+def process_pool(
+    max_workers: t.Optional[int] = None, kernels: t.Optional[t.Sequence[str]] = None
+) -> concurrent.futures.ProcessPoolExecutor:
+    """
+    Create a process pool whose workers have the same kernels loaded.
+
+    Parameters
+    ----------
+    max_workers : int, optional
+        Number of worker processes. The default is the number of CPUs.
+    kernels : sequence of str, optional
+        Kernel names or paths for the workers. The default is the current kernel pool of this
+        process (in load order).
+
+    Returns
+    -------
+    executor : concurrent.futures.ProcessPoolExecutor
+        Executor; use it as a context manager and submit / map module-level functions that call
+        spiceypy.
+
+    Examples
+    --------
+    >>> kernel_manager.load("naif0012.tls", "de432s.bsp")
+    >>> with kernel_manager.process_pool() as pool:
+    ...     ets = list(pool.map(spiceypy.utc2et, ["2000-01-01", "2020-01-01"]))
+    """
+    if kernels is None:
+        kernels = loaded_kernels()
+    else:
+        kernels = [str(kernel_path(kernel)) for kernel in kernels]
+
+    return concurrent.futures.ProcessPoolExecutor(
+        max_workers=max_workers, initializer=_init_worker, initargs=(list(kernels),)
+    )
@@ -0,0 +1,649 @@
+# Standard libraries
+import argparse
+import concurrent.futures
+import pathlib
+import typing as t
+
+# Installed libraries
+import numpy as np
+import pandas as pd
+import spiceypy
+
+# Local modules
+import comet_ingest
+import ephemeris
+import events
+import kepler
+import kernel_manager
+import time_scales
+
+# Screening of whole object populations against the planets. The notebooks judge close encounters
+# one object at a time, from hand-picked dates or from the Tisserand parameter. Here, the minimum
+# orbit intersection distance (MOID) of every orbit (comets of mpc_comets.db, NEO lists of the
+# SBDB) w.r.t. the Earth and Jupiter is computed for all objects at once: the distance of both
+# orbits is sampled on a grid of true anomalies, and every local minimum of the grid is refined
+# with Newton steps on the analytic gradient and Hessian. Only the objects whose MOID is below a
+# threshold can come close to the planet at all; for these candidates the close approaches within
+# a time window are searched with kepler.propagate and the planets' Chebyshev interpolants
+# (events.find_minima). Both stages are split over a process pool, and the result is a table of
+# encounters, ranked by their distance in Hill radii of the planet.
+
+# NAIF IDs of the planets that are screened (Jupiter: barycentre, as in de432s)
+PLANETS = {"EARTH": 399, "JUPITER": 5}
+
+# Gravitational parameters (km^3/s^2) of the planets, for their Hill radii
+PLANET_GM = {"EARTH": 398600.435436, "JUPITER": 126712764.8}
+
+# MOIDs (AU) below which an object is a close-approach candidate. 0.05 AU is the MOID limit of the
+# potentially hazardous asteroids; 0.5 AU is about 1.4 Hill radii of Jupiter
+MOID_THRESHOLDS_AU = {"EARTH": 0.05, "JUPITER": 0.5}
+
+# Number of true anomalies per orbit of the coarse MOID grid
+_GRID = 64
+
+# Oversampling of the grid in the true anomaly from which the arc length is interpolated
+_ARC_OVERSAMPLE = 16
+
+# Number of grid points (objects x object anomalies x planet anomalies) per block
+_CHUNK_POINTS = 1 << 20
+
+# Newton iterations of the MOID refinement and the number of step halvings per iteration
+_NEWTON_ITER = 30
+_MAX_HALVINGS = 16
+
+# Objects per task of the process pool
+_TASK_OBJECTS = 256
+
+# Kilometres per AU (as in SPICE's convrt)
+_AU_KM = kepler._AU_KM
+
+# The planet interpolants and the search window of a worker process, set by the pool initializer
+_WORKER: t.Dict[str, t.Any] = {}
+
+
+def sbdb_elements(objects_df: pd.DataFrame, gm: float = kepler.GM_SUN) -> np.ndarray:
+    """
+    Conics elements (ECLIPJ2000, w.r.t. the Sun) of SBDB query results, e.g., a NEO list.
+
+    Parameters
+    ----------
+    objects_df : pandas.DataFrame
+        Rows with the SBDB fields q (AU), e, i, om, w (deg) and either tp (time of perihelion,
+        JD TDB) or ma (mean anomaly, deg) and epoch (JD TDB). The values may be strings, as
+        returned by the SBDB query API.
+    gm : float, optional
+        Gravitational parameter of the Sun in km^3/s^2. The default is kepler.GM_SUN.
+
+    Returns
+    -------
+    elements : numpy.ndarray
+        Elements with shape (N, 8), see kepler.comet_elements.
+    """
+    def column(name: str) -> np.ndarray:
+        return objects_df[name].to_numpy(dtype=np.float64)
+
+    if "tp" in objects_df:
+        mean_anomaly, epoch_jd = 0.0, column("tp")
+    elif "ma" in objects_df and "epoch" in objects_df:
+        mean_anomaly, epoch_jd = np.radians(column("ma")), column("epoch")
+    else:
+        raise ValueError("The SBDB fields tp, or ma and epoch, are needed for the orbit phase")
+
+    return np.column_stack(np.broadcast_arrays(
+        column("q") * _AU_KM,
+        column("e"),
+        np.radians(column("i")),
+        np.radians(column("om")),
+        np.radians(column("w")),
+        mean_anomaly,
+        (epoch_jd - time_scales.J2000_JD) * 86400.0,
+        gm,
+    ))
+
+
+def planet_ephemerides(
+    et_start: float,
+    et_end: float,
+    planets: t.Iterable[str] = tuple(PLANETS),
+    cache_dir: t.Optional[t.Union[str, pathlib.Path]] = None,
+    **fit_kwargs: t.Any,
+) -> t.Dict[str, ephemeris.ChebyshevEphemeris]:
+    """
+    Fit the heliocentric states (ECLIPJ2000) of the planets from the loaded SPICE kernels.
+
+    Parameters
+    ----------
+    et_start : float
+        Start of the time span (ET).
+    et_end : float
+        End of the time span (ET).
+    planets : iterable of str, optional
+        Keys of PLANETS. The default is all of them.
+    cache_dir : str or pathlib.Path, optional
+        If given, the interpolants are stored in (and reused from) this directory, see
+        ephemeris.cached_ephemeris.
+    **fit_kwargs
+        See ephemeris.ChebyshevEphemeris.fit. The default velocity tolerance is 1e-6 km/s, since
+        the velocities only enter the relative speeds of the encounters.
+
+    Returns
+    -------
+    ephemerides : dict
+        Interpolant per planet name.
+    """
+    fit_kwargs.setdefault("vel_tol", 1e-6)
+
+    ephemerides = {}
+    for planet in planets:
+        if cache_dir is None:
+            ephemerides[planet] = ephemeris.ChebyshevEphemeris.fit(PLANETS[planet], et_start,
+                                                                   et_end, **fit_kwargs)
+        else:
+            ephemerides[planet] = ephemeris.cached_ephemeris(
+                pathlib.Path(cache_dir) / f"{PLANETS[planet]}_ECLIPJ2000.npz", PLANETS[planet],
+                et_start, et_end, **fit_kwargs)
+    return ephemerides
+
+
+def planet_elements(
+    planet_ephemeris: ephemeris.ChebyshevEphemeris, et: float, gm: float = kepler.GM_SUN
+) -> np.ndarray:
+    """
+    Osculating conics elements of a planet at an epoch, from its heliocentric interpolant.
+
+    Parameters
+    ----------
+    planet_ephemeris : ephemeris.ChebyshevEphemeris
+        Heliocentric interpolant of the planet (see planet_ephemerides).
+    et : float
+        Epoch (ET) of the osculating elements.
+    gm : float, optional
+        Gravitational parameter of the Sun in km^3/s^2. The default is kepler.GM_SUN.
+
+    Returns
+    -------
+    elements : numpy.ndarray
+        Elements with shape (8,), see spiceypy.oscelt.
+    """
+    return np.asarray(spiceypy.oscelt(planet_ephemeris.state(et), et, gm))
+
+
+def hill_radius(planet: str, elements: np.ndarray) -> float:
+    """Hill radius (km) of a planet, from the semi-major axis of its osculating elements."""
+    semi_major_axis = elements[0] / (1.0 - elements[1])
+    return semi_major_axis * np.cbrt(PLANET_GM[planet] / (3.0 * kepler.GM_SUN))
+
+
+def _orbit_frame(elements: np.ndarray) -> t.Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Semi-latus rectum, eccentricity and the perihelion and perihelion velocity directions."""
+    peri, ecc, inc, lnode, argp = elements[..., :5].T
+    sin_node, cos_node = np.sin(lnode), np.cos(lnode)
+    sin_argp, cos_argp = np.sin(argp), np.cos(argp)
+    sin_inc, cos_inc = np.sin(inc), np.cos(inc)
+    p_vec = np.stack([cos_node * cos_argp - sin_node * sin_argp * cos_inc,
+                      sin_node * cos_argp + cos_node * sin_argp * cos_inc,
+                      sin_argp * sin_inc], axis=-1)
+    q_vec = np.stack([-cos_node * sin_argp - sin_node * cos_argp * cos_inc,
+                      -sin_node * sin_argp + cos_node * cos_argp * cos_inc,
+                      cos_argp * sin_inc], axis=-1)
+    return peri * (1.0 + ecc), ecc, p_vec, q_vec
+
+
+def _orbit_point(
+    slr: np.ndarray, ecc: np.ndarray, p_vec: np.ndarray, q_vec: np.ndarray, nu: np.ndarray
+) -> t.Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Position on a conic at the true anomaly nu and its first and second derivatives w.r.t. nu.
+
+    slr, ecc and nu broadcast against each other; p_vec and q_vec have one more axis (3).
+    With u = cos(nu) p + sin(nu) q and w = du / dnu, r = rho u and rho = slr / (1 + e cos(nu)):
+    r' = rho' u + rho w and r'' = (rho'' - rho) u + 2 rho' w.
+    """
+    cos_nu, sin_nu = np.cos(nu), np.sin(nu)
+    rho = slr / (1.0 + ecc * cos_nu)
+    rho_1 = rho * rho * ecc * sin_nu / slr
+    rho_2 = (2.0 * rho * rho_1 * ecc * sin_nu + rho * rho * ecc * cos_nu) / slr
+
+    u_vec = cos_nu[..., np.newaxis] * p_vec + sin_nu[..., np.newaxis] * q_vec
+    w_vec = -sin_nu[..., np.newaxis] * p_vec + cos_nu[..., np.newaxis] * q_vec
+    pos = rho[..., np.newaxis] * u_vec
+    deriv = rho_1[..., np.newaxis] * u_vec + rho[..., np.newaxis] * w_vec
+    deriv2 = (rho_2 - rho)[..., np.newaxis] * u_vec + (2.0 * rho_1)[..., np.newaxis] * w_vec
+    return pos, deriv, deriv2
+
+
+def _anomaly_limit(slr: np.ndarray, ecc: np.ndarray, r_max: float) -> np.ndarray:
+    """Largest |true anomaly| with a radius of at most r_max (pi for orbits that stay inside)."""
+    cos_lim = np.clip((slr / r_max - 1.0) / np.where(ecc > 0.0, ecc, 1.0), -1.0, 1.0)
+    return np.where(ecc > 0.0, np.arccos(cos_lim), np.pi)
+
+
+def _arc_length_grid(
+    slr: np.ndarray, ecc: np.ndarray, p_vec: np.ndarray, q_vec: np.ndarray,
+    nu_lim: np.ndarray, closed: np.ndarray, grid: int,
+) -> t.Tuple[np.ndarray, np.ndarray]:
+    """
+    True anomalies of grid points that are evenly spaced along the orbits, and their spacing.
+
+    Points that are evenly spaced in the true anomaly crowd at the perihelion of eccentric orbits
+    and leave gaps of several AU around the aphelion. The arc length is therefore computed on a
+    finer grid in the true anomaly (within +-nu_lim) and interpolated linearly.
+    """
+    n_fine = _ARC_OVERSAMPLE * grid
+    fine = np.linspace(-1.0, 1.0, n_fine + 1) * nu_lim[:, np.newaxis]
+    pos, _, _ = _orbit_point(slr[:, np.newaxis], ecc[:, np.newaxis], p_vec[:, np.newaxis],
+                             q_vec[:, np.newaxis], fine)
+    arc = np.cumsum(np.linalg.norm(np.diff(pos, axis=1), axis=-1), axis=1)
+    arc = np.concatenate([np.zeros((len(arc), 1)), arc], axis=1)
+
+    # Normalised arc length; orbits that are reduced to their perihelion (nu_lim = 0) keep the
+    # fine grid as it is
+    total = arc[:, -1:]
+    arc = np.divide(arc, total, out=np.tile(np.linspace(0.0, 1.0, n_fine + 1), (len(arc), 1)),
+                    where=total > 0.0)
+
+    # Closed orbits are periodic, arcs include both end points. All rows are interpolated with
+    # one searchsorted call, with the rows shifted apart by 2
+    frac = np.where(closed[:, np.newaxis], np.arange(grid) / grid, np.arange(grid) / (grid - 1))
+    shift = 2.0 * np.arange(len(arc))[:, np.newaxis]
+    idx = np.searchsorted((arc + shift).ravel(), (frac + shift).ravel(), side="right")
+    idx = np.clip(idx.reshape(frac.shape) - 1 - (n_fine + 1) * np.arange(len(arc))[:, np.newaxis],
+                  0, n_fine - 1)
+    arc_a = np.take_along_axis(arc, idx, axis=1)
+    arc_b = np.take_along_axis(arc, idx + 1, axis=1)
+    weight = np.divide(frac - arc_a, arc_b - arc_a, out=np.zeros_like(frac), where=arc_b > arc_a)
+    nu_a = np.take_along_axis(fine, idx, axis=1)
+    nu_obj = nu_a + weight * (np.take_along_axis(fine, idx + 1, axis=1) - nu_a)
+
+    # Spacing: the larger distance to both neighbours (across +-pi on closed orbits)
+    gaps = np.diff(nu_obj, axis=1)
+    wrap = np.where(closed, nu_obj[:, 0] + 2.0 * np.pi - nu_obj[:, -1], 0.0)[:, np.newaxis]
+    before = np.concatenate([np.where(closed[:, np.newaxis], wrap, gaps[:, :1]), gaps], axis=1)
+    after = np.concatenate([gaps, np.where(closed[:, np.newaxis], wrap, gaps[:, -1:])], axis=1)
+    return nu_obj, np.maximum(before, after)
+
+
+def _moid_block(
+    elements: np.ndarray, planet: np.ndarray, grid: int
+) -> t.Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """MOID (km) and the true anomalies of the object and the planet at it, for (n, 8) elements."""
+    slr, ecc, p_vec, q_vec = _orbit_frame(elements)
+    slr_p, ecc_p, p_vec_p, q_vec_p = _orbit_frame(planet)
+
+    # The object's orbit is sampled where its radius is at most twice the planet's aphelion
+    # distance: farther points are more than one aphelion distance away from the planet's orbit
+    r_max = 2.0 * slr_p / (1.0 - ecc_p)
+    nu_lim = _anomaly_limit(slr, ecc, r_max)
+    closed = nu_lim >= np.pi
+
+    # Coarse grid: even in the arc length for the object and in the true anomaly for the planet
+    nu_obj, spacing = _arc_length_grid(slr, ecc, p_vec, q_vec, nu_lim, closed, grid)
+    nu_pl = 2.0 * np.pi * np.arange(grid) / grid - np.pi
+    pos, _, _ = _orbit_point(slr[:, np.newaxis], ecc[:, np.newaxis], p_vec[:, np.newaxis],
+                             q_vec[:, np.newaxis], nu_obj)
+    pos_p, _, _ = _orbit_point(slr_p, ecc_p, p_vec_p, q_vec_p, nu_pl)
+    dist2 = np.sum((pos[:, :, np.newaxis, :] - pos_p[np.newaxis, np.newaxis]) ** 2, axis=-1)
+
+    # Local minima of the grid w.r.t. the four neighbours. The planet's anomaly is periodic; the
+    # ends of open arcs only have one neighbour in the object's anomaly
+    minimum = (dist2 <= np.roll(dist2, 1, axis=2)) & (dist2 <= np.roll(dist2, -1, axis=2))
+    prev_obj = np.roll(dist2, 1, axis=1)
+    next_obj = np.roll(dist2, -1, axis=1)
+    prev_obj[~closed, 0] = np.inf
+    next_obj[~closed, -1] = np.inf
+    minimum &= (dist2 <= prev_obj) & (dist2 <= next_obj)
+
+    # Orbits that start beyond r_max are represented by their perihelion only
+    minimum[nu_lim == 0.0, 1:] = False
+    rows, i, j = np.nonzero(minimum)
+
+    # Two minima closer than one grid cell (e.g., on both sides of the aphelion of a nearly
+    # tangent orbit) appear as one grid minimum. The refinement therefore also starts from both
+    # neighbours along the object's orbit, which descend to the minima on their side
+    rows, i, j = (np.repeat(arr, 3) for arr in (rows, i, j))
+    i = i + np.tile([-1, 0, 1], len(i) // 3)
+    i = np.where(closed[rows], i % grid, np.clip(i, 0, grid - 1))
+
+    # Newton refinement of all minima on D = |r - r_p|^2, with the steps limited to one grid cell
+    # and halved until D decreases (the Hessian is not positive definite everywhere)
+    x = np.stack([nu_obj[rows, i], nu_pl[j]], axis=-1)
+    max_step = np.stack([spacing[rows, i], np.full(len(rows), 2.0 * np.pi / grid)], axis=-1)
+
+    # The object's anomaly is bounded on open arcs only; on closed orbits it wraps around
+    upper = np.where(closed, np.inf, nu_lim)[rows]
+    lower = -upper
+    obj = (slr[rows], ecc[rows], p_vec[rows], q_vec[rows])
+
+    def evaluate(x: np.ndarray, idx: np.ndarray) -> t.Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        r_obj, d_obj, dd_obj = _orbit_point(*(arr[idx] for arr in obj), x[:, 0])
+        r_pl, d_pl, dd_pl = _orbit_point(slr_p, ecc_p, p_vec_p, q_vec_p, x[:, 1])
+        diff = r_obj - r_pl
+        grad = 2.0 * np.stack([np.sum(diff * d_obj, axis=-1), -np.sum(diff * d_pl, axis=-1)],
+                              axis=-1)
+        h_uu = 2.0 * (np.sum(d_obj * d_obj, axis=-1) + np.sum(diff * dd_obj, axis=-1))
+        h_vv = 2.0 * (np.sum(d_pl * d_pl, axis=-1) - np.sum(diff * dd_pl, axis=-1))
+        h_uv = -2.0 * np.sum(d_obj * d_pl, axis=-1)
+        hess = np.stack([np.stack([h_uu, h_uv], axis=-1), np.stack([h_uv, h_vv], axis=-1)], axis=-2)
+        return np.sum(diff * diff, axis=-1), grad, hess
+
+    value, grad, hess = evaluate(x, np.arange(len(x)))
+    active = np.arange(len(x))
+    for _ in range(_NEWTON_ITER):
+        if not active.size:
+            break
+
+        # At the end of an arc, the object's anomaly is kept fixed while D decreases outwards
+        g, h = grad[active].copy(), hess[active].copy()
+        nu = x[active, 0]
+        at_end = ((nu <= lower[active]) & (g[:, 0] > 0.0)) \
+            | ((nu >= upper[active]) & (g[:, 0] < 0.0))
+        g[at_end, 0] = 0.0
+        h[at_end, 0, 1] = h[at_end, 1, 0] = 0.0
+        h[at_end, 0, 0] = 1.0
+
+        # Newton step where the Hessian is positive definite. Elsewhere, the step combines the
+        # steepest descent with the direction of negative curvature (which leads away from saddle
+        # points), both in units of the grid spacing
+        det = h[:, 0, 0] * h[:, 1, 1] - h[:, 0, 1] ** 2
+        pos_def = (h[:, 0, 0] > 0.0) & (det > 0.0)
+        safe_det = np.where(pos_def, det, 1.0)
+        newton = -np.stack([h[:, 1, 1] * g[:, 0] - h[:, 0, 1] * g[:, 1],
+                            h[:, 0, 0] * g[:, 1] - h[:, 0, 1] * g[:, 0]], axis=-1) \
+            / safe_det[:, np.newaxis]
+
+        scale = max_step[active]
+        g_s = g * scale
+        h_s = h * scale[:, :, np.newaxis] * scale[:, np.newaxis, :]
+        low_eig = 0.5 * (h_s[:, 0, 0] + h_s[:, 1, 1]) \
+            - np.hypot(0.5 * (h_s[:, 0, 0] - h_s[:, 1, 1]), h_s[:, 0, 1])
+        vec_a = np.stack([h_s[:, 0, 1], low_eig - h_s[:, 0, 0]], axis=-1)
+        vec_b = np.stack([low_eig - h_s[:, 1, 1], h_s[:, 0, 1]], axis=-1)
+        norm_a = np.linalg.norm(vec_a, axis=-1, keepdims=True)
+        norm_b = np.linalg.norm(vec_b, axis=-1, keepdims=True)
+        curvature = np.where(norm_a >= norm_b, vec_a, vec_b) \
+            / np.maximum(np.maximum(norm_a, norm_b), 1e-300)
+        curvature *= np.where(np.sum(curvature * g_s, axis=-1, keepdims=True) > 0.0, -1.0, 1.0)
+        descent = -g_s / np.maximum(np.linalg.norm(g_s, axis=-1, keepdims=True), 1e-300)
+        step = np.where(pos_def[:, np.newaxis], newton, scale * (descent + curvature))
+        ratio = np.divide(max_step[active], np.abs(step), out=np.full_like(step, np.inf),
+                          where=step != 0.0)
+        step *= np.minimum(1.0, ratio.min(axis=-1))[:, np.newaxis]
+
+        # Halve the steps until D does not increase; steps that never succeed end the refinement
+        todo = np.ones(len(active), dtype=bool)
+        for _ in range(_MAX_HALVINGS):
+            idx = active[todo]
+            trial = x[idx] + step[todo]
+            trial[:, 0] = np.clip(trial[:, 0], lower[idx], upper[idx])
+            new_value, new_grad, new_hess = evaluate(trial, idx)
+            better = new_value <= value[idx]
+            accept = idx[better]
+            x[accept], value[accept] = trial[better], new_value[better]
+            grad[accept], hess[accept] = new_grad[better], new_hess[better]
+            todo[np.flatnonzero(todo)[better]] = False
+            step[todo] *= 0.5
+            if not todo.any():
+                break
+
+        converged = todo | np.all(np.abs(step) <= 1e-12, axis=-1)
+        active = active[~converged]
+
+    # Smallest refined minimum per object, with the anomalies in [-pi, pi)
+    x = np.mod(x + np.pi, 2.0 * np.pi) - np.pi
+    moid2 = np.full(len(elements), np.inf)
+    np.minimum.at(moid2, rows, value)
+    best = np.full(len(elements), -1)
+    best[rows[value == moid2[rows]]] = np.flatnonzero(value == moid2[rows])
+    return np.sqrt(moid2), x[best, 0], x[best, 1]
+
+
+def _moid_task(
+    args: t.Tuple[np.ndarray, np.ndarray, int]
+) -> t.Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    elements, planet, grid = args
+    block = max(1, _CHUNK_POINTS // (grid * grid))
+    results = [_moid_block(elements[i:i + block], planet, grid)
+               for i in range(0, len(elements), block)]
+    return tuple(np.concatenate(parts) for parts in zip(*results))
+
+
+def moid(
+    elements: np.ndarray,
+    planet: np.ndarray,
+    grid: int = _GRID,
+    max_workers: t.Optional[int] = 1,
+) -> t.Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Minimum orbit intersection distance of many orbits w.r.t. one planet's orbit.
+
+    The squared distance of both orbits is sampled on a grid of true anomalies; every local
+    minimum of the grid is refined by Newton's method, and the smallest one is the MOID. Orbits
+    that reach farther out than twice the planet's aphelion distance are only sampled inside this
+    radius, which does not change MOIDs below the planet's aphelion distance (larger values are
+    upper bounds).
+
+    Parameters
+    ----------
+    elements : numpy.ndarray
+        Conics elements with shape (8,) or (N, 8) (see kepler.comet_elements). Only the first five
+        (perihelion, eccentricity and the orientation angles) are used.
+    planet : numpy.ndarray
+        Elements of the planet's orbit (elliptic), shape (8,), e.g., from planet_elements.
+    grid : int, optional
+        Number of true anomalies per orbit of the coarse grid. The default is _GRID.
+    max_workers : int, optional
+        Number of worker processes; None uses all CPUs. The default is 1 (no pool).
+
+    Returns
+    -------
+    moid : numpy.ndarray
+        MOIDs (km), shape (N,).
+    nu_object, nu_planet : numpy.ndarray
+        True anomalies (rad) of the object and the planet at the MOID, shape (N,).
+    """
+    elements = np.atleast_2d(np.asarray(elements, dtype=np.float64))
+    planet = np.asarray(planet, dtype=np.float64)
+    tasks = [(elements[i:i + _TASK_OBJECTS], planet, grid)
+             for i in range(0, len(elements), _TASK_OBJECTS)]
+    if not tasks:
+        return np.empty(0), np.empty(0), np.empty(0)
+
+    if max_workers == 1:
+        results = list(map(_moid_task, tasks))
+    else:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=max_workers) as pool:
+            results = list(pool.map(_moid_task, tasks))
+    return tuple(np.concatenate(parts) for parts in zip(*results))
+
+
+def close_approaches(
+    elements: np.ndarray,
+    planet_ephemeris: ephemeris.ChebyshevEphemeris,
+    et_start: float,
+    et_end: float,
+    max_dist: float,
+    step: float = 21600.0,
+    tol: float = 1.0,
+) -> t.Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Close approaches of one object to a planet within a time window.
+
+    Parameters
+    ----------
+    elements : numpy.ndarray
+        Conics elements of the object, shape (8,) (ECLIPJ2000, w.r.t. the Sun).
+    planet_ephemeris : ephemeris.ChebyshevEphemeris
+        Heliocentric interpolant of the planet (ECLIPJ2000), covering the window.
+    et_start : float
+        Start of the window (ET).
+    et_end : float
+        End of the window (ET).
+    max_dist : float
+        Largest distance (km) of the approaches that are reported.
+    step : float, optional
+        Step (s) of the coarse grid. The default is 6 hours. An encounter is found as long as the
+        distance has a single minimum within two steps.
+    tol : float, optional
+        Precision (s) of the epochs of the approaches. The default is 1 second.
+
+    Returns
+    -------
+    ca_ets : numpy.ndarray
+        ETs of the closest approaches, ascending.
+    ca_dists : numpy.ndarray
+        Distances (km) at the closest approaches.
+    ca_speeds : numpy.ndarray
+        Relative speeds (km/s) at the closest approaches.
+    """
+    def distance(ets: np.ndarray) -> np.ndarray:
+        rel = kepler.propagate(elements, ets)[0, :, :3] - planet_ephemeris.position(ets)
+        return np.linalg.norm(rel, axis=-1)
+
+    ca_ets, ca_dists = events.find_minima(distance, et_start, et_end, step, tol)
+    close = ca_dists <= max_dist
+    ca_ets, ca_dists = ca_ets[close], ca_dists[close]
+    rel_vel = kepler.propagate(elements, ca_ets)[0, :, 3:] - planet_ephemeris.state(ca_ets)[:, 3:]
+    return ca_ets, ca_dists, np.linalg.norm(rel_vel, axis=-1)
+
+
+def _init_worker(
+    ephemerides: t.Dict[str, ephemeris.ChebyshevEphemeris], et_start: float, et_end: float,
+    step: float
+) -> None:
+    _WORKER.update(ephemerides=ephemerides, et_start=et_start, et_end=et_end, step=step)
+
+
+def _approach_task(
+    args: t.Tuple[int, str, np.ndarray, float]
+) -> t.List[t.Tuple[int, str, float, float, float]]:
+    row, planet, elements, max_dist = args
+    ca_ets, ca_dists, ca_speeds = close_approaches(
+        elements, _WORKER["ephemerides"][planet], _WORKER["et_start"], _WORKER["et_end"],
+        max_dist, _WORKER["step"])
+    return [(row, planet, *approach) for approach in zip(ca_ets, ca_dists, ca_speeds)]
+
+
+def screen(
+    names: t.Sequence[str],
+    elements: np.ndarray,
+    ephemerides: t.Dict[str, ephemeris.ChebyshevEphemeris],
+    et_start: float,
+    et_end: float,
+    thresholds_au: t.Optional[t.Dict[str, float]] = None,
+    step: float = 21600.0,
+    grid: int = _GRID,
+    max_workers: t.Optional[int] = None,
+) -> t.Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    MOID screening of a population and the close approaches of its candidates.
+
+    Parameters
+    ----------
+    names : sequence of str
+        Object names, length N.
+    elements : numpy.ndarray
+        Conics elements (ECLIPJ2000, w.r.t. the Sun) with shape (N, 8).
+    ephemerides : dict
+        Heliocentric interpolant per planet name (see planet_ephemerides), covering the window.
+        The MOIDs refer to the osculating orbits of the planets at et_start.
+    et_start : float
+        Start of the window of the close-approach search (ET).
+    et_end : float
+        End of the window (ET).
+    thresholds_au : dict, optional
+        MOID limit (AU) per planet for the candidates; the same limit applies to the distances of
+        the reported approaches. The default is MOID_THRESHOLDS_AU.
+    step : float, optional
+        Step (s) of the close-approach search. The default is 6 hours.
+    grid : int, optional
+        Number of true anomalies per orbit of the MOID grid. The default is _GRID.
+    max_workers : int, optional
+        Number of worker processes. The default is the number of CPUs.
+
+    Returns
+    -------
+    moid_df : pandas.DataFrame
+        One row per object with the column NAME and a column MOID_<PLANET>_AU per planet.
+    encounters_df : pandas.DataFrame
+        One row per close approach (NAME, PLANET, MOID_AU, CA_ET, CA_UTC, CA_DIST_AU,
+        CA_DIST_HILL, V_REL_KMS), ranked by the distance in Hill radii of the planet.
+    """
+    thresholds_au = {**MOID_THRESHOLDS_AU, **(thresholds_au or {})}
+    names = np.asarray(names)
+    elements = np.atleast_2d(np.asarray(elements, dtype=np.float64))
+
+    with concurrent.futures.ProcessPoolExecutor(
+        max_workers=max_workers, initializer=_init_worker,
+        initargs=(ephemerides, et_start, et_end, step)
+    ) as pool:
+        moid_df = pd.DataFrame({"NAME": names})
+        tasks, hill = [], {}
+        for planet, planet_ephemeris in ephemerides.items():
+            planet_orbit = planet_elements(planet_ephemeris, et_start)
+            hill[planet] = hill_radius(planet, planet_orbit)
+            moid_tasks = [(elements[i:i + _TASK_OBJECTS], planet_orbit, grid)
+                          for i in range(0, len(elements), _TASK_OBJECTS)]
+            moid_km = np.concatenate([result[0] for result in pool.map(_moid_task, moid_tasks)])
+            moid_df[f"MOID_{planet}_AU"] = moid_km / _AU_KM
+
+            max_dist = thresholds_au[planet] * _AU_KM
+            tasks += [(row, planet, elements[row], max_dist)
+                      for row in np.flatnonzero(moid_km <= max_dist)]
+
+        approaches = [approach for result in pool.map(_approach_task, tasks) for approach in result]
+
+    rows, planets, ca_ets, ca_dists, ca_speeds = (np.array(col) for col in zip(*approaches)) \
+        if approaches else (np.empty(0, dtype=int), np.empty(0, dtype=str), *np.empty((3, 0)))
+    encounters_df = pd.DataFrame({
+        "NAME": names[rows],
+        "PLANET": planets,
+        "MOID_AU": [moid_df.at[row, f"MOID_{planet}_AU"] for row, planet in zip(rows, planets)],
+        "CA_ET": ca_ets,
+        "CA_UTC": time_scales.et_to_utc(ca_ets),
+        "CA_DIST_AU": ca_dists / _AU_KM,
+        "CA_DIST_HILL": ca_dists / np.array([hill[planet] for planet in planets]),
+        "V_REL_KMS": ca_speeds,
+    })
+    encounters_df = encounters_df.sort_values(["CA_DIST_HILL", "CA_ET"], ignore_index=True)
+    return moid_df, encounters_df
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="MOID and close-approach screening of the comet database")
+    parser.add_argument("--start", default=str(np.datetime64("today")), help="window start (UTC)")
+    parser.add_argument("--years", type=float, default=10.0, help="length of the window")
+    parser.add_argument("--step", type=float, default=6.0, help="search step in hours")
+    parser.add_argument("--db", default=str(comet_ingest.COMET_DB_PATH), help="comet database")
+    parser.add_argument("--neo-csv", help="additional objects: CSV with the SBDB fields "
+                                          "full_name, q, e, i, om, w and tp (or ma and epoch)")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes")
+    parser.add_argument("--output", help="CSV file of the ranked encounters")
+    parser.add_argument("--moid-output", help="CSV file of the MOIDs of all objects")
+    args = parser.parse_args()
+
+    comets_df = kepler.load_comets(args.db)
+    names = list(comets_df["NAME"])
+    elements = kepler.comet_elements(comets_df)
+    if args.neo_csv:
+        neo_df = pd.read_csv(args.neo_csv)
+        names += list(neo_df["full_name"].str.strip())
+        elements = np.concatenate([elements, sbdb_elements(neo_df)])
+
+    et_start = float(time_scales.utc_to_et(args.start))
+    et_end = et_start + args.years * 365.25 * 86400.0
+    kernel_manager.load("de432s.bsp")
+    ephemerides = planet_ephemerides(et_start, et_end)
+
+    moid_df, encounters_df = screen(names, elements, ephemerides, et_start, et_end,
+                                    step=args.step * 3600.0, max_workers=args.workers)
+    if args.moid_output:
+        moid_df.to_csv(args.moid_output, index=False)
+    if args.output:
+        encounters_df.to_csv(args.output, index=False)
+    else:
+        print(encounters_df.to_string())
+
+
+if __name__ == "__main__":
+    main()
@@ -12,6 +12,11 @@ import spiceypy
 # Now let's define some functions (in later tutorials, we will outsource them in a separate folder
 # Check details here: https://britastro.org/asteroids/dymock4.pdf
 
+# Dictionaries that contain the A and B constants of the phase function, depending on the index
+# version
+PHASE_FUNC_A_FACTOR = {1: 3.33, 2: 1.87}
+PHASE_FUNC_B_FACTOR = {1: 0.63, 2: 1.22}
+
 def phase_func(index: int, phase_angle: float) -> float:
     """
     Phase function that is needed for the H-G visual / apparent magnitude function.
@@ -44,13 +49,11 @@ def phase_func(index: int, phase_angle: float) -> float:
     >>> phi2
     0.5283212147726485
     """
-    # Dictionaries that contain the A and B constants, depending on the index version
-    a_factor = {1: 3.33, 2: 1.87}
-    b_factor = {1: 0.63, 2: 1.22}
-
     # Phase function
     phi = math.exp(
-        -1.0 * a_factor[index] * ((math.tan(0.5 * phase_angle) ** b_factor[index]))
+        -1.0
+        * PHASE_FUNC_A_FACTOR[index]
+        * ((math.tan(0.5 * phase_angle) ** PHASE_FUNC_B_FACTOR[index]))
     )
 
     # Return the phase function result
@@ -206,4 +209,167 @@ def appmag2irr(app_mag: t.Union[int, float]) -> float:
     # Convert apparent magnitude to irradiance
     irradiance = 10.0 ** (-0.4 * app_mag + math.log10(appmag_irr_i0))
 
-    return irradiance
\ No newline at end of file
+    return irradiance
+
+
+def phase_func_vec(index: int, phase_angle: np.ndarray) -> np.ndarray:
+    """
+    Array version of phase_func.
+
+    Parameters
+    ----------
+    index : int
+        Phase function index / version. '1' or '2'.
+    phase_angle : array_like
+        Phase angles in radians, of any shape.
+
+    Returns
+    -------
+    phi : numpy.ndarray
+        Phase function results, same shape as phase_angle.
+
+    See Also
+    --------
+    phase_func : Scalar version
+    """
+    phase_angle = np.asarray(phase_angle, dtype=np.float64)
+
+    # Phase function, with the same order of operations as the scalar version
+    phi = np.exp(
+        -1.0
+        * PHASE_FUNC_A_FACTOR[index]
+        * (np.tan(0.5 * phase_angle) ** PHASE_FUNC_B_FACTOR[index])
+    )
+
+    return phi
+
+
+def reduc_mag_vec(
+    abs_mag: np.ndarray, phase_angle: np.ndarray, slope_g: t.Union[float, np.ndarray] = 0.15
+) -> np.ndarray:
+    """
+    Array version of reduc_mag.
+
+    All inputs are broadcast against each other, e.g. abs_mag and slope_g with shape (N,) and
+    phase_angle with shape (T, N) for N objects at T epochs.
+
+    Parameters
+    ----------
+    abs_mag : array_like
+        Absolute magnitudes.
+    phase_angle : array_like
+        Phase angles in radians.
+    slope_g : float or array_like, optional
+        Slope parameters G. The default is 0.15.
+
+    Returns
+    -------
+    reduced_magnitude : numpy.ndarray
+        Reduced magnitudes, with the broadcast shape of the inputs.
+
+    See Also
+    --------
+    reduc_mag : Scalar version
+    """
+    slope_g = np.asarray(slope_g, dtype=np.float64)
+
+    reduced_magnitude = np.asarray(abs_mag, dtype=np.float64) - 2.5 * np.log10(
+        (1.0 - slope_g) * phase_func_vec(index=1, phase_angle=phase_angle)
+        + slope_g * phase_func_vec(index=2, phase_angle=phase_angle)
+    )
+
+    return reduced_magnitude
+
+
+def hg_app_mag_vec(
+    abs_mag: np.ndarray,
+    vec_obj2obs: np.ndarray,
+    vec_obj2ill: np.ndarray,
+    slope_g: t.Union[float, np.ndarray] = 0.15,
+) -> np.ndarray:
+    """
+    Array version of hg_app_mag.
+
+    The vectors are given as arrays with a trailing axis of length 3, e.g. (N, 3) for N objects
+    or (T, N, 3) for N objects at T epochs. abs_mag and slope_g are broadcast against the
+    remaining (leading) axes, so an (N,) array of H values applies to every epoch.
+
+    Parameters
+    ----------
+    abs_mag : array_like
+        Absolute magnitudes.
+    vec_obj2obs : array_like
+        Vectors (x, y, z) from the objects to the observer given in AU, shape (..., 3).
+    vec_obj2ill : array_like
+        Vectors (x, y, z) from the objects to the illumination source given in AU,
+        shape (..., 3).
+    slope_g : float or array_like, optional
+        Slope parameters G. The default is 0.15.
+
+    Returns
+    -------
+    app_mag : numpy.ndarray
+        Apparent / visual (bolometric) magnitudes as seen from the observer.
+
+    See Also
+    --------
+    hg_app_mag : Scalar version
+
+    Examples
+    --------
+    >>> apparent_magnitude = hg_app_mag_vec(
+    ...     abs_mag=[10.0, 10.0],
+    ...     vec_obj2obs=[[-1.0, 0.0, 0.0], [-1.0, 0.0, 0.0]],
+    ...     vec_obj2ill=[[-2.0, 0.0, 0.0], [-2.0, 0.0, 0.0]],
+    ...     slope_g=0.10,
+    ... )
+    >>> apparent_magnitude
+    array([11.50514998, 11.50514998])
+    """
+    vec_obj2obs = np.asarray(vec_obj2obs, dtype=np.float64)
+    vec_obj2ill = np.asarray(vec_obj2ill, dtype=np.float64)
+
+    # Compute the length of the input vectors
+    vec_obj2obs_norm = np.sqrt(np.einsum("...i,...i->...", vec_obj2obs, vec_obj2obs))
+    vec_obj2ill_norm = np.sqrt(np.einsum("...i,...i->...", vec_obj2ill, vec_obj2ill))
+
+    # Compute the phase angles. The cosine is clipped, since rounding may push it marginally
+    # outside of [-1, 1] for (anti-)parallel vectors
+    dotp_res = np.einsum("...i,...i->...", vec_obj2obs, vec_obj2ill)
+    obj_phase_angle = np.arccos(
+        np.clip(dotp_res / (vec_obj2obs_norm * vec_obj2ill_norm), -1.0, 1.0)
+    )
+
+    # Compute the reduced magnitudes
+    red_mag = reduc_mag_vec(abs_mag, obj_phase_angle, slope_g)
+
+    # Merge all information and compute the apparent magnitudes as seen from the observer
+    app_mag = red_mag + 5.0 * np.log10(vec_obj2obs_norm * vec_obj2ill_norm)
+
+    return app_mag
+
+
+def appmag2irr_vec(app_mag: np.ndarray) -> np.ndarray:
+    """
+    Array version of appmag2irr.
+
+    Parameters
+    ----------
+    app_mag : array_like
+        Apparent bolometric magnitudes given in mag.
+
+    Returns
+    -------
+    irradiance : numpy.ndarray
+        Irradiances given in W/m^2.
+
+    See Also
+    --------
+    appmag2irr : Scalar version
+    """
+    # Zero point of the apparent bolometric magnitude given in W/m**2
+    appmag_irr_i0 = 2.518021002e-8
+
+    irradiance = 10.0 ** (-0.4 * np.asarray(app_mag, dtype=np.float64) + math.log10(appmag_irr_i0))
+
+    return irradiance
@@ -0,0 +1,472 @@
+# Standard libraries
+import json
+import os
+import pathlib
+import typing as t
+
+# Installed libraries
+import numpy as np
+import pandas as pd
+
+# Triangular shape models (e.g., the 67P DSK shape models in OBJ format of tutorial 023) with
+# vectorised geometric queries. The OBJ text is parsed once into typed vertex / facet arrays that
+# are cached next to the file as memory-mappable .npy files. A bounding-volume hierarchy (BVH)
+# over the facets makes ray intersections and nearest-surface queries logarithmic in the number
+# of facets instead of linear.
+#
+# The BVH is a complete binary tree in heap layout (the children of node k are 2k + 1 and 2k + 2)
+# over the facets sorted along a Morton (Z-order) curve of their centroids; every leaf holds
+# leaf_size consecutive facets of that order. Building it needs only sorts and reductions, and
+# since all nodes of a level have the same depth, a whole batch of queries walks the tree level by
+# level with NumPy: per level, every (query, node) pair is tested against the node's bounding box
+# at once and the surviving pairs descend to the children.
+
+# Bump whenever the cache layout changes so that stale caches are rebuilt
+CACHE_VERSION = 1
+
+# Facets per BVH leaf
+LEAF_SIZE = 8
+
+# Number of rows of the OBJ file that are parsed at once
+_PARSE_CHUNK = 1 << 20
+
+# Number of queries (rays or points) that walk the tree at once
+_QUERY_CHUNK = 2048
+
+# Number of facets whose bounds are computed at once while building the tree
+_BUILD_CHUNK = 1 << 20
+
+
+def parse_obj(path: t.Union[str, pathlib.Path]) -> t.Tuple[np.ndarray, np.ndarray]:
+    """
+    Parse the vertices and triangular facets of an OBJ file.
+
+    Only 'v x y z' and 'f i j k' rows are used (the format of the DSK OBJ files); other rows are
+    skipped. The file is parsed in chunks, so the memory needed is that of the result.
+
+    Parameters
+    ----------
+    path : str or pathlib.Path
+        Path of the OBJ file.
+
+    Returns
+    -------
+    vertices : numpy.ndarray
+        Vertex coordinates, shape (N, 3), float64.
+    faces : numpy.ndarray
+        Zero-based vertex indices of the facets, shape (M, 3), int32 (int64 for models with more
+        than 2**31 - 1 vertices).
+    """
+    vertices, faces = [], []
+    reader = pd.read_csv(path, sep=r"\s+", header=None, names=["TYPE", "X1", "X2", "X3"],
+                         usecols=[0, 1, 2, 3], comment="#", chunksize=_PARSE_CHUNK,
+                         dtype={"TYPE": "category", "X1": np.float64, "X2": np.float64,
+                                "X3": np.float64})
+    for chunk in reader:
+        row_type = chunk["TYPE"].to_numpy()
+        values = chunk[["X1", "X2", "X3"]].to_numpy()
+        vertices.append(values[row_type == "v"])
+        faces.append(values[row_type == "f"])
+
+    vertices = np.concatenate(vertices) if vertices else np.empty((0, 3))
+    faces = np.concatenate(faces) if faces else np.empty((0, 3))
+
+    # OBJ indices start at 1
+    index_type = np.int32 if len(vertices) < np.iinfo(np.int32).max else np.int64
+    faces = (faces - 1.0).astype(index_type)
+    if faces.size and (faces.min() < 0 or faces.max() >= len(vertices)):
+        raise ValueError(f"{path} contains facets with invalid vertex indices")
+    return vertices, faces
+
+
+def _cache_paths(path: pathlib.Path) -> t.Tuple[pathlib.Path, pathlib.Path, pathlib.Path]:
+    return (path.with_name(path.name + ".vertices.npy"), path.with_name(path.name + ".faces.npy"),
+            path.with_name(path.name + ".cache.json"))
+
+
+def _source_key(path: pathlib.Path) -> t.Dict[str, int]:
+    stat = os.stat(path)
+    return {"version": CACHE_VERSION, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def load_obj(
+    path: t.Union[str, pathlib.Path], use_cache: bool = True
+) -> t.Tuple[np.ndarray, np.ndarray]:
+    """
+    Load the vertices and facets of an OBJ file, using the .npy cache next to the file.
+
+    The cache is (re-)written whenever it is missing or the size or modification time of the OBJ
+    file has changed. Cached arrays are returned memory-mapped (read-only), so loading even the
+    high-resolution 67P model is instant and only the pages that are used are read.
+
+    Parameters
+    ----------
+    path : str or pathlib.Path
+        Path of the OBJ file.
+    use_cache : bool, optional
+        Read and write the cache. The default is True.
+
+    Returns
+    -------
+    vertices, faces : numpy.ndarray
+        See parse_obj.
+    """
+    path = pathlib.Path(path)
+    vertices_path, faces_path, key_path = _cache_paths(path)
+
+    if use_cache:
+        try:
+            if json.loads(key_path.read_text()) == _source_key(path):
+                return np.load(vertices_path, mmap_mode="r"), np.load(faces_path, mmap_mode="r")
+        except (OSError, ValueError):
+            pass
+
+    vertices, faces = parse_obj(path)
+    if use_cache:
+        # Write to temporary files first so that a reader never sees half a cache
+        for array, array_path in ((vertices, vertices_path), (faces, faces_path)):
+            with open(array_path.with_suffix(".tmp"), "wb") as file:
+                np.save(file, array)
+            os.replace(array_path.with_suffix(".tmp"), array_path)
+        key_path.write_text(json.dumps(_source_key(path)))
+    return vertices, faces
+
+
+def _morton_codes(points: np.ndarray, lower: np.ndarray, upper: np.ndarray) -> np.ndarray:
+    """30-bit Morton codes of points within the box [lower, upper]."""
+    scale = np.where(upper > lower, 1023.0 / np.maximum(upper - lower, 1e-300), 0.0)
+    cells = np.clip((points - lower) * scale, 0, 1023).astype(np.uint64)
+
+    # Spread the 10 bits of every coordinate to every third bit
+    cells = (cells | (cells << np.uint64(16))) & np.uint64(0x030000FF)
+    cells = (cells | (cells << np.uint64(8))) & np.uint64(0x0300F00F)
+    cells = (cells | (cells << np.uint64(4))) & np.uint64(0x030C30C3)
+    cells = (cells | (cells << np.uint64(2))) & np.uint64(0x09249249)
+    return (cells[:, 0] << np.uint64(2)) | (cells[:, 1] << np.uint64(1)) | cells[:, 2]
+
+
+def _closest_points_on_triangles(
+    p: np.ndarray, a: np.ndarray, b: np.ndarray, c: np.ndarray
+) -> np.ndarray:
+    """
+    Closest points on the triangles (a, b, c) to the points p, all of shape (n, 3).
+
+    Vectorised form of the Voronoi-region test of Ericson, Real-Time Collision Detection, 5.1.5.
+    """
+    def dot(u, v):
+        return np.einsum("ij,ij->i", u, v)
+
+    ab, ac = b - a, c - a
+    ap, bp, cp = p - a, p - b, p - c
+    d1, d2 = dot(ab, ap), dot(ac, ap)
+    d3, d4 = dot(ab, bp), dot(ac, bp)
+    d5, d6 = dot(ab, cp), dot(ac, cp)
+    va, vb, vc = d3 * d6 - d5 * d4, d5 * d2 - d1 * d6, d1 * d4 - d3 * d2
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # Interior, then the edge and vertex regions; later assignments take precedence, so the
+        # regions are applied in the reverse order of Ericson's early returns
+        denom = 1.0 / (va + vb + vc)
+        closest = a + ab * (vb * denom)[:, np.newaxis] + ac * (vc * denom)[:, np.newaxis]
+        regions = [
+            ((va <= 0) & (d4 - d3 >= 0) & (d5 - d6 >= 0),
+             b + (c - b) * ((d4 - d3) / ((d4 - d3) + (d5 - d6)))[:, np.newaxis]),
+            ((vb <= 0) & (d2 >= 0) & (d6 <= 0), a + ac * (d2 / (d2 - d6))[:, np.newaxis]),
+            ((d6 >= 0) & (d5 <= d6), c),
+            ((vc <= 0) & (d1 >= 0) & (d3 <= 0), a + ab * (d1 / (d1 - d3))[:, np.newaxis]),
+            ((d3 >= 0) & (d4 <= d3), b),
+            ((d1 <= 0) & (d2 <= 0), a),
+        ]
+        for in_region, point in regions:
+            closest = np.where(in_region[:, np.newaxis], point, closest)
+    return closest
+
+
+def _first_per_query(query: np.ndarray, key: np.ndarray) -> np.ndarray:
+    """Index of the smallest key per query id (for queries that occur at least once)."""
+    order = np.lexsort((key, query))
+    first = np.ones(len(order), dtype=bool)
+    first[1:] = query[order][1:] != query[order][:-1]
+    return order[first]
+
+
+class ShapeModel:
+    """
+    Triangular shape model with a bounding-volume hierarchy for vectorised queries.
+
+    Coordinates are in the units and the body-fixed frame of the model (km for the DSK OBJ files).
+    Facet normals follow the right-hand rule of the vertex order, i.e., they point outwards for
+    the DSK shape models.
+
+    Attributes
+    ----------
+    vertices : numpy.ndarray
+        Vertex coordinates, shape (N, 3).
+    faces : numpy.ndarray
+        Zero-based vertex indices of the facets, shape (M, 3).
+    leaf_size : int
+        Facets per BVH leaf.
+    depth : int
+        Number of levels below the root node.
+    order : numpy.ndarray
+        Facet indices in BVH (Morton) order; leaf j holds order[j * leaf_size:(j + 1) * leaf_size].
+    box_min, box_max : numpy.ndarray
+        Bounding boxes of the BVH nodes in heap layout, shape (2**(depth + 1) - 1, 3). Empty
+        (padding) nodes have box_min = +inf and box_max = -inf.
+    anchors : numpy.ndarray
+        A vertex of a facet within every node (NaN for empty nodes), shape of box_min. The
+        distance to it bounds the distance to the node's surface from above.
+    """
+
+    def __init__(self, vertices: np.ndarray, faces: np.ndarray, leaf_size: int = LEAF_SIZE) -> None:
+        self.vertices = np.asarray(vertices, dtype=np.float64)
+        self.faces = np.asarray(faces)
+        self.leaf_size = int(leaf_size)
+        if len(self.faces) == 0:
+            raise ValueError("The shape model has no facets")
+        self._build()
+
+    @classmethod
+    def load(
+        cls, path: t.Union[str, pathlib.Path], use_cache: bool = True, leaf_size: int = LEAF_SIZE
+    ) -> "ShapeModel":
+        """Load a shape model from an OBJ file (see load_obj) and build its BVH."""
+        vertices, faces = load_obj(path, use_cache=use_cache)
+        return cls(vertices, faces, leaf_size)
+
+    @property
+    def n_faces(self) -> int:
+        """Number of facets."""
+        return len(self.faces)
+
+    def _triangles(self, face_idx: np.ndarray) -> t.Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        corners = self.faces[face_idx]
+        return self.vertices[corners[:, 0]], self.vertices[corners[:, 1]], self.vertices[corners[:, 2]]
+
+    def _build(self) -> None:
+        n_faces = self.n_faces
+        face_min = np.empty((n_faces, 3))
+        face_max = np.empty((n_faces, 3))
+        for lo in range(0, n_faces, _BUILD_CHUNK):
+            a, b, c = self._triangles(np.arange(lo, min(lo + _BUILD_CHUNK, n_faces)))
+            face_min[lo:lo + len(a)] = np.minimum(np.minimum(a, b), c)
+            face_max[lo:lo + len(a)] = np.maximum(np.maximum(a, b), c)
+
+        centroids = 0.5 * (face_min + face_max)
+        codes = _morton_codes(centroids, centroids.min(axis=0), centroids.max(axis=0))
+        self.order = np.argsort(codes, kind="stable")
+
+        # Leaf boxes; the last leaf and the leaves that pad the tree to a power of two are
+        # filled with empty boxes
+        n_leaves = -(-n_faces // self.leaf_size)
+        self.depth = max(0, int(np.ceil(np.log2(n_leaves))))
+        n_slots = (1 << self.depth) * self.leaf_size
+        leaf_min = np.full((n_slots, 3), np.inf)
+        leaf_max = np.full((n_slots, 3), -np.inf)
+        leaf_min[:n_faces] = face_min[self.order]
+        leaf_max[:n_faces] = face_max[self.order]
+        del face_min, face_max, centroids
+
+        n_nodes = (2 << self.depth) - 1
+        self.box_min = np.empty((n_nodes, 3))
+        self.box_max = np.empty((n_nodes, 3))
+        first_leaf = (1 << self.depth) - 1
+        self.box_min[first_leaf:] = leaf_min.reshape(-1, self.leaf_size, 3).min(axis=1)
+        self.box_max[first_leaf:] = leaf_max.reshape(-1, self.leaf_size, 3).max(axis=1)
+
+        # The anchor of a leaf is the first vertex of its first facet
+        self.anchors = np.full((n_nodes, 3), np.nan)
+        first_faces = self.order[::self.leaf_size]
+        self.anchors[first_leaf:first_leaf + n_leaves] = self.vertices[self.faces[first_faces, 0]]
+
+        # Parents from pairs of children, one level at a time; a parent keeps the anchor of its
+        # left child (which is never empty if the parent is not)
+        for level in range(self.depth - 1, -1, -1):
+            lo, hi = (1 << level) - 1, (2 << level) - 1
+            children = slice(2 * lo + 1, 2 * hi + 1)
+            self.box_min[lo:hi] = self.box_min[children].reshape(-1, 2, 3).min(axis=1)
+            self.box_max[lo:hi] = self.box_max[children].reshape(-1, 2, 3).max(axis=1)
+            self.anchors[lo:hi] = self.anchors[children][::2]
+
+    def _leaf_faces(self, query: np.ndarray, node: np.ndarray) -> t.Tuple[np.ndarray, np.ndarray]:
+        """Expand (query, leaf node) pairs into (query, facet index) pairs."""
+        slots = ((node - ((1 << self.depth) - 1)) * self.leaf_size)[:, np.newaxis] \
+            + np.arange(self.leaf_size)
+        query = np.broadcast_to(query[:, np.newaxis], slots.shape).ravel()
+        slots = slots.ravel()
+        valid = slots < self.n_faces
+        return query[valid], self.order[slots[valid]]
+
+    @staticmethod
+    def _descend(query: np.ndarray, node: np.ndarray) -> t.Tuple[np.ndarray, np.ndarray]:
+        return np.repeat(query, 2), (2 * np.repeat(node, 2) + 1) + np.tile([0, 1], len(node))
+
+    def intersect(
+        self, origins: np.ndarray, directions: np.ndarray
+    ) -> t.Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        First intersection of rays with the surface (Moeller-Trumbore, both facet sides).
+
+        Parameters
+        ----------
+        origins : numpy.ndarray
+            Ray origins, shape (n, 3) or (3,).
+        directions : numpy.ndarray
+            Ray directions (need not be normalised), same shape as origins.
+
+        Returns
+        -------
+        distance : numpy.ndarray
+            Distance along the ray in units of the direction's length (i.e., the intercept is
+            origin + distance * direction), inf for rays that miss. Shape (n,).
+        face : numpy.ndarray
+            Index of the intercepted facet, -1 for rays that miss.
+        points : numpy.ndarray
+            Surface intercepts, NaN for rays that miss. Shape (n, 3).
+        """
+        origins, directions = np.broadcast_arrays(np.atleast_2d(origins).astype(np.float64),
+                                                  np.atleast_2d(directions).astype(np.float64))
+        distance = np.full(len(origins), np.inf)
+        face = np.full(len(origins), -1, dtype=np.int64)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            for lo in range(0, len(origins), _QUERY_CHUNK):
+                orig = origins[lo:lo + _QUERY_CHUNK]
+                dirs = directions[lo:lo + _QUERY_CHUNK]
+                inv_dirs = 1.0 / dirs
+
+                query = np.arange(len(orig))
+                node = np.zeros(len(orig), dtype=np.int64)
+                for level in range(self.depth + 1):
+                    # Slab test; NaNs (0 * inf for rays in a box plane) are ignored by fmin / fmax
+                    t1 = (self.box_min[node] - orig[query]) * inv_dirs[query]
+                    t2 = (self.box_max[node] - orig[query]) * inv_dirs[query]
+                    t_enter = np.fmax.reduce(np.fmin(t1, t2), axis=1)
+                    t_exit = np.fmin.reduce(np.fmax(t1, t2), axis=1)
+                    hit = (t_exit >= np.maximum(t_enter, 0.0)) \
+                        & np.all(self.box_min[node] <= self.box_max[node], axis=1)
+                    query, node = query[hit], node[hit]
+                    if level < self.depth:
+                        query, node = self._descend(query, node)
+
+                query, face_idx = self._leaf_faces(query, node)
+                a, b, c = self._triangles(face_idx)
+                ray_dir, ray_orig = dirs[query], orig[query]
+                edge1, edge2 = b - a, c - a
+                pvec = np.cross(ray_dir, edge2)
+                det = np.einsum("ij,ij->i", edge1, pvec)
+                inv_det = 1.0 / det
+                tvec = ray_orig - a
+                u = np.einsum("ij,ij->i", tvec, pvec) * inv_det
+                qvec = np.cross(tvec, edge1)
+                v = np.einsum("ij,ij->i", ray_dir, qvec) * inv_det
+                t_hit = np.einsum("ij,ij->i", edge2, qvec) * inv_det
+                valid = (det != 0.0) & (u >= 0.0) & (v >= 0.0) & (u + v <= 1.0) & (t_hit >= 0.0)
+
+                query, face_idx, t_hit = query[valid], face_idx[valid], t_hit[valid]
+                best = _first_per_query(query, t_hit)
+                distance[lo + query[best]] = t_hit[best]
+                face[lo + query[best]] = face_idx[best]
+
+        points = origins + distance[:, np.newaxis] * directions
+        points[face < 0] = np.nan
+        return distance, face, points
+
+    def nearest(self, points: np.ndarray) -> t.Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Nearest surface point of every query point.
+
+        While descending the tree, every point keeps the smallest upper bound of its distance
+        (the distance to the anchor vertex of a node) and discards all boxes that are farther
+        away than that bound. Of the remaining leaves, the one with the closest box is searched
+        first; the facets of the others are only tested if their box is closer than the facet
+        found there.
+
+        Parameters
+        ----------
+        points : numpy.ndarray
+            Query points, shape (n, 3) or (3,).
+
+        Returns
+        -------
+        distance : numpy.ndarray
+            Distance to the surface, shape (n,).
+        face : numpy.ndarray
+            Index of the nearest facet.
+        closest : numpy.ndarray
+            Nearest surface points, shape (n, 3).
+        """
+        points = np.atleast_2d(points).astype(np.float64)
+        distance = np.empty(len(points))
+        face = np.empty(len(points), dtype=np.int64)
+        closest = np.empty_like(points)
+
+        for lo in range(0, len(points), _QUERY_CHUNK):
+            pts = points[lo:lo + _QUERY_CHUNK]
+            query = np.arange(len(pts))
+            node = np.zeros(len(pts), dtype=np.int64)
+            for level in range(self.depth + 1):
+                box_min, box_max, p = self.box_min[node], self.box_max[node], pts[query]
+                non_empty = np.all(box_min <= box_max, axis=1)
+                lower = np.sum(np.maximum(np.maximum(box_min - p, p - box_max), 0.0) ** 2, axis=1)
+                upper = np.sum((p - self.anchors[node]) ** 2, axis=1)
+                upper[~non_empty] = np.inf
+
+                # Squared distances; the bound is the smallest upper bound per point
+                bound = np.full(len(pts), np.inf)
+                np.minimum.at(bound, query, upper)
+                keep = non_empty & (lower <= bound[query])
+                query, node, lower = query[keep], node[keep], lower[keep]
+                if level < self.depth:
+                    query, node = self._descend(query, node)
+
+            first = _first_per_query(query, lower)
+            first_query, first_face, first_closest, first_dist = self._nearest_in_leaves(
+                pts, query[first], node[first])
+            bound = np.full(len(pts), np.inf)
+            bound[first_query] = first_dist ** 2
+
+            rest = lower <= bound[query]
+            rest[first] = False
+            rest_query, rest_face, rest_closest, rest_dist = self._nearest_in_leaves(
+                pts, query[rest], node[rest])
+
+            query = np.concatenate([first_query, rest_query])
+            dist = np.concatenate([first_dist, rest_dist])
+            best = _first_per_query(query, dist)
+            distance[lo + query[best]] = dist[best]
+            face[lo + query[best]] = np.concatenate([first_face, rest_face])[best]
+            closest[lo + query[best]] = np.concatenate([first_closest, rest_closest])[best]
+
+        return distance, face, closest
+
+    def _nearest_in_leaves(
+        self, points: np.ndarray, query: np.ndarray, node: np.ndarray
+    ) -> t.Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """Nearest facet per query within the given (query, leaf node) pairs."""
+        query, face_idx = self._leaf_faces(query, node)
+        candidates = _closest_points_on_triangles(points[query], *self._triangles(face_idx))
+        dist = np.linalg.norm(candidates - points[query], axis=1)
+        best = _first_per_query(query, dist)
+        return query[best], face_idx[best], candidates[best], dist[best]
+
+    def normals(self, face_idx: t.Optional[np.ndarray] = None) -> np.ndarray:
+        """Unit normals of the given facets (default: all), shape (m, 3)."""
+        face_idx = np.arange(self.n_faces) if face_idx is None else np.asarray(face_idx)
+        a, b, c = self._triangles(face_idx)
+        normals = np.cross(b - a, c - a)
+        return normals / np.linalg.norm(normals, axis=1, keepdims=True)
+
+    def altitude(self, points: np.ndarray) -> np.ndarray:
+        """
+        Signed altitude of points over the surface: the distance to the nearest surface point,
+        negative below the surface.
+
+        The side is taken from the outward normal of the nearest facet. Where the nearest surface
+        point lies on an edge or a vertex (points near sharp features, closer than about a facet
+        size), the side may be wrong; the magnitude is always exact.
+        """
+        points = np.atleast_2d(points).astype(np.float64)
+        distance, face, closest = self.nearest(points)
+        side = np.einsum("ij,ij->i", points - closest, self.normals(face))
+        return np.where(side < 0.0, -distance, distance)
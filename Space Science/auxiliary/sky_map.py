@@ -0,0 +1,579 @@
+# Standard libraries
+import concurrent.futures
+import json
+import os
+import pathlib
+import typing as t
+
+# Installed libraries
+import numpy as np
+import pandas as pd
+import spiceypy
+
+# Local modules
+import data_fetch
+import time_scales
+
+# Star maps with a comet track (tutorial 026). The notebook loaded the whole Hipparcos catalog with
+# skyfield for every session, computed the astrometric position of all ~118,000 stars and filtered
+# the visible ones afterwards, and rendered a single epoch. Here, the catalog is parsed once into a
+# compact binary cache, stars are selected by magnitude and field of view before any astrometry,
+# the positions and projections of all stars for all epochs are computed in one array operation and
+# the frames of an animation are rendered by worker processes.
+#
+# The astrometry follows skyfield's Star.observe: the catalog position (epoch J1991.25) is moved
+# along the proper motion and seen from the barycentric position of the observer (parallax). The
+# comet is a two-body orbit around the Sun (spiceypy.conics) corrected for light time. All
+# vectors are in J2000 (ICRF); the projection is skyfield's stereographic projection.
+
+# Hipparcos main catalog and its local copy
+HIPPARCOS_URL = "https://cdsarc.cds.unistra.fr/ftp/cats/I/239/hip_main.dat"
+HIPPARCOS_PATH = pathlib.Path(__file__).resolve().parents[1] / "databases" / "hipparcos" / "hip_main.dat"
+
+# Bump whenever the cache layout changes so that stale caches are rebuilt
+CACHE_VERSION = 1
+
+# Columns of hip_main.dat that are used (0-based field index) and the cached record layout
+_HIP_FIELDS = {"hip": 1, "mag": 5, "ra_deg": 8, "dec_deg": 9, "plx_mas": 11, "pmra_mas": 12, "pmdec_mas": 13}
+HIP_DTYPE = np.dtype([
+    ("hip", np.int32),
+    ("mag", np.float32),
+    ("ra_deg", np.float64),
+    ("dec_deg", np.float64),
+    ("plx_mas", np.float32),
+    ("pmra_mas", np.float32),
+    ("pmdec_mas", np.float32),
+])
+
+# Catalog epoch J1991.25 (TT) in seconds past J2000
+HIP_EPOCH_ET = (2448349.0625 - time_scales.J2000_JD) * 86400.0
+
+# Gravitational parameter of the Sun in km^3/s^2 (as used by skyfield for MPC orbits)
+GM_SUN = 1.32712440041e11
+
+# Constellation stars are kept if they are this far outside of the field of view, so that lines
+# that leave the map are still drawn
+EDGE_MARGIN_DEG = 30.0
+
+_MAS_TO_RAD = np.radians(1.0 / 3600e3)
+
+
+def _cache_paths(path: pathlib.Path) -> t.Tuple[pathlib.Path, pathlib.Path]:
+    return path.with_name(path.name + ".npy"), path.with_name(path.name + ".cache.json")
+
+
+def _source_key(path: pathlib.Path) -> t.Dict[str, int]:
+    stat = os.stat(path)
+    return {"version": CACHE_VERSION, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def parse_hipparcos(path: t.Union[str, pathlib.Path]) -> np.ndarray:
+    """
+    Parse the Hipparcos main catalog (hip_main.dat, optionally g-zipped).
+
+    Stars without astrometric solution are dropped; missing parallaxes and proper motions are set
+    to zero.
+
+    Parameters
+    ----------
+    path : str or pathlib.Path
+        Path of hip_main.dat.
+
+    Returns
+    -------
+    catalog : numpy.ndarray
+        Structured array with the fields of HIP_DTYPE (sorted by HIP number).
+    """
+    stars_df = pd.read_csv(path, sep="|", header=None, usecols=list(_HIP_FIELDS.values()),
+                           na_values=[""], skipinitialspace=True, compression="infer")
+    stars_df.columns = [name for name, _ in sorted(_HIP_FIELDS.items(), key=lambda item: item[1])]
+    stars_df = stars_df.dropna(subset=["ra_deg", "dec_deg"]).fillna(
+        {"mag": np.inf, "plx_mas": 0.0, "pmra_mas": 0.0, "pmdec_mas": 0.0})
+
+    catalog = np.empty(len(stars_df), dtype=HIP_DTYPE)
+    for name in HIP_DTYPE.names:
+        catalog[name] = stars_df[name].to_numpy()
+    return np.sort(catalog, order="hip")
+
+
+def load_hipparcos(
+    path: t.Union[str, pathlib.Path] = HIPPARCOS_PATH, use_cache: bool = True, download: bool = True
+) -> np.ndarray:
+    """
+    Load the Hipparcos catalog, using the binary cache next to the file.
+
+    The cache (<file>.npy, about 4 MB) is (re-)written whenever it is missing or the size or
+    modification time of the catalog has changed, and is returned memory-mapped.
+
+    Parameters
+    ----------
+    path : str or pathlib.Path, optional
+        Path of hip_main.dat. The default is databases/hipparcos/hip_main.dat.
+    use_cache : bool, optional
+        Read and write the cache. The default is True.
+    download : bool, optional
+        Download the catalog from HIPPARCOS_URL if the file does not exist. The default is True.
+
+    Returns
+    -------
+    catalog : numpy.ndarray
+        See parse_hipparcos.
+    """
+    path = pathlib.Path(path)
+    cache_path, key_path = _cache_paths(path)
+
+    if use_cache:
+        try:
+            if json.loads(key_path.read_text()) == _source_key(path):
+                return np.load(cache_path, mmap_mode="r")
+        except (OSError, ValueError):
+            pass
+
+    if download and not path.is_file():
+        data_fetch.download_file(path.parent, HIPPARCOS_URL)
+
+    catalog = parse_hipparcos(path)
+    if use_cache:
+        # Write to a temporary file first so that a reader never sees half a cache
+        with open(cache_path.with_suffix(".tmp"), "wb") as file:
+            np.save(file, catalog)
+        os.replace(cache_path.with_suffix(".tmp"), cache_path)
+        key_path.write_text(json.dumps(_source_key(path)))
+    return catalog
+
+
+def parse_constellations(path: t.Union[str, pathlib.Path]) -> t.List[t.Tuple[str, t.List[t.Tuple[int, int]]]]:
+    """
+    Read Stellarium constellation lines ('And 13 677 3092 3092 5447 ...').
+
+    Returns
+    -------
+    constellations : list of tuple
+        Name and list of HIP number pairs of every constellation.
+    """
+    constellations = []
+    for line in pathlib.Path(path).read_text().splitlines():
+        fields = line.split()
+        if len(fields) < 2 or line.startswith("#"):
+            continue
+        hips = [int(hip) for hip in fields[2:2 + 2 * int(fields[1])]]
+        constellations.append((fields[0], list(zip(hips[0::2], hips[1::2]))))
+    return constellations
+
+
+def radec_to_vectors(ra_deg: np.ndarray, dec_deg: np.ndarray) -> np.ndarray:
+    """Unit vectors of shape (n, 3) from right ascension and declination in degrees."""
+    ra, dec = np.radians(ra_deg), np.radians(dec_deg)
+    return np.stack([np.cos(dec) * np.cos(ra), np.cos(dec) * np.sin(ra), np.sin(dec)], axis=-1)
+
+
+def select_stars(
+    catalog: np.ndarray,
+    lim_mag: float,
+    centers: t.Optional[np.ndarray] = None,
+    radius_deg: float = 180.0,
+    extra_hip: t.Optional[t.Iterable[int]] = None,
+    extra_radius_deg: t.Optional[float] = None,
+) -> np.ndarray:
+    """
+    Indices of the catalog stars that are brighter than lim_mag and close to any map center.
+
+    The selection uses the catalog directions; proper motion and parallax move the stars by less
+    than a few arc minutes over centuries, which is negligible against the field of view.
+
+    Parameters
+    ----------
+    catalog : numpy.ndarray
+        See parse_hipparcos.
+    lim_mag : float
+        Limiting (visual) magnitude.
+    centers : numpy.ndarray, optional
+        Map centers (unit vectors, shape (3,) or (m, 3)). No field of view selection if not given.
+    radius_deg : float, optional
+        Angular radius around the centers. The default is 180 (whole sky).
+    extra_hip : iterable of int, optional
+        HIP numbers that are selected regardless of the magnitude (e.g., constellation stars).
+    extra_radius_deg : float, optional
+        Angular radius for the extra stars. The default is radius_deg.
+
+    Returns
+    -------
+    idx : numpy.ndarray
+        Ascending indices into the catalog.
+    """
+    wanted = catalog["mag"] <= lim_mag
+    radius = np.full(len(catalog), radius_deg)
+    if extra_hip is not None:
+        extra = np.isin(catalog["hip"], np.fromiter(extra_hip, dtype=np.int64))
+        radius[extra] = max(radius_deg, radius_deg if extra_radius_deg is None else extra_radius_deg)
+        wanted |= extra
+
+    idx = np.flatnonzero(wanted)
+    if centers is not None and radius_deg < 180.0:
+        directions = radec_to_vectors(catalog["ra_deg"][idx], catalog["dec_deg"][idx])
+        max_cos = (directions @ np.atleast_2d(centers).T).max(axis=1)
+        idx = idx[max_cos >= np.cos(np.radians(np.minimum(radius[idx], 180.0)))]
+    return idx
+
+
+def star_vectors(stars: np.ndarray, ets: np.ndarray, observer_au: np.ndarray) -> np.ndarray:
+    """
+    Astrometric directions of stars as seen by an observer, for all epochs at once.
+
+    Parameters
+    ----------
+    stars : numpy.ndarray
+        Catalog records (see parse_hipparcos), n stars.
+    ets : numpy.ndarray
+        Epochs (ET), shape (m,).
+    observer_au : numpy.ndarray
+        Barycentric position of the observer (J2000, AU), shape (m, 3).
+
+    Returns
+    -------
+    vectors : numpy.ndarray
+        Star positions divided by their distance (J2000), shape (m, n, 3). The vectors are not
+        normalised; they point from the observer to the stars.
+    """
+    ra, dec = np.radians(stars["ra_deg"]), np.radians(stars["dec_deg"])
+    direction = radec_to_vectors(stars["ra_deg"], stars["dec_deg"])
+
+    # Stars without a (positive) parallax are placed at 1 Gpc like in skyfield
+    plx = np.where(stars["plx_mas"] > 0.0, stars["plx_mas"], 1.0e-6).astype(np.float64)
+    inv_dist = np.sin(plx * _MAS_TO_RAD)
+
+    # Proper motion in units of the distance per day
+    pmr = stars["pmra_mas"] / (plx * 365.25) * inv_dist
+    pmd = stars["pmdec_mas"] / (plx * 365.25) * inv_dist
+    motion = np.stack([-pmr * np.sin(ra) - pmd * np.sin(dec) * np.cos(ra),
+                       pmr * np.cos(ra) - pmd * np.sin(dec) * np.sin(ra),
+                       pmd * np.cos(dec)], axis=-1)
+
+    dt_days = (np.asarray(ets, dtype=np.float64) - HIP_EPOCH_ET) / 86400.0
+    return direction + dt_days[:, np.newaxis, np.newaxis] * motion \
+        - np.asarray(observer_au)[:, np.newaxis, :] * inv_dist[:, np.newaxis]
+
+
+def comet_elements(row: t.Mapping[str, t.Any], gm: float = GM_SUN) -> np.ndarray:
+    """
+    spiceypy.conics elements (ECLIPJ2000, w.r.t. the Sun) of a comets_main row of mpc_comets.db.
+
+    Parameters
+    ----------
+    row : mapping
+        Row with the columns PERIHELION_AU, ECCENTRICITY, INCLINATION_DEG, LONG_OF_ASC_NODE_DEG,
+        ARG_OF_PERIH_DEG and EPOCH_ET (time of the perihelion passage).
+    gm : float, optional
+        Gravitational parameter of the Sun in km^3/s^2. The default is GM_SUN.
+
+    Returns
+    -------
+    elements : numpy.ndarray
+        Perihelion (km), eccentricity, inclination, node, argument of perihelion (rad), mean
+        anomaly (0), epoch (ET) and gm.
+    """
+    return np.array([
+        spiceypy.convrt(row["PERIHELION_AU"], "AU", "km"),
+        row["ECCENTRICITY"],
+        np.radians(row["INCLINATION_DEG"]),
+        np.radians(row["LONG_OF_ASC_NODE_DEG"]),
+        np.radians(row["ARG_OF_PERIH_DEG"]),
+        0.0,
+        row["EPOCH_ET"],
+        gm,
+    ])
+
+
+def comet_vectors(
+    elements: np.ndarray, ets: np.ndarray, observer: str = "EARTH", iterations: int = 3
+) -> np.ndarray:
+    """
+    Astrometric (light-time corrected) position of a comet w.r.t. an observer.
+
+    Requires an SPK with the barycentric positions of the Sun and the observer.
+
+    Parameters
+    ----------
+    elements : numpy.ndarray
+        Heliocentric conics elements in ECLIPJ2000 (see comet_elements).
+    ets : numpy.ndarray
+        Epochs (ET), shape (m,).
+    observer : str, optional
+        SPICE name of the observer. The default is 'EARTH'.
+    iterations : int, optional
+        Number of light-time iterations. The default is 3.
+
+    Returns
+    -------
+    vectors : numpy.ndarray
+        Positions in J2000 (km), shape (m, 3).
+    """
+    ets = np.atleast_1d(np.asarray(ets, dtype=np.float64))
+    observer_km = np.reshape(spiceypy.spkpos(observer, ets, "J2000", "NONE", "SSB")[0], (-1, 3))
+    ecl_to_j2000 = spiceypy.pxform("ECLIPJ2000", "J2000", 0.0)
+
+    light_time = np.zeros_like(ets)
+    for _ in range(iterations):
+        emission = ets - light_time
+        sun_km = np.reshape(spiceypy.spkpos("SUN", emission, "J2000", "NONE", "SSB")[0], (-1, 3))
+        helio_km = np.array([spiceypy.conics(elements, et)[:3] for et in emission]) @ ecl_to_j2000.T
+        vectors = sun_km + helio_km - observer_km
+        light_time = np.linalg.norm(vectors, axis=1) / spiceypy.clight()
+    return vectors
+
+
+def stereographic_projection(
+    center: np.ndarray, vectors: np.ndarray
+) -> t.Tuple[np.ndarray, np.ndarray]:
+    """
+    Stereographic projection of direction vectors around a center (skyfield's projection).
+
+    Parameters
+    ----------
+    center : numpy.ndarray
+        Center direction(s), shape (3,) or (..., 3); broadcast against vectors.
+    vectors : numpy.ndarray
+        Directions (not necessarily normalised), shape (..., 3).
+
+    Returns
+    -------
+    x, y : numpy.ndarray
+        Projected coordinates; a point at an angular distance theta from the center lies at a
+        radius of tan(theta / 2). x increases towards the east, y towards the north.
+    """
+    center = np.asarray(center, dtype=np.float64)
+    center = center / np.linalg.norm(center, axis=-1, keepdims=True)
+    x_c, y_c, z_c = np.moveaxis(center, -1, 0)
+
+    u = vectors / np.linalg.norm(vectors, axis=-1, keepdims=True)
+    x, y, z = np.moveaxis(u, -1, 0)
+
+    t0 = 1.0 / np.sqrt(x_c ** 2 + y_c ** 2)
+    t1 = x * x_c
+    t2 = np.sqrt(1.0 - z_c ** 2)
+    t3 = t0 * t2
+    t4 = y * y_c
+    t5 = 1.0 / (t1 * t3 + t3 * t4 + z * z_c + 1.0)
+    t6 = t0 * z_c
+    return t0 * t5 * (x * y_c - x_c * y), -t5 * (t1 * t6 - t2 * z + t4 * t6)
+
+
+def map_limit(fov_deg: float) -> float:
+    """Half width of the projected map for a field of view (edge to edge) in degrees."""
+    return float(np.tan(np.radians(fov_deg) / 4.0))
+
+
+class SkyFrames(t.NamedTuple):
+    """
+    Projected stars, constellation lines and comet track of a series of epochs.
+
+    Attributes
+    ----------
+    ets : numpy.ndarray
+        Epochs (ET), shape (m,).
+    star_hip, star_mag : numpy.ndarray
+        HIP number and magnitude of the n selected stars.
+    star_xy : numpy.ndarray
+        Projected star positions, shape (m, n, 2).
+    edges : numpy.ndarray
+        Constellation lines as pairs of star indices, shape (k, 2).
+    comet_xy : numpy.ndarray
+        Projected comet positions, shape (m, 2).
+    fov_deg, lim_mag : float
+        Field of view and limiting magnitude.
+    """
+
+    ets: np.ndarray
+    star_hip: np.ndarray
+    star_mag: np.ndarray
+    star_xy: np.ndarray
+    edges: np.ndarray
+    comet_xy: np.ndarray
+    fov_deg: float
+    lim_mag: float
+
+
+def comet_sky_frames(
+    catalog: np.ndarray,
+    elements: np.ndarray,
+    ets: np.ndarray,
+    fov_deg: float = 90.0,
+    lim_mag: float = 6.0,
+    constellations: t.Optional[t.Sequence[t.Tuple[str, t.Sequence[t.Tuple[int, int]]]]] = None,
+    follow: bool = False,
+    observer: str = "EARTH",
+) -> SkyFrames:
+    """
+    Compute the sky map of a comet (as seen from the observer) for every epoch.
+
+    Stars are selected by magnitude and field of view first; the astrometry and the projection
+    of the selected stars are then computed for all epochs in one array operation.
+
+    Parameters
+    ----------
+    catalog : numpy.ndarray
+        Star catalog (see load_hipparcos).
+    elements : numpy.ndarray
+        Conics elements of the comet (see comet_elements).
+    ets : numpy.ndarray
+        Epochs (ET) of the frames.
+    fov_deg : float, optional
+        Field of view (edge to edge) in degrees. The default is 90.
+    lim_mag : float, optional
+        Limiting magnitude of the stars. The default is 6.
+    constellations : sequence, optional
+        Constellation lines (see parse_constellations).
+    follow : bool, optional
+        Center every frame on the comet. Otherwise (the default) all frames share one center, the
+        mean direction of the comet.
+    observer : str, optional
+        SPICE name of the observer. The default is 'EARTH'.
+
+    Returns
+    -------
+    frames : SkyFrames
+        Projected stars, lines and comet.
+    """
+    ets = np.atleast_1d(np.asarray(ets, dtype=np.float64))
+    comet = comet_vectors(elements, ets, observer)
+    comet_dir = comet / np.linalg.norm(comet, axis=1, keepdims=True)
+    if follow:
+        centers = comet_dir
+    else:
+        centers = comet_dir.mean(axis=0)
+        centers = np.broadcast_to(centers / np.linalg.norm(centers), comet_dir.shape)
+
+    # Radius of the circle that contains the whole (square) map
+    radius_deg = np.degrees(2.0 * np.arctan(np.sqrt(2.0) * map_limit(fov_deg)))
+    edge_hips = [hip for _, edges in constellations or [] for edge in edges for hip in edge]
+    idx = select_stars(catalog, lim_mag, np.unique(centers, axis=0), radius_deg + 1.0,
+                       extra_hip=edge_hips, extra_radius_deg=radius_deg + EDGE_MARGIN_DEG)
+    stars = catalog[idx]
+
+    observer_au = np.reshape(spiceypy.spkpos(observer, ets, "J2000", "NONE", "SSB")[0], (-1, 3)) \
+        / spiceypy.convrt(1.0, "AU", "km")
+    star_x, star_y = stereographic_projection(centers[:, np.newaxis, :],
+                                              star_vectors(stars, ets, observer_au))
+    comet_x, comet_y = stereographic_projection(centers, comet)
+
+    # Constellation lines whose stars both have been selected
+    position = {hip: k for k, hip in enumerate(stars["hip"])}
+    edges = np.array([(position[hip1], position[hip2])
+                      for _, lines in constellations or [] for hip1, hip2 in lines
+                      if hip1 in position and hip2 in position], dtype=np.int64).reshape(-1, 2)
+
+    return SkyFrames(
+        ets=ets,
+        star_hip=stars["hip"].copy(),
+        star_mag=stars["mag"].copy(),
+        star_xy=np.stack([star_x, star_y], axis=-1).astype(np.float32),
+        edges=edges,
+        comet_xy=np.stack([comet_x, comet_y], axis=-1),
+        fov_deg=float(fov_deg),
+        lim_mag=float(lim_mag),
+    )
+
+
+# State of a rendering worker: the frames and one figure whose artists are updated per frame
+_WORKER: t.Dict[str, t.Any] = {}
+
+
+def _init_render_worker(frames: SkyFrames, figsize: float, dpi: int, track: bool) -> None:
+    # Imported here, since only the workers need matplotlib (without any GUI backend)
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.collections import LineCollection
+    from matplotlib.figure import Figure
+    from PIL import Image
+
+    fig = Figure(figsize=(figsize, figsize), dpi=dpi, facecolor="black")
+    FigureCanvasAgg(fig)
+    ax = fig.add_axes([0.0, 0.0, 1.0, 1.0], facecolor="black")
+    limit = map_limit(frames.fov_deg)
+    ax.set_xlim(-limit, limit)
+    ax.set_ylim(-limit, limit)
+    ax.set_aspect(1.0)
+    ax.set_axis_off()
+
+    # Only stars brighter than the limiting magnitude are drawn; the others are line ends
+    visible = np.flatnonzero(frames.star_mag <= frames.lim_mag)
+    sizes = (1.0 + frames.lim_mag - frames.star_mag[visible]) ** 2.0 * (figsize / 20.0) ** 2
+    stars = ax.scatter([], [], color="tab:red", linewidths=0)
+    lines = ax.add_collection(LineCollection(frames.star_xy[0, frames.edges], colors="tab:red", alpha=0.8))
+    path, = ax.plot([], [], lw=1, c="white", alpha=0.5, visible=track)
+    comet, = ax.plot([], [], marker="+", markersize=20 * figsize / 20.0, lw=0, c="white")
+    label = ax.text(0.02, 0.02, "", color="white", fontsize=12, transform=ax.transAxes)
+
+    _WORKER.update(frames=frames, fig=fig, pil_image=Image, visible=visible, sizes=sizes, limit=limit,
+                   stars=stars, lines=lines, path=path, comet=comet, label=label,
+                   dates=np.datetime_as_string(time_scales.et_to_utc(frames.ets), unit="m"))
+
+
+def _render_frame(k: int, file_path: str) -> str:
+    frames = _WORKER["frames"]
+
+    # Stars outside of the map (with a margin for the marker size) are not drawn at all
+    star_xy = frames.star_xy[k, _WORKER["visible"]]
+    in_view = np.all(np.abs(star_xy) <= 1.05 * _WORKER["limit"], axis=1)
+    _WORKER["stars"].set_offsets(star_xy[in_view])
+    _WORKER["stars"].set_sizes(_WORKER["sizes"][in_view])
+    _WORKER["lines"].set_segments(frames.star_xy[k, frames.edges])
+    _WORKER["path"].set_data(frames.comet_xy[:k + 1, 0], frames.comet_xy[:k + 1, 1])
+    _WORKER["comet"].set_data(frames.comet_xy[k:k + 1, 0], frames.comet_xy[k:k + 1, 1])
+    _WORKER["label"].set_text(_WORKER["dates"][k].replace("T", " ") + " UTC")
+
+    # Draw once and write the RGB buffer with fast PNG compression; savefig would re-draw the
+    # figure and spend most of the frame's time in the default (strong) compression
+    canvas = _WORKER["fig"].canvas
+    canvas.draw()
+    image = _WORKER["pil_image"].frombuffer("RGBA", canvas.get_width_height(), canvas.buffer_rgba())
+    image.convert("RGB").save(file_path, compress_level=1)
+    return file_path
+
+
+def render_frames(
+    frames: SkyFrames,
+    out_dir: t.Union[str, pathlib.Path],
+    max_workers: t.Optional[int] = None,
+    figsize: float = 8.0,
+    dpi: int = 100,
+    track: bool = True,
+    prefix: str = "frame",
+) -> t.List[pathlib.Path]:
+    """
+    Render every epoch of a sky map to a PNG file, spread over worker processes.
+
+    Every worker receives the frames once and re-uses one figure, whose artists are updated for
+    every frame, instead of building a new figure per frame.
+
+    Parameters
+    ----------
+    frames : SkyFrames
+        See comet_sky_frames.
+    out_dir : str or pathlib.Path
+        Output directory; the files are named <prefix>_00000.png, ...
+    max_workers : int, optional
+        Number of worker processes. The default is the number of CPUs.
+    figsize : float, optional
+        Width and height of the frames in inches. The default is 8.
+    dpi : int, optional
+        Resolution. The default is 100.
+    track : bool, optional
+        Draw the comet's path up to the frame's epoch. The default is True.
+    prefix : str, optional
+        File name prefix. The default is 'frame'.
+
+    Returns
+    -------
+    file_paths : list of pathlib.Path
+        PNG files in the order of the epochs.
+    """
+    out_dir = pathlib.Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    file_paths = [out_dir / f"{prefix}_{k:05d}.png" for k in range(len(frames.ets))]
+
+    with concurrent.futures.ProcessPoolExecutor(
+        max_workers=max_workers, initializer=_init_render_worker, initargs=(frames, figsize, dpi, track)
+    ) as executor:
+        list(executor.map(_render_frame, range(len(file_paths)), map(str, file_paths),
+                          chunksize=max(1, len(file_paths) // (4 * (max_workers or os.cpu_count() or 1)))))
+    return file_paths
@@ -0,0 +1,294 @@
+# Standard libraries
+import datetime
+import functools
+import pathlib
+import re
+import typing as t
+
+# Installed libraries
+import numpy as np
+
+# Vectorised conversions between UTC (NumPy datetime64), Julian dates split into day and fraction
+# (as expected by SGP4) and SPICE ephemeris time (ET, TDB seconds past J2000). The notebooks and
+# the tracker convert one epoch at a time (datetime objects, sgp4.api.jday, spiceypy.utc2et /
+# et2datetime). Here, the leap seconds and the TDB - TT model are read once from the SPICE
+# leapseconds kernel and applied to whole arrays with the same formulas as SPICE's DELTET, so the
+# results agree with spiceypy to well below a microsecond. SPICE itself is not needed.
+#
+# UTC is represented as datetime64[us] in the proleptic Gregorian calendar (SPICE interprets dates
+# before 1582-10-15 in the Julian calendar). datetime64 has no 23:59:60: ETs within a leap second
+# are mapped onto the first second of the following day.
+
+# Default leapseconds kernel
+LSK_PATH = pathlib.Path(__file__).resolve().parents[1] / "kernels" / "lsk" / "naif0012.tls"
+
+# Julian date of J2000 (2000-01-01 12:00:00) and of the Unix epoch (1970-01-01 00:00:00)
+J2000_JD = 2451545.0
+UNIX_EPOCH_JD = 2440587.5
+
+# UTC of J2000 as used by SPICE for "UTC seconds past J2000"
+J2000_UTC = np.datetime64("2000-01-01T12:00:00", "us")
+
+# First day of the Gregorian calendar
+GREGORIAN_START = np.datetime64("1582-10-15", "us")
+
+_US_PER_DAY = 86400 * 1_000_000
+_MONTHS = {name: number for number, name in enumerate(
+    ["JAN", "FEB", "MAR", "APR", "MAY", "JUN", "JUL", "AUG", "SEP", "OCT", "NOV", "DEC"], start=1)}
+
+
+class LeapSeconds(t.NamedTuple):
+    """
+    Content of a leapseconds kernel (the DELTET variables).
+
+    Attributes
+    ----------
+    delta_t_a : float
+        TT - TAI in seconds (32.184).
+    k, eb : float
+        Amplitude (s) and eccentricity of the periodic TDB - TT term.
+    m : tuple of float
+        Mean anomaly of the Earth-Moon barycentre at J2000 (rad) and its rate (rad/s).
+    epochs : numpy.ndarray
+        UTC of the leap second table entries in seconds past J2000 (86400 s per day).
+    delta_at : numpy.ndarray
+        TAI - UTC in seconds from the corresponding epoch on. Before the first epoch, SPICE uses
+        the first value minus one second.
+    """
+
+    delta_t_a: float
+    k: float
+    eb: float
+    m: t.Tuple[float, float]
+    epochs: np.ndarray
+    delta_at: np.ndarray
+
+
+def _parse_lsk_date(token: str) -> np.datetime64:
+    # Dates of the DELTA_AT table are written as @1972-JAN-1
+    year, month, day = token.lstrip("@").split("-")
+    return np.datetime64(f"{int(year):04d}-{_MONTHS[month.upper()]:02d}-{int(day):02d}", "us")
+
+
+@functools.lru_cache(maxsize=None)
+def load_leapseconds(path: t.Union[str, pathlib.Path] = LSK_PATH) -> LeapSeconds:
+    """
+    Read the DELTET variables of a leapseconds kernel (cached per path).
+
+    Parameters
+    ----------
+    path : str or pathlib.Path, optional
+        Path of the kernel. The default is kernels/lsk/naif0012.tls.
+
+    Returns
+    -------
+    leapseconds : LeapSeconds
+        Constants and leap second table.
+    """
+    text = pathlib.Path(path).read_text()
+
+    # Only the \begindata ... \begintext blocks contain kernel variables
+    data = " ".join(re.findall(r"\\begindata(.*?)(?:\\begintext|$)", text, flags=re.S))
+    values = {}
+    for name, value in re.findall(r"DELTET/(\w+)\s*=\s*(\([^)]*\)|\S+)", data):
+        values[name] = value.strip("()").replace(",", " ").split()
+
+    def number(token: str) -> float:
+        return float(token.upper().replace("D", "E"))
+
+    table = values["DELTA_AT"]
+    return LeapSeconds(
+        delta_t_a=number(values["DELTA_T_A"][0]),
+        k=number(values["K"][0]),
+        eb=number(values["EB"][0]),
+        m=(number(values["M"][0]), number(values["M"][1])),
+        epochs=np.array([(_parse_lsk_date(date) - J2000_UTC) / np.timedelta64(1, "s")
+                         for date in table[1::2]]),
+        delta_at=np.array([number(delta) for delta in table[0::2]]),
+    )
+
+
+def _delta_at(lsk: LeapSeconds, idx: np.ndarray) -> np.ndarray:
+    """TAI - UTC for table indices (-1 before the first epoch)."""
+    return np.where(idx < 0, lsk.delta_at[0] - 1.0, lsk.delta_at[np.maximum(idx, 0)])
+
+
+def to_datetime64(utc: t.Any) -> np.ndarray:
+    """
+    Convert UTC epochs to a datetime64[us] array.
+
+    Parameters
+    ----------
+    utc : array_like
+        datetime64 values, ISO 8601 strings or datetime.datetime objects (naive ones are taken as
+        UTC, aware ones are converted to UTC). Scalars are returned as 0-d arrays.
+
+    Returns
+    -------
+    utc : numpy.ndarray
+        UTC as datetime64[us].
+    """
+    if isinstance(utc, datetime.datetime) and utc.tzinfo is not None:
+        utc = utc.astimezone(datetime.UTC).replace(tzinfo=None)
+    values = np.asarray(utc)
+    if values.dtype == object:
+        values = np.array([value.astimezone(datetime.UTC).replace(tzinfo=None)
+                           if isinstance(value, datetime.datetime) and value.tzinfo is not None
+                           else value for value in values.ravel()]).reshape(values.shape)
+    return values.astype("datetime64[us]")
+
+
+def calendar_to_datetime64(
+    year: np.ndarray, month: np.ndarray, day: np.ndarray, seconds: t.Optional[np.ndarray] = None
+) -> np.ndarray:
+    """
+    Build UTC epochs from calendar components without parsing strings.
+
+    Parameters
+    ----------
+    year, month, day : array_like
+        Calendar date; day may include the fraction of the day (rounded to microseconds).
+    seconds : array_like, optional
+        Seconds of the day that are added to the date.
+
+    Returns
+    -------
+    utc : numpy.ndarray
+        UTC as datetime64[us].
+    """
+    year, month, day = np.broadcast_arrays(np.asarray(year, dtype=np.int64),
+                                           np.asarray(month, dtype=np.int64),
+                                           np.asarray(day, dtype=np.float64))
+    first_of_month = ((year - 1970) * 12 + (month - 1)).astype("datetime64[M]").astype("datetime64[us]")
+    utc = first_of_month + np.round((day - 1.0) * _US_PER_DAY).astype(np.int64).astype("timedelta64[us]")
+    if seconds is not None:
+        utc = utc + np.round(np.asarray(seconds) * 1e6).astype(np.int64).astype("timedelta64[us]")
+    return utc
+
+
+def utc_to_et(utc: t.Any, leapseconds: t.Optional[LeapSeconds] = None) -> np.ndarray:
+    """
+    Convert UTC to ET, like spiceypy.utc2et.
+
+    ET = UTC + (TAI - UTC) + (TT - TAI) + K sin(E), with the eccentric anomaly E of the
+    Earth-Moon barycentre evaluated at TT (the DELTET model of SPICE).
+
+    Parameters
+    ----------
+    utc : array_like
+        UTC epochs, see to_datetime64.
+    leapseconds : LeapSeconds, optional
+        Leap second data. The default is load_leapseconds().
+
+    Returns
+    -------
+    et : numpy.ndarray
+        Ephemeris time in seconds past J2000 (TDB).
+    """
+    lsk = leapseconds or load_leapseconds()
+    utc_s = (to_datetime64(utc) - J2000_UTC).astype(np.int64) / 1e6
+
+    tt = utc_s + _delta_at(lsk, np.searchsorted(lsk.epochs, utc_s, side="right") - 1) + lsk.delta_t_a
+    mean_anomaly = lsk.m[0] + lsk.m[1] * tt
+    return tt + lsk.k * np.sin(mean_anomaly + lsk.eb * np.sin(mean_anomaly))
+
+
+def et_to_utc(et: np.ndarray, leapseconds: t.Optional[LeapSeconds] = None) -> np.ndarray:
+    """
+    Convert ET to UTC (rounded to microseconds), like spiceypy.et2datetime.
+
+    Parameters
+    ----------
+    et : array_like
+        Ephemeris time in seconds past J2000 (TDB).
+    leapseconds : LeapSeconds, optional
+        Leap second data. The default is load_leapseconds().
+
+    Returns
+    -------
+    utc : numpy.ndarray
+        UTC as datetime64[us].
+    """
+    lsk = leapseconds or load_leapseconds()
+    et = np.asarray(et, dtype=np.float64)
+
+    # Like SPICE, the periodic term is evaluated at ET instead of TT (difference < 1e-9 s)
+    mean_anomaly = lsk.m[0] + lsk.m[1] * et
+    tai = et - lsk.k * np.sin(mean_anomaly + lsk.eb * np.sin(mean_anomaly)) - lsk.delta_t_a
+
+    # The table epochs in TAI: a leap second starts when TAI reaches epoch + new TAI - UTC - 1
+    idx = np.searchsorted(lsk.epochs + lsk.delta_at, tai, side="right") - 1
+    utc_us = np.round((tai - _delta_at(lsk, idx)) * 1e6).astype(np.int64)
+    return J2000_UTC + utc_us.astype("timedelta64[us]")
+
+
+def utc_to_jd(utc: t.Any) -> t.Tuple[np.ndarray, np.ndarray]:
+    """
+    Convert UTC to Julian dates split into day and fraction, like sgp4.api.jday.
+
+    Returns
+    -------
+    jd : numpy.ndarray
+        Julian date of the preceding midnight (x.5).
+    fr : numpy.ndarray
+        Fraction of the day in [0, 1).
+    """
+    us = (to_datetime64(utc) - np.datetime64("1970-01-01", "us")).astype(np.int64)
+    days, us_of_day = np.divmod(us, _US_PER_DAY)
+    return UNIX_EPOCH_JD + days, us_of_day / _US_PER_DAY
+
+
+def jd_to_utc(jd: np.ndarray, fr: t.Optional[np.ndarray] = None) -> np.ndarray:
+    """Convert (split) Julian dates to UTC as datetime64[us]."""
+    jd = np.asarray(jd, dtype=np.float64)
+    fr = np.zeros_like(jd) if fr is None else np.asarray(fr, dtype=np.float64)
+
+    # Whole days and fractions are converted separately to keep microsecond precision
+    whole = np.floor(jd - UNIX_EPOCH_JD)
+    frac = (jd - UNIX_EPOCH_JD - whole) + fr
+    us = whole.astype(np.int64) * _US_PER_DAY + np.round(frac * _US_PER_DAY).astype(np.int64)
+    return np.datetime64("1970-01-01", "us") + us.astype("timedelta64[us]")
+
+
+def utc_grid(
+    start: t.Any,
+    step_s: float,
+    n_steps: t.Optional[int] = None,
+    end: t.Any = None,
+) -> np.ndarray:
+    """
+    Regular UTC grid as datetime64[us], without a Python-level loop.
+
+    Parameters
+    ----------
+    start : datetime64, datetime.datetime or str
+        First epoch.
+    step_s : float
+        Step in seconds (rounded to microseconds).
+    n_steps : int, optional
+        Number of epochs. Either n_steps or end must be given.
+    end : datetime64, datetime.datetime or str, optional
+        Last epoch (included if it lies on the grid).
+
+    Returns
+    -------
+    grid : numpy.ndarray
+        UTC epochs.
+    """
+    start = to_datetime64(start)
+    step = np.timedelta64(int(round(step_s * 1e6)), "us")
+    if n_steps is None:
+        if end is None:
+            raise ValueError("Either n_steps or end must be given")
+        n_steps = int((to_datetime64(end) - start) // step) + 1
+    return start + np.arange(n_steps, dtype=np.int64) * step
+
+
+def jd_grid(start: t.Any, step_s: float, n_steps: int) -> t.Tuple[np.ndarray, np.ndarray]:
+    """Regular grid of split Julian dates (see utc_grid and utc_to_jd), e.g., for SGP4."""
+    return utc_to_jd(utc_grid(start, step_s, n_steps))
+
+
+def et_grid(start: t.Any, step_s: float, n_steps: t.Optional[int] = None, end: t.Any = None) -> np.ndarray:
+    """Regular UTC grid (see utc_grid) converted to ET."""
+    return utc_to_et(utc_grid(start, step_s, n_steps, end))
@@ -0,0 +1,71 @@
+# bench_mandelbrot.py
+
+# Pixels per second of the Mandelbrot PBM engines: the pure-Python reference
+# (mandelbrot2.py, run as a subprocess like a user would) and the NumPy engine
+# of mandelbrot_fast.py for 1, 2, 4, ... processes. The reference is timed on
+# a smaller image since it is several orders of magnitude slower; both outputs
+# are compared byte by byte on that size.
+
+import argparse
+import io
+import os
+import pathlib
+import subprocess
+import sys
+import time
+
+MANDELBROT_DIR = pathlib.Path(__file__).resolve().parents[1] / "space_debris_tracker" / "Mandelbrot Projects"
+sys.path.insert(1, str(MANDELBROT_DIR))
+import mandelbrot_fast # type: ignore
+
+
+def run_reference(size):
+    """Returns the PBM bytes of the reference engine and the run time in seconds."""
+    start = time.perf_counter()
+    output = subprocess.run([sys.executable, str(MANDELBROT_DIR / "mandelbrot2.py"), str(size)],
+                            check=True, stdout=subprocess.PIPE).stdout
+    return output, time.perf_counter() - start
+
+
+def run_fast(size, processes, repeats=3):
+    """Returns the PBM bytes of the fast engine and the best-of-N run time in seconds."""
+    best = float("inf")
+    for _ in range(repeats):
+        out = io.BytesIO()
+        start = time.perf_counter()
+        mandelbrot_fast.write_pbm(size, out, processes)
+        best = min(best, time.perf_counter() - start)
+    return out.getvalue(), best
+
+
+def core_counts(max_processes):
+    counts, n = [], 1
+    while n < max_processes:
+        counts.append(n)
+        n *= 2
+    return counts + [max_processes]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mandelbrot PBM engines, pixels per second")
+    parser.add_argument("--size", type=int, default=2000, help="image size of the fast engine")
+    parser.add_argument("--reference-size", type=int, default=300,
+                        help="image size of the reference engine (and of the output check)")
+    parser.add_argument("--max-processes", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    reference, seconds = run_reference(args.reference_size)
+    identical = reference == run_fast(args.reference_size, 1, repeats=1)[0]
+    print(f"{'engine':<10} {'processes':>9} {'size':>6} {'Mpixel/s':>9}")
+    print(f"{'reference':<10} {1:>9} {args.reference_size:>6} "
+          f"{args.reference_size ** 2 / seconds / 1e6:>9.3f}")
+
+    for processes in core_counts(args.max_processes):
+        _, seconds = run_fast(args.size, processes)
+        print(f"{'fast':<10} {processes:>9} {args.size:>6} {args.size ** 2 / seconds / 1e6:>9.3f}")
+
+    print(f"byte-identical output: {identical}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+# bench_moid.py
+
+# Checks moid.moid against a brute-force reference on synthetic orbits w.r.t.
+# a Jupiter-like orbit. Half of the orbits have their aphelion near Jupiter's
+# orbit, where the MOID often lies across the aphelion (true anomaly +-pi),
+# with perihelia down to sungrazers; the others are comet-like orbits including
+# near-parabolic and hyperbolic ones. The reference samples both orbits on a
+# dense grid and zooms into every local minimum of the grid.
+
+import argparse
+import pathlib
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(1, str(pathlib.Path(__file__).resolve().parents[1] / "auxiliary"))
+import moid # type: ignore
+
+AU_KM = 149597870.7
+GM_SUN = 1.32712440041e11
+
+# Osculating elements of Jupiter (conics order), about J2000
+JUPITER = np.array([4.95 * AU_KM, 0.0489, np.radians(1.303), np.radians(100.46),
+                    np.radians(273.87), 0.0, 0.0, GM_SUN])
+
+
+def make_orbits(n_objects, seed=0):
+    """Returns deterministic conics elements, shape (n_objects, 8)."""
+    rng = np.random.default_rng(seed)
+    n_jfc = n_objects // 2
+    n_comet = n_objects - n_jfc
+
+    # Aphelion 4.8 - 5.6 AU and low inclination; the perihelion ranges from sungrazers
+    # (e ~ 0.99) to Jupiter-family-like orbits (1 - 3 AU)
+    peri = np.concatenate([10.0 ** rng.uniform(-2.0, 0.5, n_jfc), rng.uniform(0.3, 6.0, n_comet)])
+    aphe = rng.uniform(4.8, 5.6, n_jfc)
+    ecc = np.concatenate([(aphe - peri[:n_jfc]) / (aphe + peri[:n_jfc]),
+                          rng.choice([0.3, 0.7, 0.95, 1.0, 1.3], n_comet)])
+    inc = np.concatenate([rng.uniform(0.0, 0.3, n_jfc), rng.uniform(0.0, np.pi, n_comet)])
+    return np.column_stack([
+        peri * AU_KM, ecc, inc,
+        rng.uniform(0.0, 2.0 * np.pi, n_objects),
+        rng.uniform(0.0, 2.0 * np.pi, n_objects),
+        np.zeros(n_objects), np.zeros(n_objects), np.full(n_objects, GM_SUN),
+    ])
+
+
+def conic_position(elements, nu):
+    """Positions (km) on the conic of one element set at the true anomalies nu."""
+    peri, ecc, inc, lnode, argp = elements[:5]
+    rho = peri * (1.0 + ecc) / (1.0 + ecc * np.cos(nu))
+    arg = argp + nu
+    return rho[..., np.newaxis] * np.stack([
+        np.cos(lnode) * np.cos(arg) - np.sin(lnode) * np.sin(arg) * np.cos(inc),
+        np.sin(lnode) * np.cos(arg) + np.cos(lnode) * np.sin(arg) * np.cos(inc),
+        np.sin(arg) * np.sin(inc)], axis=-1)
+
+
+def brute_force_moid(elements, planet, r_max, grid=720, zoom_cells=10, levels=12):
+    """
+    Returns the MOID (km) of one orbit: dense grid, then an iterated zoom into
+    every local minimum of the grid. The object's orbit is sampled where its
+    radius is at most r_max (as in moid.moid); closed orbits wrap around.
+    """
+    peri, ecc = elements[:2]
+    cos_lim = (peri * (1.0 + ecc) / r_max - 1.0) / ecc if ecc > 0.0 else -1.0
+    nu_lim = np.arccos(np.clip(cos_lim, -1.0, 1.0))
+    closed = nu_lim >= np.pi
+
+    nu_obj = np.linspace(-nu_lim, nu_lim, grid, endpoint=not closed)
+    nu_pl = np.linspace(-np.pi, np.pi, grid, endpoint=False)
+    dist2 = np.sum((conic_position(elements, nu_obj)[:, np.newaxis]
+                    - conic_position(planet, nu_pl)[np.newaxis]) ** 2, axis=-1)
+
+    # Local minima w.r.t. the eight neighbours (the ends of open arcs are padded)
+    if closed:
+        padded = np.pad(dist2, ((1, 1), (0, 0)), mode="wrap")
+    else:
+        padded = np.pad(dist2, ((1, 1), (0, 0)), mode="constant", constant_values=np.inf)
+    padded = np.pad(padded, ((0, 0), (1, 1)), mode="wrap")
+    neighbours = [padded[1 + di:grid + 1 + di, 1 + dj:grid + 1 + dj]
+                  for di in (-1, 0, 1) for dj in (-1, 0, 1) if di or dj]
+    minima = np.argwhere(np.all([dist2 <= other for other in neighbours], axis=0))
+
+    best = np.inf
+    offsets = np.linspace(-1.0, 1.0, 2 * zoom_cells + 1)
+    for i, j in minima:
+        u, v = nu_obj[i], nu_pl[j]
+        width = np.array([nu_obj[1] - nu_obj[0], nu_pl[1] - nu_pl[0]]) * 2.0
+        for _ in range(levels):
+            u_try = u + width[0] * offsets
+            if not closed:
+                u_try = np.clip(u_try, -nu_lim, nu_lim)
+            v_try = v + width[1] * offsets
+            d2 = np.sum((conic_position(elements, u_try)[:, np.newaxis]
+                         - conic_position(planet, v_try)[np.newaxis]) ** 2, axis=-1)
+            k, m = np.unravel_index(np.argmin(d2), d2.shape)
+            u, v = u_try[k], v_try[m]
+            width /= zoom_cells / 2.0
+        best = min(best, d2[k, m])
+    return np.sqrt(best)
+
+
+def check_moid(n_objects=200, seed=0):
+    """
+    Returns the run time of moid.moid and its largest deviation (km) from the
+    reference, with the index of that object.
+    """
+    elements = make_orbits(n_objects, seed)
+
+    start = time.perf_counter()
+    moid_km, _, _ = moid.moid(elements, JUPITER)
+    seconds = time.perf_counter() - start
+
+    r_max = 2.0 * JUPITER[0] * (1.0 + JUPITER[1]) / (1.0 - JUPITER[1])
+    reference = np.array([brute_force_moid(row, JUPITER, r_max) for row in elements])
+    deviation = moid_km - reference
+    worst = int(np.argmax(np.abs(deviation)))
+    return seconds, deviation[worst], worst
+
+
+def main():
+    parser = argparse.ArgumentParser(description="moid.moid vs. a brute-force reference")
+    parser.add_argument("-n", "--objects", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--tolerance", type=float, default=1.0,
+                        help="largest accepted deviation in km")
+    args = parser.parse_args()
+
+    seconds, deviation, worst = check_moid(args.objects, args.seed)
+    print(f"moid.moid       : {seconds:8.3f} s for N={args.objects}")
+    print(f"max. deviation  : {deviation:8.3f} km (object {worst})")
+    if abs(deviation) > args.tolerance:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
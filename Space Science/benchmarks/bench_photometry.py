@@ -0,0 +1,72 @@
+# bench_photometry.py
+
+# Compares the scalar H-G photometry functions of the auxiliary folder with
+# their array versions on N synthetic objects. The scalar loop is timed on a
+# sample of the objects and extrapolated to N, since a full scalar run at
+# N=1e6 takes minutes.
+
+import argparse
+import pathlib
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(1, str(pathlib.Path(__file__).resolve().parents[1] / "auxiliary"))
+import photometry # type: ignore
+
+
+def make_objects(n_objects, seed=0):
+    """Returns deterministic H, G and object-observer / object-Sun vectors."""
+    rng = np.random.default_rng(seed)
+    abs_mag = rng.uniform(5.0, 20.0, n_objects)
+    slope_g = rng.uniform(0.0, 1.0, n_objects)
+    vec_obj2obs = rng.normal(size=(n_objects, 3)) * 3.0
+    vec_obj2ill = rng.normal(size=(n_objects, 3)) * 2.0
+    return abs_mag, slope_g, vec_obj2obs, vec_obj2ill
+
+
+def bench_hg_app_mag(n_objects=1_000_000, scalar_sample=50_000, repeats=5):
+    """
+    Returns the per-object time of the scalar and array H-G apparent magnitude
+    together with the largest relative difference of their results.
+    """
+    abs_mag, slope_g, vec_obj2obs, vec_obj2ill = make_objects(n_objects)
+
+    # Best-of-N timing of the array version over all objects
+    vec_time = np.inf
+    for _ in range(repeats):
+        start = time.perf_counter()
+        app_mag_vec = photometry.hg_app_mag_vec(abs_mag, vec_obj2obs, vec_obj2ill, slope_g)
+        vec_time = min(vec_time, time.perf_counter() - start)
+
+    # The scalar version on the first scalar_sample objects
+    sample = min(scalar_sample, n_objects)
+    start = time.perf_counter()
+    app_mag_scalar = np.array([
+        photometry.hg_app_mag(abs_mag[k], vec_obj2obs[k], vec_obj2ill[k], slope_g[k])
+        for k in range(sample)
+    ])
+    scalar_time = time.perf_counter() - start
+
+    max_rel_diff = np.max(np.abs(app_mag_vec[:sample] - app_mag_scalar) / np.abs(app_mag_scalar))
+    return scalar_time / sample, vec_time / n_objects, max_rel_diff
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scalar vs. array H-G photometry")
+    parser.add_argument("-n", "--objects", type=int, default=1_000_000)
+    parser.add_argument("--scalar-sample", type=int, default=50_000)
+    args = parser.parse_args()
+
+    scalar_per_obj, vec_per_obj, max_rel_diff = bench_hg_app_mag(args.objects, args.scalar_sample)
+
+    print(f"hg_app_mag     (scalar): {args.objects * scalar_per_obj:8.3f} s for N={args.objects:.0e}"
+          f" (extrapolated from {min(args.scalar_sample, args.objects)} objects)")
+    print(f"hg_app_mag_vec (array) : {args.objects * vec_per_obj:8.3f} s for N={args.objects:.0e}")
+    print(f"speed-up               : {scalar_per_obj / vec_per_obj:8.1f} x")
+    print(f"max. rel. difference   : {max_rel_diff:8.1e}")
+
+
+if __name__ == "__main__":
+    main()
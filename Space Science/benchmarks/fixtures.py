@@ -0,0 +1,162 @@
+# fixtures.py
+
+# Deterministic synthetic inputs of the benchmark suite: a TLE catalog, an MPC
+# style comet table (cometels.json.gz) and a small SPK of one fictitious
+# asteroid. Every fixture depends only on its size and seed, so two runs (and
+# two machines) benchmark the same data. The files are generated on first use
+# and cached in FIXTURE_DIR; the SPK is generated rather than committed since
+# .bsp files are stored in Git LFS.
+
+import gzip
+import json
+import os
+import pathlib
+import tempfile
+
+import numpy as np
+import spiceypy
+
+# Bump whenever a generator changes so that cached fixtures are rebuilt
+FIXTURE_VERSION = 1
+
+FIXTURE_DIR = pathlib.Path(os.environ.get(
+    "SPACE_SCIENCE_FIXTURE_DIR", pathlib.Path(tempfile.gettempdir()) / "space-science-bench"))
+
+# Epoch of all generated TLEs: 2025-04-28 12:00 UTC (day of year 118.5)
+TLE_EPOCH_YEAR = 2025
+TLE_EPOCH_DAY = 118.5
+
+# NAIF ID, centre, frame and coverage of the SPK fixture (two years from
+# 2025-01-01 TDB, one state per day)
+SPK_BODY_ID = 2999999
+SPK_CENTER_ID = 10
+SPK_FRAME = "ECLIPJ2000"
+SPK_ET_START = 788918400.0
+SPK_DAYS = 730
+GM_SUN = 1.32712440018e11
+AU_KM = 149597870.7
+
+
+def fixture_path(name):
+    """Path of a cached fixture file; the fixture version is part of the name."""
+    FIXTURE_DIR.mkdir(parents=True, exist_ok=True)
+    return FIXTURE_DIR / f"v{FIXTURE_VERSION}_{name}"
+
+
+def tle_checksum(line):
+    """Modulo-10 checksum of the first 68 columns of a TLE line (minus signs count 1)."""
+    return sum(int(c) if c.isdigit() else c == "-" for c in line[:68]) % 10
+
+
+def make_tle_lines(n_satellites, seed=0):
+    """
+    Returns n_satellites (name, line1, line2) tuples of valid element sets.
+
+    The mix resembles a public catalog: mostly LEO objects, some MEO and GEO
+    objects, all with the epoch TLE_EPOCH_YEAR / TLE_EPOCH_DAY.
+    """
+    rng = np.random.default_rng(seed)
+    regime = rng.choice(3, size=n_satellites, p=[0.8, 0.1, 0.1])
+    mean_motion = np.select([regime == 0, regime == 1],
+                            [rng.uniform(13.5, 15.6, n_satellites), rng.uniform(1.8, 2.2, n_satellites)],
+                            rng.uniform(0.99, 1.01, n_satellites))
+    eccentricity = np.where(regime == 0, rng.uniform(0.0, 0.02, n_satellites), rng.uniform(0.0, 0.01, n_satellites))
+    inclination = np.where(regime == 2, rng.uniform(0.0, 15.0, n_satellites), rng.uniform(0.0, 110.0, n_satellites))
+    raan, arg_perigee, mean_anomaly = rng.uniform(0.0, 360.0, (3, n_satellites))
+    bstar_mantissa = rng.integers(10000, 99999, n_satellites)
+
+    entries = []
+    for k in range(n_satellites):
+        norad_id = 10000 + k
+        line1 = (f"1 {norad_id:05d}U {TLE_EPOCH_YEAR - 2000:02d}{k % 1000:03d}A   "
+                 f"{TLE_EPOCH_YEAR - 2000:02d}{TLE_EPOCH_DAY:012.8f}  .00000100  00000-0 "
+                 f" {bstar_mantissa[k]:05d}-4 0  999")
+        line2 = (f"2 {norad_id:05d} {inclination[k]:8.4f} {raan[k]:8.4f} "
+                 f"{round(eccentricity[k] * 1e7):07d} {arg_perigee[k]:8.4f} {mean_anomaly[k]:8.4f} "
+                 f"{mean_motion[k]:11.8f}{k % 100000:05d}")
+        entries.append((f"BENCH-{k:06d}", line1 + str(tle_checksum(line1)), line2 + str(tle_checksum(line2))))
+    return entries
+
+
+def tle_catalog(n_satellites, seed=0):
+    """Returns the path of a 3-line TLE file with n_satellites entries."""
+    path = fixture_path(f"tle_{n_satellites}_{seed}.txt")
+    if not path.is_file():
+        text = "".join(f"{name}\n{line1}\n{line2}\n" for name, line1, line2 in make_tle_lines(n_satellites, seed))
+        path.write_text(text)
+    return path
+
+
+def make_comet_records(n_comets, seed=0):
+    """
+    Returns n_comets records with the fields of the MPC cometels.json file,
+    including hyperbolic orbits and duplicated perihelion dates.
+    """
+    rng = np.random.default_rng(seed)
+    eccentricity = np.where(rng.random(n_comets) < 0.9, rng.uniform(0.05, 0.999, n_comets),
+                            rng.uniform(1.0, 1.1, n_comets))
+    year = rng.integers(1900, 2030, n_comets)
+    month = rng.integers(1, 13, n_comets)
+    day = np.round(rng.integers(1, 29, n_comets) + rng.random(n_comets), 4)
+
+    records = []
+    for k in range(n_comets):
+        periodic = eccentricity[k] < 0.98
+        records.append({
+            "Orbit_type": "P" if periodic else "C",
+            "Provisional_packed_desig": f"K{k:06d}",
+            "Year_of_perihelion": int(year[k]),
+            "Month_of_perihelion": int(month[k]),
+            "Day_of_perihelion": float(day[k]),
+            "Perihelion_dist": round(float(rng.uniform(0.1, 10.0)), 6),
+            "e": round(float(eccentricity[k]), 6),
+            "Peri": round(float(rng.uniform(0.0, 360.0)), 4),
+            "Node": round(float(rng.uniform(0.0, 360.0)), 4),
+            "i": round(float(rng.uniform(0.0, 180.0)), 4),
+            "Epoch_year": 2025,
+            "Epoch_month": 5,
+            "Epoch_day": 5,
+            "H": round(float(rng.uniform(5.0, 18.0)), 1),
+            "G": 4.0,
+            "Designation_and_name": f"{'P' if periodic else 'C'}/{year[k]} B{k} (Bench)",
+            "Ref": "MPC 00000",
+        })
+    return records
+
+
+def comet_table(n_comets, seed=0):
+    """Returns the path of a g-zipped JSON comet table with n_comets records."""
+    path = fixture_path(f"comets_{n_comets}_{seed}.json.gz")
+    if not path.is_file():
+        with gzip.open(path, "wt", encoding="utf-8") as file:
+            json.dump(make_comet_records(n_comets, seed), file)
+    return path
+
+
+def spk():
+    """
+    Returns the path of an SPK (type 9, Lagrange interpolation) with the
+    heliocentric two-body orbit of the fictitious asteroid SPK_BODY_ID.
+    """
+    path = fixture_path("asteroid.bsp")
+    if path.is_file():
+        return path
+
+    # a = 2.7 AU, e = 0.15, i = 10 deg, perihelion at SPK_ET_START
+    elements = [2.7 * AU_KM * (1.0 - 0.15), 0.15, np.radians(10.0), np.radians(80.0),
+                np.radians(150.0), 0.0, SPK_ET_START, GM_SUN]
+    epochs = SPK_ET_START + np.arange(SPK_DAYS + 1) * 86400.0
+    states = np.array([spiceypy.conics(elements, et) for et in epochs])
+
+    # spkopn fails on existing files; write to a temporary name and rename, so
+    # an interrupted run never leaves a broken fixture behind
+    partial = path.with_suffix(".partial")
+    partial.unlink(missing_ok=True)
+    handle = spiceypy.spkopn(str(partial), "BENCH", 0)
+    try:
+        spiceypy.spkw09(handle, SPK_BODY_ID, SPK_CENTER_ID, SPK_FRAME, epochs[0], epochs[-1],
+                        "SYNTHETIC ASTEROID", 7, len(epochs), states.tolist(), epochs.tolist())
+    finally:
+        spiceypy.spkcls(handle)
+    partial.replace(path)
+    return path
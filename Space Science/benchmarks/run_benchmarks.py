@@ -0,0 +1,376 @@
+# run_benchmarks.py
+
+# Benchmark suite of the project's hot paths on the deterministic fixtures of
+# fixtures.py. Every case runs in a fresh process (so that its peak resident
+# set size is its own), is called once to warm up and then `repeats` times.
+# The results are written as JSON:
+#
+#   {"meta": {...}, "results": {"<case>": {"size": ..., "ops_per_s": ...,
+#    "p50_ms": ..., "p99_ms": ..., "peak_rss_mb": ...}}}
+#
+# ops_per_s counts the case's unit of work (states, objects, rows, pixels)
+# per second of the median call. Results are compared with a stored baseline
+# (benchmarks/baseline.json): a case whose throughput dropped, or whose peak
+# RSS grew, by more than the tolerance is flagged as a regression and the
+# script exits with status 1. Baselines are machine specific; record one with
+# --save-baseline on the machine that runs the comparison.
+
+import argparse
+import datetime
+import io
+import json
+import multiprocessing
+import os
+import pathlib
+import platform
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+BENCH_DIR = pathlib.Path(__file__).resolve().parent
+ROOT_DIR = BENCH_DIR.parent
+MANDELBROT_DIR = ROOT_DIR / "space_debris_tracker" / "Mandelbrot Projects"
+for folder in (BENCH_DIR, ROOT_DIR / "auxiliary", ROOT_DIR / "space_debris_tracker", MANDELBROT_DIR):
+    sys.path.insert(1, str(folder))
+import fixtures # type: ignore
+
+BASELINE_PATH = BENCH_DIR / "baseline.json"
+
+# Default tolerance of the baseline comparison (relative change)
+TOLERANCE = 0.2
+
+# Every case is a function size -> (call, ops): call() runs the benchmarked
+# code once and ops is the number of work units it processes. Fixtures and
+# other set-up are created before call is returned and are not timed.
+CASES = {}
+
+
+def case(size):
+    """Registers a benchmark case with its default size."""
+    def register(function):
+        CASES[function.__name__] = (function, size)
+        return function
+    return register
+
+
+def _fixture_start():
+    return datetime.datetime(2025, 4, 28, 12, tzinfo=datetime.UTC)
+
+
+@case(size=1440)
+def propagate_satellite(size):
+    """predict_orbit.propagate_satellite: one satellite over `size` minutes (states/s)."""
+    import predict_orbit
+    import tle_catalog
+    catalog = tle_catalog.TLECatalog.load(str(fixtures.tle_catalog(100)), use_cache=False)
+    satellite = catalog.satrec(0)
+    return lambda: predict_orbit.propagate_satellite(satellite, minutes=size), size
+
+
+@case(size=1000)
+def propagate_catalog(size):
+    """predict_orbit.propagate_catalog: `size` satellites over 90 minutes (states/s)."""
+    import predict_orbit
+    import tle_catalog
+    catalog = tle_catalog.TLECatalog.load(str(fixtures.tle_catalog(size)), use_cache=False)
+    pairs = catalog.tle_pairs()
+    jd, fr = predict_orbit.time_grid(_fixture_start(), n_steps=90)
+    return lambda: predict_orbit.propagate_catalog(pairs, jd, fr), size * len(jd)
+
+
+@case(size=5000)
+def tle_parse(size):
+    """tle_catalog.TLECatalog.load without cache: `size` element sets (entries/s)."""
+    import tle_catalog
+    path = str(fixtures.tle_catalog(size))
+    return lambda: tle_catalog.TLECatalog.load(path, use_cache=False), size
+
+
+def _photometry_objects(size):
+    import bench_photometry
+    return bench_photometry.make_objects(size)
+
+
+@case(size=20_000)
+def photometry_scalar(size):
+    """photometry.hg_app_mag in a Python loop over `size` objects (objects/s)."""
+    import photometry
+    abs_mag, slope_g, vec_obj2obs, vec_obj2ill = _photometry_objects(size)
+
+    def call():
+        for k in range(size):
+            photometry.hg_app_mag(abs_mag[k], vec_obj2obs[k], vec_obj2ill[k], slope_g[k])
+    return call, size
+
+
+@case(size=1_000_000)
+def photometry_vec(size):
+    """photometry.hg_app_mag_vec on `size` objects (objects/s)."""
+    import photometry
+    abs_mag, slope_g, vec_obj2obs, vec_obj2ill = _photometry_objects(size)
+    return lambda: photometry.hg_app_mag_vec(abs_mag, vec_obj2obs, vec_obj2ill, slope_g), size
+
+
+@case(size=5000)
+def comet_ingest(size):
+    """comet_ingest.ingest of `size` records into a new database (rows/s)."""
+    import comet_ingest
+    json_path = fixtures.comet_table(size)
+    db_path = fixtures.fixture_path(f"comets_{os.getpid()}.db")
+
+    def call():
+        db_path.unlink(missing_ok=True)
+        return comet_ingest.ingest(json_path, db_path)
+    return call, size
+
+
+def _load_spk():
+    import kernel_manager
+    kernel_manager.load(str(fixtures.spk()))
+
+
+@case(size=10_000)
+def spice_per_row(size):
+    """spiceypy.spkgeo called once per epoch, as in the notebooks (states/s)."""
+    import spiceypy
+    _load_spk()
+    ets = np.linspace(fixtures.SPK_ET_START, fixtures.SPK_ET_START + fixtures.SPK_DAYS * 86400.0, size)
+
+    def call():
+        return [spiceypy.spkgeo(fixtures.SPK_BODY_ID, et, fixtures.SPK_FRAME, fixtures.SPK_CENTER_ID)[0]
+                for et in ets]
+    return call, size
+
+
+@case(size=10_000)
+def chebyshev_ephemeris(size):
+    """ephemeris.ChebyshevEphemeris.state on the epochs of spice_per_row (states/s)."""
+    import ephemeris
+    _load_spk()
+    et_end = fixtures.SPK_ET_START + fixtures.SPK_DAYS * 86400.0
+    interpolant = ephemeris.ChebyshevEphemeris.fit(fixtures.SPK_BODY_ID, fixtures.SPK_ET_START, et_end,
+                                                   observer=fixtures.SPK_CENTER_ID, ref=fixtures.SPK_FRAME)
+    ets = np.linspace(fixtures.SPK_ET_START, et_end, size)
+    return lambda: interpolant.state(ets), size
+
+
+def _kepler_elements(n_objects, seed=0):
+    # Comet-like conics elements: elliptic, near-parabolic and hyperbolic orbits
+    rng = np.random.default_rng(seed)
+    kind = rng.choice(4, size=n_objects, p=[0.7, 0.1, 0.1, 0.1])
+    return np.column_stack([
+        rng.uniform(0.1, 10.0, n_objects) * fixtures.AU_KM,
+        np.select([kind == 0, kind == 1, kind == 2], [rng.uniform(0.0, 0.99, n_objects), 0.9999, 1.0], 1.2),
+        rng.uniform(0.0, np.pi, n_objects),
+        rng.uniform(0.0, 2.0 * np.pi, n_objects),
+        rng.uniform(0.0, 2.0 * np.pi, n_objects),
+        np.zeros(n_objects),
+        np.full(n_objects, fixtures.SPK_ET_START),
+        np.full(n_objects, fixtures.GM_SUN),
+    ])
+
+
+@case(size=1000)
+def conics_per_row(size):
+    """spiceypy.conics for `size` element sets at 10 epochs, one call per state (states/s)."""
+    import spiceypy
+    elements = _kepler_elements(size)
+    ets = fixtures.SPK_ET_START + np.linspace(-3.0e9, 3.0e9, 10)
+    return lambda: [[spiceypy.conics(row, et) for et in ets] for row in elements], size * len(ets)
+
+
+@case(size=1000)
+def kepler_propagate(size):
+    """kepler.propagate for `size` element sets at 1000 epochs (states/s)."""
+    import kepler
+    elements = _kepler_elements(size)
+    ets = fixtures.SPK_ET_START + np.linspace(-3.0e9, 3.0e9, 1000)
+    return lambda: kepler.propagate(elements, ets), size * len(ets)
+
+
+@case(size=1000)
+def moid_population(size):
+    """moid.moid of `size` element sets w.r.t. an Earth-like orbit (orbits/s)."""
+    import moid
+    elements = _kepler_elements(size)
+    earth = np.array([0.9833 * fixtures.AU_KM, 0.0167, 0.0, np.radians(-11.26), np.radians(114.2),
+                      0.0, fixtures.SPK_ET_START, fixtures.GM_SUN])
+    return lambda: moid.moid(elements, earth), size
+
+
+@case(size=200)
+def mandelbrot_reference(size):
+    """mandelbrot2.py as a subprocess on a size x size image (pixels/s)."""
+    command = [sys.executable, str(MANDELBROT_DIR / "mandelbrot2.py"), str(size)]
+    return lambda: subprocess.run(command, check=True, stdout=subprocess.DEVNULL), size * size
+
+
+@case(size=1000)
+def mandelbrot_fast(size):
+    """mandelbrot_fast.write_pbm, one process, on a size x size image (pixels/s)."""
+    import mandelbrot_fast
+    return lambda: mandelbrot_fast.write_pbm(size, io.BytesIO()), size * size
+
+
+def _peak_rss_mb():
+    # Largest RSS of this process and of its waited-for children
+    if resource is None:
+        return None
+    peak = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+               resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    return peak / 2 ** 20 if sys.platform == "darwin" else peak / 2 ** 10
+
+
+def _run_case(name, size, repeats):
+    # Worker entry point: set-up, one warm-up call, then the timed calls
+    call, ops = CASES[name][0](size)
+    call()
+    latencies = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        call()
+        latencies.append(time.perf_counter() - start)
+
+    latencies = np.array(latencies)
+    return {
+        "size": size,
+        "ops": ops,
+        "repeats": repeats,
+        "ops_per_s": ops / float(np.median(latencies)),
+        "p50_ms": float(np.percentile(latencies, 50) * 1e3),
+        "p99_ms": float(np.percentile(latencies, 99) * 1e3),
+        "peak_rss_mb": _peak_rss_mb(),
+    }
+
+
+def run_case(name, size, repeats=5):
+    """Runs one case in a fresh (spawned) process and returns its result dict."""
+    with multiprocessing.get_context("spawn").Pool(1) as pool:
+        return pool.apply(_run_case, (name, size, repeats))
+
+
+def run_suite(names, scale=1.0, repeats=5, progress=print):
+    """Runs the given cases with their sizes multiplied by scale. Returns the JSON document."""
+    results = {}
+    for name in names:
+        size = max(1, int(CASES[name][1] * scale))
+        results[name] = run_case(name, size, repeats)
+        progress(f"{name:<22} {results[name]['ops_per_s']:>14,.0f} ops/s")
+
+    return {
+        "meta": {
+            "created": datetime.datetime.now(datetime.UTC).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "scale": scale,
+            "fixture_version": fixtures.FIXTURE_VERSION,
+        },
+        "results": results,
+    }
+
+
+def compare(results, baseline, tolerance=TOLERANCE):
+    """
+    Compares two result documents case by case.
+
+    Returns a list of (case, status, throughput ratio, RSS ratio) tuples. The
+    status is 'regression', 'faster', 'ok', 'new' (no baseline) or 'skipped'
+    (the case ran with a different size than in the baseline).
+    """
+    rows = []
+    for name, current in results["results"].items():
+        reference = baseline["results"].get(name)
+        if reference is None:
+            rows.append((name, "new", None, None))
+            continue
+        if reference["size"] != current["size"]:
+            rows.append((name, "skipped", None, None))
+            continue
+
+        speed = current["ops_per_s"] / reference["ops_per_s"]
+        rss = None
+        if current["peak_rss_mb"] and reference["peak_rss_mb"]:
+            rss = current["peak_rss_mb"] / reference["peak_rss_mb"]
+
+        if speed < 1.0 - tolerance or (rss is not None and rss > 1.0 + tolerance):
+            status = "regression"
+        elif speed > 1.0 + tolerance:
+            status = "faster"
+        else:
+            status = "ok"
+        rows.append((name, status, speed, rss))
+    return rows
+
+
+def print_report(results, rows=None):
+    ratios = {name: (status, speed, rss) for name, status, speed, rss in rows or []}
+    print(f"{'case':<22} {'size':>9} {'ops/s':>14} {'p50 ms':>10} {'p99 ms':>10} {'RSS MB':>8}"
+          + (f" {'speed':>7} {'RSS':>6}  status" if rows is not None else ""))
+    for name, result in results["results"].items():
+        rss = result["peak_rss_mb"]
+        line = (f"{name:<22} {result['size']:>9} {result['ops_per_s']:>14,.0f} {result['p50_ms']:>10.2f} "
+                f"{result['p99_ms']:>10.2f} {rss if rss is not None else float('nan'):>8.1f}")
+        if name in ratios:
+            status, speed, rss_ratio = ratios[name]
+            line += (f" {speed if speed is not None else float('nan'):>6.2f}x"
+                     f" {rss_ratio if rss_ratio is not None else float('nan'):>5.2f}x  {status}")
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark suite of the project's hot paths")
+    parser.add_argument("cases", nargs="*", help="cases to run (default: all)")
+    parser.add_argument("--list", action="store_true", help="list the cases and exit")
+    parser.add_argument("--scale", type=float, default=1.0, help="factor applied to all case sizes")
+    parser.add_argument("--repeats", type=int, default=5, help="timed calls per case")
+    parser.add_argument("-o", "--output", help="write the JSON results to this file")
+    parser.add_argument("--baseline", default=str(BASELINE_PATH), help="baseline JSON file")
+    parser.add_argument("--save-baseline", action="store_true",
+                        help="store the results as the new baseline instead of comparing")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE,
+                        help="relative change that counts as a regression")
+    args = parser.parse_args()
+
+    if args.list:
+        for name, (function, size) in CASES.items():
+            print(f"{name:<22} {size:>9}  {function.__doc__}")
+        return
+
+    unknown = sorted(set(args.cases) - set(CASES))
+    if unknown:
+        parser.error(f"unknown cases: {', '.join(unknown)}")
+
+    results = run_suite(args.cases or list(CASES), args.scale, args.repeats,
+                        progress=lambda line: print(line, file=sys.stderr))
+    if args.output:
+        pathlib.Path(args.output).write_text(json.dumps(results, indent=2) + "\n")
+
+    if args.save_baseline:
+        pathlib.Path(args.baseline).write_text(json.dumps(results, indent=2) + "\n")
+        print_report(results)
+        print(f"baseline written to {args.baseline}")
+        return
+
+    rows = None
+    if pathlib.Path(args.baseline).is_file():
+        rows = compare(results, json.loads(pathlib.Path(args.baseline).read_text()), args.tolerance)
+    print_report(results, rows)
+
+    regressions = [name for name, status, _, _ in rows or [] if status == "regression"]
+    if regressions:
+        print(f"regressions: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
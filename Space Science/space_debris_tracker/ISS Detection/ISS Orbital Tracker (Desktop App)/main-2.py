@@ -4,16 +4,40 @@ from mpl_toolkits.mplot3d import Axes3D
 from packaging import version
 from sscws.sscws import SscWs
 import datetime
-import csv
+import sys
 import numpy as np
 from matplotlib.animation import FuncAnimation
+from tracking import MockSscWs, MultiTracker
 
-# Create an instance of SscWs to access the SSCWS API (for ISS data)
-ssc = SscWs()
+# SSCWS ids of the tracked spacecraft, e.g. "python main-2.py iss noaa19 goes16".
+# With --mock, a simulated SSCWS client is used (offline).
+SATELLITES = [arg for arg in sys.argv[1:] if not arg.startswith("--")] or ['iss']
+USE_MOCK = "--mock" in sys.argv
 
-# Global variables for view mode and satellite data (only ISS)
+# Create an instance of SscWs to access the SSCWS API
+ssc = MockSscWs() if USE_MOCK else SscWs()
+
+# Global variable for the view mode
 view_mode = "satellite"  # Options: "satellite" (close-up) or "system" (wide)
-latest_coords_iss = None
+
+# Samples from one hour in the past to one hour ahead are kept in a ring
+# buffer per spacecraft. A background thread requests only the span after the
+# newest sample (every minute, all spacecraft concurrently), and the frames in
+# between interpolate the positions.
+HISTORY_S = 3600
+HORIZON_S = 3600
+FETCH_INTERVAL_S = 60
+FRAME_INTERVAL_MS = 200
+
+# Axis limits per view mode (km). The satellite view starts at 8000 km and grows
+# to fit the largest buffered radius (e.g. GEO/HEO spacecraft); it is updated
+# only when the buffers change, never rescaled per frame
+VIEW_LIMITS = {"satellite": 8000, "system": 500000}
+VIEW_MARGIN = 1.1
+VIEW_STEP_KM = 5000
+
+tracker = MultiTracker(ssc, SATELLITES, history=HISTORY_S, horizon=HORIZON_S,
+                       interval=FETCH_INTERVAL_S)
 
 # Create a Matplotlib figure with 3D axes
 fig = plt.figure()
@@ -27,9 +51,12 @@ ax.set_xlabel('X (km)')
 ax.set_ylabel('Y (km)')
 ax.set_zlabel('Z (km)')
 
-# Create line plot and marker for ISS orbit
-line_plot_iss, = ax.plot([], [], [], label='ISS Orbit', lw=2, color='red')
-current_point_iss, = ax.plot([], [], [], 'ro', label='ISS', markersize=8)
+# Create one line plot for all orbits and one marker plot for all spacecraft.
+# Only these and the status text change between frames; they are animated
+# (blitted) on top of the static scene
+line_plot_orbits, = ax.plot([], [], [], label='Orbits', lw=2, color='red', animated=True)
+current_points, = ax.plot([], [], [], 'ro', label='Spacecraft', markersize=8, animated=True)
+status_text = ax.text2D(0.02, 0.98, "", transform=ax.transAxes, va='top', animated=True)
 
 ax.legend()
 
@@ -51,114 +78,103 @@ def set_axes_equal(ax):
 
 # Functions to draw Earth and Moon with improved resolution
 def draw_earth(ax):
-    u = np.linspace(0, 2 * np.pi, 100)
-    v = np.linspace(0, np.pi, 100)
+    u = np.linspace(0, 2 * np.pi, 40)
+    v = np.linspace(0, np.pi, 20)
     earth_radius = 6371  # km
     x = earth_radius * np.outer(np.cos(u), np.sin(v))
     y = earth_radius * np.outer(np.sin(u), np.sin(v))
     z = earth_radius * np.outer(np.ones(np.size(u)), np.cos(v))
-    earth = ax.plot_surface(x, y, z, rstride=4, cstride=4, color='blue', alpha=0.3)
+    earth = ax.plot_surface(x, y, z, rstride=1, cstride=1, color='blue', alpha=0.3)
     return earth
 
 def draw_moon(ax):
     # Assume the Moon is at a fixed approximate position for illustration purposes
     moon_center = (384400, 0, 0)  # km
     moon_radius = 1737           # km
-    u = np.linspace(0, 2 * np.pi, 100)
-    v = np.linspace(0, np.pi, 100)
+    u = np.linspace(0, 2 * np.pi, 40)
+    v = np.linspace(0, np.pi, 20)
     x = moon_radius * np.outer(np.cos(u), np.sin(v)) + moon_center[0]
     y = moon_radius * np.outer(np.sin(u), np.sin(v)) + moon_center[1]
     z = moon_radius * np.outer(np.ones(np.size(u)), np.cos(v)) + moon_center[2]
-    moon = ax.plot_surface(x, y, z, rstride=4, cstride=4, color='gray', alpha=0.5)
+    moon = ax.plot_surface(x, y, z, rstride=1, cstride=1, color='gray', alpha=0.5)
     return moon
 
 earth_artist = draw_earth(ax)
 moon_artist = draw_moon(ax)
 
-# Function to fetch ISS data using SSCWS API
-def fetch_satellite_data(satellite_id, start_iso, end_iso):
-    try:
-        result = ssc.get_locations([satellite_id], [start_iso, end_iso])
-        if len(result['Data']) == 0:
-            print(f"No data returned for {satellite_id}.")
-            return None
-        data = result['Data'][0]
-        if len(data['Coordinates']) == 0:
-            print(f"No coordinate data for {satellite_id}.")
-            return None
-        coords = data['Coordinates'][0]
-        return coords
-    except Exception as e:
-        print(f"Error fetching data for {satellite_id}:", e)
-        return None
+def apply_view():
+    # Sets the static scene for the current view mode and redraws it once; the
+    # blitting background is captured again because the view changed
+    limit = VIEW_LIMITS[view_mode]
+    ax.set_xlim(-limit, limit)
+    ax.set_ylim(-limit, limit)
+    ax.set_zlim(-limit, limit)
+    set_axes_equal(ax)
+    moon_artist.set_visible(view_mode == "system")
+    ax.set_title(f"{', '.join(SATELLITES).upper()} Orbit - {view_mode.capitalize()} View")
+    fig.canvas.draw()
+
+ax.view_init(elev=20, azim=30)
+apply_view()
+
+# Orbit line data is only replaced when a buffer has changed
+drawn_version = -1
+
+def satellite_limit(max_radius):
+    # Satellite-view limit fitting all buffered samples, rounded up to VIEW_STEP_KM
+    # so that a slowly growing radius does not redraw the scene after every fetch
+    fit = np.ceil(max_radius * VIEW_MARGIN / VIEW_STEP_KM) * VIEW_STEP_KM
+    return max(VIEW_LIMITS["satellite"], int(fit))
 
 def update(frame):
-    global latest_coords_iss, view_mode
-    # Define a 1-hour time interval for ISS data
-    start_time = datetime.datetime.utcnow()
-    end_time = start_time + datetime.timedelta(hours=1)
-    start_iso = start_time.isoformat() + "Z"
-    end_iso = end_time.isoformat() + "Z"
-    
-    # Fetch ISS data using SSCWS API
-    iss_coords = fetch_satellite_data('iss', start_iso, end_iso)
-    if iss_coords is None:
-        print("No ISS data available.")
-        return line_plot_iss, current_point_iss
-    latest_coords_iss = iss_coords
-    X_iss = np.array(iss_coords['X'])
-    Y_iss = np.array(iss_coords['Y'])
-    Z_iss = np.array(iss_coords['Z'])
-    
-    line_plot_iss.set_data(X_iss, Y_iss)
-    line_plot_iss.set_3d_properties(Z_iss)
-    current_point_iss.set_data([X_iss[-1]], [Y_iss[-1]])
-    current_point_iss.set_3d_properties([Z_iss[-1]])
-    
-    # Adjust axis limits based on view mode
-    if view_mode == "satellite":
-        margin = 1000  # km
-        ax.set_xlim(np.min(X_iss) - margin, np.max(X_iss) + margin)
-        ax.set_ylim(np.min(Y_iss) - margin, np.max(Y_iss) + margin)
-        ax.set_zlim(np.min(Z_iss) - margin, np.max(Z_iss) + margin)
-        moon_artist.set_visible(False)
-    elif view_mode == "system":
-        ax.set_xlim(-500000, 500000)
-        ax.set_ylim(-500000, 500000)
-        ax.set_zlim(-500000, 500000)
-        moon_artist.set_visible(True)
-    
-    set_axes_equal(ax)
-    ax.view_init(elev=20, azim=30)
-    
-    current_time_str = datetime.datetime.utcnow().isoformat() + "Z"
-    title_str = f"ISS Orbit - {view_mode.capitalize()} View - {current_time_str}\n"
-    title_str += f"ISS: ({X_iss[-1]:.2f}, {Y_iss[-1]:.2f}, {Z_iss[-1]:.2f})"
-    ax.set_title(title_str)
-    
-    return line_plot_iss, current_point_iss
+    global drawn_version
+    now = datetime.datetime.now(datetime.UTC)
+    orbits, positions, names = tracker.snapshot(now.timestamp())
+
+    # One render pass: all orbits are one NaN-separated line, all spacecraft one marker set
+    if tracker.version != drawn_version:
+        drawn_version = tracker.version
+        line_plot_orbits.set_data(orbits[:, 0], orbits[:, 1])
+        line_plot_orbits.set_3d_properties(orbits[:, 2])
+
+        # The satellite view only grows after a fetch; the static scene (and the
+        # blitting background) is redrawn only then
+        limit = satellite_limit(tracker.max_radius)
+        if limit != VIEW_LIMITS["satellite"]:
+            VIEW_LIMITS["satellite"] = limit
+            if view_mode == "satellite":
+                apply_view()
+    current_points.set_data(positions[:, 0], positions[:, 1])
+    current_points.set_3d_properties(positions[:, 2])
+
+    lines = [f"{now:%Y-%m-%dT%H:%M:%SZ}"]
+    for name, position in zip(names, positions):
+        if np.isnan(position[0]):
+            lines.append(f"{name.upper()}: waiting for data...")
+        else:
+            lines.append(f"{name.upper()}: ({position[0]:.2f}, {position[1]:.2f}, {position[2]:.2f})")
+    status_text.set_text("\n".join(lines))
+    return line_plot_orbits, current_points, status_text
 
 def on_key(event):
-    global view_mode, latest_coords_iss
+    global view_mode
     if event.key == 's':
-        timestamp = datetime.datetime.utcnow().strftime("%Y%m%dT%H%M%SZ")
-        if latest_coords_iss is not None:
-            filename = f"iss_orbit_{timestamp}.csv"
+        timestamp = datetime.datetime.now(datetime.UTC).strftime("%Y%m%dT%H%M%SZ")
+        for name, feed in tracker.feeds.items():
+            filename = f"{name}_orbit_{timestamp}.csv"
             try:
-                with open(filename, 'w', newline='') as csvfile:
-                    writer = csv.writer(csvfile)
-                    writer.writerow(["Index", "X (km)", "Y (km)", "Z (km)"])
-                    for i in range(len(latest_coords_iss['X'])):
-                        writer.writerow([i, latest_coords_iss['X'][i],
-                                         latest_coords_iss['Y'][i],
-                                         latest_coords_iss['Z'][i]])
-                print(f"ISS data saved to {filename}")
+                rows = feed.buffer.to_csv(filename)
+                print(f"{rows} {name.upper()} samples saved to {filename}")
             except Exception as e:
-                print("Error saving ISS data:", e)
+                print(f"Error saving {name.upper()} data:", e)
     elif event.key == 'v':
         view_mode = "system" if view_mode == "satellite" else "satellite"
         print("Toggled view mode to:", view_mode)
+        apply_view()
+
+tracker.start()
 
 fig.canvas.mpl_connect('key_press_event', on_key)
-ani = FuncAnimation(fig, update, interval=10000)
+ani = FuncAnimation(fig, update, interval=FRAME_INTERVAL_MS, blit=True, cache_frame_data=False)
 plt.show()
+tracker.stop()
@@ -4,33 +4,22 @@ from mpl_toolkits.mplot3d import Axes3D
 from packaging import version
 from sscws.sscws import SscWs
 import datetime
-import csv
+import sys
 import numpy as np
 from matplotlib.animation import FuncAnimation
+from tracking import MockSscWs, MultiTracker
+
+# SSCWS ids of the tracked spacecraft, e.g. "python main.py iss noaa19 goes16".
+# With --mock, a simulated SSCWS client is used (offline).
+SATELLITES = [arg for arg in sys.argv[1:] if not arg.startswith("--")] or ['iss']
+USE_MOCK = "--mock" in sys.argv
 
 # Create an instance of SscWs to access the SSCWS API
-ssc = SscWs()
+ssc = MockSscWs() if USE_MOCK else SscWs()
 
-def fetch_iss_data():
-    """
-    Fetch ISS orbital data for the next hour.
-    Returns the data dictionary and the coordinates.
-    """
-    # Use UTC time for current time and one hour ahead
-    start_time = datetime.datetime.utcnow()
-    end_time = start_time + datetime.timedelta(hours=1)
-    start_iso = start_time.isoformat() + "Z"
-    end_iso = end_time.isoformat() + "Z"
-    
-    try:
-        result = ssc.get_locations(['iss'], [start_iso, end_iso])
-        print("API result:", result)  # Debug print
-        data = result['Data'][0]
-        coords = data['Coordinates'][0]
-        return data, coords
-    except Exception as e:
-        print("Error fetching ISS data:", e)
-        return None, None
+# Orbital data for the next hour is fetched in the background for all
+# spacecraft concurrently (see tracking.py); the animation only reads it
+tracker = MultiTracker(ssc, SATELLITES, history=0.0, horizon=3600.0, interval=60.0)
 
 # Create a Matplotlib figure with 3D axes
 fig = plt.figure()
@@ -44,88 +33,74 @@ ax.set_xlabel('X (km)')
 ax.set_ylabel('Y (km)')
 ax.set_zlabel('Z (km)')
 
-# Create a line plot (for the orbit) and a marker (for the current position)
-line_plot, = ax.plot([], [], [], label='ISS Orbit', lw=2)
-current_point, = ax.plot([], [], [], 'ro', label='Current Position', markersize=8)
+# Create a line plot (for all orbits) and a marker plot (for the current positions)
+line_plot, = ax.plot([], [], [], label='Orbits', lw=2)
+current_point, = ax.plot([], [], [], 'ro', label='Current Positions', markersize=8)
 ax.legend()
 
-# Variables to store the latest fetched data for logging
-latest_data = None
-latest_coords = None
+# Optionally set a fixed view angle (elevation and azimuth)
+ax.view_init(elev=20, azim=30)
+
+# Buffer version of the drawn orbits
+drawn_version = -1
 
 def update(frame):
     """
     Animation update function.
-    Fetches the latest ISS orbit data, updates the 3D plot, and sets the title.
+    Reads the latest orbit data of all spacecraft, updates the 3D plot, and sets the title.
     """
-    global latest_data, latest_coords
-    data, coords = fetch_iss_data()
-    if data is None or coords is None:
+    global drawn_version
+    now = datetime.datetime.now(datetime.UTC)
+    orbits, positions, names = tracker.snapshot(now.timestamp())
+    if np.all(np.isnan(positions)):
         return line_plot, current_point
 
-    latest_data = data
-    latest_coords = coords
-    
-    # Convert coordinate lists to NumPy arrays
-    X = np.array(coords['X'])
-    Y = np.array(coords['Y'])
-    Z = np.array(coords['Z'])
-
-    # Set axis limits so the full orbit is visible
-    ax.set_xlim(np.min(X) - 100, np.max(X) + 100)
-    ax.set_ylim(np.min(Y) - 100, np.max(Y) + 100)
-    ax.set_zlim(np.min(Z) - 100, np.max(Z) + 100)
-    
-    # Optionally set a fixed view angle (elevation and azimuth)
-    ax.view_init(elev=20, azim=30)
-
-    
-    # Update the line plot with the full orbit segment
-    line_plot.set_data(X, Y)
-    line_plot.set_3d_properties(Z)
-    
-    # Update the marker for the current position (using the last coordinate in the segment)
-    current_point.set_data([X[-1]], [Y[-1]])
-    current_point.set_3d_properties([Z[-1]])
-    
-    # Update plot title with current time and the latest ISS position details
-    current_time = datetime.datetime.utcnow().isoformat() + "Z"
-    ax.set_title(
-        f"ISS Orbit - Current Time: {current_time}\n"
-        f"Current Position: ({X[-1]:.2f}, {Y[-1]:.2f}, {Z[-1]:.2f})"
-    )
-    
+    if tracker.version != drawn_version:
+        drawn_version = tracker.version
+
+        # Set axis limits so the full orbits are visible
+        ax.set_xlim(np.nanmin(orbits[:, 0]) - 100, np.nanmax(orbits[:, 0]) + 100)
+        ax.set_ylim(np.nanmin(orbits[:, 1]) - 100, np.nanmax(orbits[:, 1]) + 100)
+        ax.set_zlim(np.nanmin(orbits[:, 2]) - 100, np.nanmax(orbits[:, 2]) + 100)
+
+        # Update the line plot with the orbit segments (NaN rows separate the spacecraft)
+        line_plot.set_data(orbits[:, 0], orbits[:, 1])
+        line_plot.set_3d_properties(orbits[:, 2])
+
+    # Update the markers for the current positions
+    current_point.set_data(positions[:, 0], positions[:, 1])
+    current_point.set_3d_properties(positions[:, 2])
+
+    # Update plot title with current time and the latest position details
+    title = f"{', '.join(SATELLITES).upper()} Orbit - Current Time: {now:%Y-%m-%dT%H:%M:%SZ}"
+    for name, position in zip(names, positions):
+        title += f"\n{name.upper()}: ({position[0]:.2f}, {position[1]:.2f}, {position[2]:.2f})"
+    ax.set_title(title)
+
     return line_plot, current_point
 
 def on_key(event):
     """
     Event handler for key press events.
-    Press 's' to save the latest fetched orbital data to a CSV file.
+    Press 's' to save the fetched orbital data of every spacecraft to a CSV file.
     """
     if event.key == 's':
-        if latest_coords is not None:
-            timestamp = datetime.datetime.utcnow().strftime("%Y%m%dT%H%M%SZ")
-            filename = f"iss_orbit_{timestamp}.csv"
+        timestamp = datetime.datetime.now(datetime.UTC).strftime("%Y%m%dT%H%M%SZ")
+        for name, feed in tracker.feeds.items():
+            filename = f"{name}_orbit_{timestamp}.csv"
             try:
-                with open(filename, 'w', newline='') as csvfile:
-                    writer = csv.writer(csvfile)
-                    writer.writerow(["Index", "X (km)", "Y (km)", "Z (km)"])
-                    X = latest_coords['X']
-                    Y = latest_coords['Y']
-                    Z = latest_coords['Z']
-                    for i in range(len(X)):
-                        writer.writerow([i, X[i], Y[i], Z[i]])
-                print(f"Data successfully saved to {filename}")
+                rows = feed.buffer.to_csv(filename)
+                print(f"{rows} samples successfully saved to {filename}")
             except Exception as e:
                 print("Error saving data:", e)
-        else:
-            print("No data available to save yet.")
 
 # Connect the key press event to our on_key function
 fig.canvas.mpl_connect('key_press_event', on_key)
 
-# Set up the animation to update the plot every 10 seconds (10000 milliseconds)
-ani = FuncAnimation(fig, update, interval=10000)
+# Start fetching and update the plot every second; the fetches run in the background
+tracker.start()
+ani = FuncAnimation(fig, update, interval=1000, cache_frame_data=False)
 
 # Display the interactive 3D plot window
 plt.show()
+tracker.stop()
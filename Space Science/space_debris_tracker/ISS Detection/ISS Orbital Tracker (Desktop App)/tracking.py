@@ -0,0 +1,292 @@
+from concurrent.futures import ThreadPoolExecutor
+import datetime
+import os
+import sys
+import threading
+import time
+import numpy as np
+
+sys.path.insert(1, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "..", "auxiliary"))
+import instrumentation # type: ignore
+
+# Shared data handling of the desktop trackers: SSCWS locations are kept in a
+# ring buffer that only grows by the time span that has not been fetched yet,
+# and fetching runs in a background thread so the GUI never waits for the
+# network.
+
+# Upper bound of concurrent SSCWS requests. Fetches are I/O bound, so the
+# pool is sized to cover typical spacecraft lists in one round.
+MAX_WORKERS = 20
+
+def to_iso(timestamp):
+    """Converts a POSIX timestamp into the ISO 8601 UTC string expected by SSCWS."""
+    return datetime.datetime.fromtimestamp(timestamp, datetime.UTC).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+def fetch_locations(ssc, satellite_id, start, end):
+    """
+    Fetches the locations of one satellite between two POSIX timestamps.
+
+    Returns the sample times (POSIX seconds) and the (n, 3) positions in km,
+    or None if SSCWS returned no data.
+    """
+    with instrumentation.span("http.sscws"):
+        result = ssc.get_locations([satellite_id], [to_iso(start), to_iso(end)])
+    if len(result.get('Data', [])) == 0:
+        return None
+    data = result['Data'][0]
+    if len(data['Coordinates']) == 0 or len(data['Time']) == 0:
+        return None
+
+    coords = data['Coordinates'][0]
+    times = np.array([t.replace(tzinfo=datetime.UTC).timestamp() if t.tzinfo is None else t.timestamp()
+                      for t in data['Time']])
+    positions = np.column_stack([coords['X'], coords['Y'], coords['Z']]).astype(np.float64)
+    return times, positions
+
+class OrbitBuffer:
+    """
+    Fixed-capacity ring buffer of (time, x, y, z) samples in columnar arrays.
+
+    Samples must arrive in time order; samples that are not newer than the
+    last stored one are skipped, so overlapping fetches do not create
+    duplicates. When the buffer is full, the oldest samples are overwritten.
+    """
+
+    def __init__(self, capacity=4096):
+        self.capacity = capacity
+        self.times = np.empty(capacity, dtype=np.float64)
+        self.positions = np.empty((capacity, 3), dtype=np.float64)
+        self.size = 0
+        self.head = 0          # Index of the next write
+        self.version = 0       # Incremented on every change
+        self.max_radius = 0.0  # Largest distance from Earth's centre of the stored samples (km)
+        self.lock = threading.Lock()
+
+    @property
+    def last_time(self):
+        with self.lock:
+            return self.times[(self.head - 1) % self.capacity] if self.size else None
+
+    def append(self, times, positions):
+        """Appends samples (times in POSIX seconds, (n, 3) positions)."""
+        with self.lock:
+            if self.size:
+                newer = times > self.times[(self.head - 1) % self.capacity]
+                times, positions = times[newer], positions[newer]
+            times, positions = times[-self.capacity:], positions[-self.capacity:]
+            n = len(times)
+            if n == 0:
+                return 0
+
+            # Write in at most two slices (wrap-around)
+            idx = (self.head + np.arange(n)) % self.capacity
+            self.times[idx] = times
+            self.positions[idx] = positions
+            self.head = (self.head + n) % self.capacity
+            self.size = min(self.size + n, self.capacity)
+            self.version += 1
+
+            # The stored samples are always the first size rows (filled from index 0)
+            self.max_radius = float(np.sqrt(np.max(np.sum(self.positions[:self.size] ** 2, axis=1))))
+            return n
+
+    def snapshot(self, since=None):
+        """
+        Returns copies of the stored samples in time order (optionally only
+        those at or after the POSIX time since) and the buffer version.
+        """
+        with self.lock:
+            start = (self.head - self.size) % self.capacity
+            order = (start + np.arange(self.size)) % self.capacity
+            times, positions, version = self.times[order], self.positions[order], self.version
+        if since is not None:
+            first = np.searchsorted(times, since)
+            times, positions = times[first:], positions[first:]
+        return times, positions, version
+
+    def interpolate(self, t, times=None, positions=None):
+        """
+        Linearly interpolated position at the POSIX time t (clamped to the
+        stored span). A snapshot may be passed to avoid copying the buffer.
+        """
+        if times is None:
+            times, positions, _ = self.snapshot()
+        if len(times) == 0:
+            return None
+        return np.array([np.interp(t, times, positions[:, i]) for i in range(3)])
+
+    def to_csv(self, filename):
+        """Writes all samples to a CSV file in one call. Returns the number of rows."""
+        times, positions, _ = self.snapshot()
+        iso = np.datetime_as_string((times * 1e6).astype('datetime64[us]'), unit='s')
+        table = np.column_stack([np.arange(len(times)).astype(str), iso, positions.astype(str)])
+        np.savetxt(filename, table, fmt='%s', delimiter=',',
+                   header="Index,Time (UTC),X (km),Y (km),Z (km)", comments='')
+        return len(times)
+
+class SatelliteFeed:
+    """
+    Per-satellite state of a MultiTracker: the sample buffer and the retry
+    backoff after failed or empty fetches.
+    """
+
+    def __init__(self, satellite_id, capacity=4096):
+        self.satellite_id = satellite_id
+        self.buffer = OrbitBuffer(capacity)
+        self.failures = 0
+        self.next_attempt = 0.0
+
+    def fetch(self, ssc, now, history, horizon, min_span):
+        # Only the span after the newest stored sample is requested
+        last = self.buffer.last_time
+        start = now - history if last is None else max(last, now - history)
+        end = now + horizon
+        if end - start < min_span:
+            return 0
+
+        result = fetch_locations(ssc, self.satellite_id, start, end)
+        if result is None:
+            raise LookupError(f"No data returned for {self.satellite_id}")
+        return self.buffer.append(*result)
+
+class MultiTracker(threading.Thread):
+    """
+    Keeps the buffers of several SSCWS spacecraft filled from history
+    seconds in the past to horizon seconds in the future.
+
+    Every interval seconds, all satellites that are due are fetched
+    concurrently on a bounded thread pool, so tracking many spacecraft takes
+    about as long as tracking one. A satellite whose fetch fails is retried
+    after an exponential backoff (starting at interval, capped at
+    max_backoff) without delaying the others.
+    """
+
+    def __init__(self, ssc, satellite_ids, history=3600.0, horizon=3600.0, interval=60.0,
+                 max_workers=MAX_WORKERS, max_backoff=1800.0):
+        super().__init__(daemon=True)
+        self.ssc = ssc
+        self.feeds = {satellite_id: SatelliteFeed(satellite_id) for satellite_id in satellite_ids}
+        self.history = history
+        self.horizon = horizon
+        self.interval = interval
+        self.max_backoff = max_backoff
+        self._pool = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(self.feeds))))
+        self._stop_event = threading.Event()
+
+    def fetch_due(self):
+        """Fetches all satellites that are due, concurrently. Returns the number of new samples."""
+        now = datetime.datetime.now(datetime.UTC).timestamp()
+        due = [feed for feed in self.feeds.values() if feed.next_attempt <= now]
+        futures = {feed: self._pool.submit(feed.fetch, self.ssc, now, self.history, self.horizon,
+                                           self.interval)
+                   for feed in due}
+
+        added = 0
+        for feed, future in futures.items():
+            try:
+                added += future.result()
+                feed.failures = 0
+                feed.next_attempt = 0.0
+            except Exception as e:
+                feed.failures += 1
+                delay = min(self.interval * 2 ** (feed.failures - 1), self.max_backoff)
+                feed.next_attempt = now + delay
+                print(f"Error fetching data for {feed.satellite_id} (retry in {delay:.0f} s):", e)
+        return added
+
+    def snapshot(self, now):
+        """
+        Merges all buffers for one render pass.
+
+        Returns the orbit polylines of all satellites as one (m, 3) array with
+        NaN rows between satellites (a single line artist draws them all),
+        the (n, 3) interpolated positions at the POSIX time now (NaN for
+        satellites without data) and the satellite ids in the same order.
+        """
+        orbits, markers = [], []
+        for feed in self.feeds.values():
+            times, positions, _ = feed.buffer.snapshot(since=now - self.history)
+            position = feed.buffer.interpolate(now, times, positions)
+            orbits += [positions, np.full((1, 3), np.nan)]
+            markers.append(position if position is not None else np.full(3, np.nan))
+
+        orbits = np.concatenate(orbits) if orbits else np.empty((0, 3))
+        return orbits, np.array(markers).reshape(-1, 3), list(self.feeds)
+
+    @property
+    def version(self):
+        """Changes whenever any buffer changes."""
+        return sum(feed.buffer.version for feed in self.feeds.values())
+
+    @property
+    def max_radius(self):
+        """Largest distance from Earth's centre (km) of all buffered samples."""
+        return max((feed.buffer.max_radius for feed in self.feeds.values()), default=0.0)
+
+    def run(self):
+        while not self._stop_event.is_set():
+            self.fetch_due()
+            self._stop_event.wait(self.interval)
+
+    def stop(self):
+        self._stop_event.set()
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+class MockSscWs:
+    """
+    Offline stand-in for sscws.sscws.SscWs.get_locations: circular orbits
+    (derived from the satellite id) sampled every minute, returned after a
+    simulated network latency. A fraction of the requests can fail.
+    """
+
+    def __init__(self, latency=0.5, failure_rate=0.0, seed=None):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.requests = 0
+        self._rng = np.random.default_rng(seed)
+        self._lock = threading.Lock()
+
+    def get_locations(self, satellite_ids, time_range):
+        with self._lock:
+            self.requests += 1
+            fail = self._rng.random() < self.failure_rate
+        time.sleep(self.latency)
+        if fail:
+            raise ConnectionError("Simulated SSCWS failure")
+
+        start, end = (datetime.datetime.strptime(t, "%Y-%m-%dT%H:%M:%SZ").replace(tzinfo=datetime.UTC)
+                      for t in time_range)
+        first = np.ceil(start.timestamp() / 60.0) * 60.0
+        seconds = np.arange(first, end.timestamp() + 1e-9, 60.0)
+
+        data = []
+        for satellite_id in satellite_ids:
+            # Reproducible orbit per id: radius 6700-42000 km, any inclination
+            key = sum(map(ord, satellite_id))
+            radius = 6700.0 + (key * 7919) % 35300
+            inclination = np.radians(key % 180)
+            period = 2.0 * np.pi * np.sqrt(radius ** 3 / 398600.4418)
+            phase = 2.0 * np.pi * seconds / period
+            x, y = radius * np.cos(phase), radius * np.sin(phase)
+            data.append({
+                'Id': satellite_id,
+                'Time': np.array([datetime.datetime.fromtimestamp(t, datetime.UTC) for t in seconds]),
+                'Coordinates': [{'X': x, 'Y': y * np.cos(inclination), 'Z': y * np.sin(inclination)}],
+            })
+        return {'HttpStatus': 200, 'Data': data}
+
+def benchmark_tracking(counts=(1, 5, 20), latency=0.5):
+    """Wall time of one fetch round for growing numbers of (mock) spacecraft."""
+    results = []
+    for count in counts:
+        tracker = MultiTracker(MockSscWs(latency=latency), [f"sat{i}" for i in range(count)])
+        start = time.perf_counter()
+        tracker.fetch_due()
+        results.append((count, time.perf_counter() - start))
+        tracker.stop()
+    return results
+
+if __name__ == "__main__":
+    print(f"{'spacecraft':>10} {'seconds':>8}")
+    for count, seconds in benchmark_tracking():
+        print(f"{count:>10} {seconds:>8.2f}")
@@ -1,21 +1,240 @@
-from flask import Flask, jsonify
-import requests
+from flask import Flask, Response, jsonify
 from flask_cors import CORS
+from requests.adapters import HTTPAdapter
+import datetime
+import json
+import os
+import queue
+import sys
+import threading
+import time
+import requests
+
+# The TLE catalog and the SGP4 helpers live in space_debris_tracker/, the
+# instrumentation in the auxiliary folder
+TRACKER_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "..")
+sys.path.insert(1, TRACKER_DIR)
+sys.path.insert(1, os.path.join(TRACKER_DIR, "..", "auxiliary"))
+from pass_prediction import geodetic_subpoint, teme_to_ecef
+from predict_orbit import time_grid
+from tle_catalog import get_catalog
+import instrumentation # type: ignore
 
 app = Flask(__name__)
 CORS(app)  # Enable Cross-Origin Resource Sharing for all routes
 
 # ISS API from Open Notify
-ISS_API = "http://api.open-notify.org/iss-now.json"
+ISS_API = os.environ.get("ISS_API", "http://api.open-notify.org/iss-now.json")
+ISS_NORAD_ID = 25544
+
+# Upstream (connect, read) timeouts in seconds
+UPSTREAM_TIMEOUT = (3.05, 5.0)
+
+# A fetched position is served for CACHE_TTL seconds. Until it is
+# STALE_MAX_AGE seconds old it is still served (immediately) while a single
+# background fetch revalidates it; older entries are refreshed synchronously.
+CACHE_TTL = float(os.environ.get("ISS_CACHE_TTL", 5.0))
+STALE_MAX_AGE = 60.0
+
+# Interval of the pushed position updates in seconds
+STREAM_INTERVAL = 2.0
+
+# One pooled session for all upstream requests
+session = requests.Session()
+session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=8))
+session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=8))
+instrumentation.instrument_session(session, "http.iss_api")
+
+
+def local_iss_position():
+    """
+    Compute the ISS position from the local TLE catalog with SGP4, in the same
+    format as the Open Notify API. Used when the upstream API is unavailable.
+    """
+    catalog = get_catalog()
+    satellite = catalog.satrec(catalog.index_of(ISS_NORAD_ID))
+    now = datetime.datetime.now(datetime.UTC)
+    jd, fr = time_grid(now, n_steps=1)
+    error, r, _ = satellite.sgp4_array(jd, fr)
+    if error[0] != 0:
+        raise RuntimeError(f"SGP4 error {error[0]} (outdated TLE data?)")
+
+    lat, lon, _ = geodetic_subpoint(teme_to_ecef(r, jd, fr))
+    return {
+        "message": "success",
+        "timestamp": int(now.timestamp()),
+        "iss_position": {"latitude": f"{lat[0]:.4f}", "longitude": f"{lon[0]:.4f}"},
+        "source": "tle",
+    }
+
+
+def fetch_iss_position(url=ISS_API):
+    """
+    Fetch the ISS position from the upstream API, falling back to the local
+    TLE computation on any upstream error.
+    """
+    try:
+        response = session.get(url, timeout=UPSTREAM_TIMEOUT)
+        response.raise_for_status()
+        data = response.json()
+        data["source"] = "open-notify"
+        return data
+    except (requests.RequestException, ValueError) as e:
+        app.logger.warning("Upstream fetch failed (%s), using the local TLE position", e)
+        return local_iss_position()
+
+
+class PositionCache:
+    """
+    Shared ISS position with a TTL, request coalescing and
+    stale-while-revalidate: however many requests arrive at once, at most one
+    upstream fetch is in flight.
+    """
+
+    def __init__(self, fetch=fetch_iss_position, ttl=CACHE_TTL, stale_max_age=STALE_MAX_AGE):
+        self.fetch = fetch
+        self.ttl = ttl
+        self.stale_max_age = stale_max_age
+        self.upstream_calls = 0
+        self._value = None
+        self._fetched_at = 0.0
+        self._lock = threading.Lock()
+        self._done = threading.Condition(self._lock)
+        self._in_flight = False
+
+    def _fetch(self):
+        with self._lock:
+            self.upstream_calls += 1
+        try:
+            return self.fetch()
+        except Exception as e:
+            app.logger.error("ISS position unavailable: %s", e)
+            return None
+
+    def _refresh(self):
+        # Runs in exactly one thread at a time (guarded by _in_flight)
+        value = self._fetch()
+        with self._lock:
+            if value is not None:
+                self._value, self._fetched_at = value, time.monotonic()
+            self._in_flight = False
+            self._done.notify_all()
+
+    def get(self):
+        """Return the current position (a dict) or None if none is available."""
+        if self.ttl is None:
+            # Cache disabled: one upstream request per call
+            return self._fetch()
+
+        with self._lock:
+            age = time.monotonic() - self._fetched_at
+            if self._value is not None and age < self.ttl:
+                return self._value
+
+            start_fetch = not self._in_flight
+            self._in_flight = True
+            if self._value is not None and age < self.stale_max_age:
+                # Serve the stale value, revalidate in the background
+                if start_fetch:
+                    threading.Thread(target=self._refresh, daemon=True).start()
+                return self._value
+
+            if not start_fetch:
+                # Coalesce: wait for the fetch that is already in flight
+                self._done.wait_for(lambda: not self._in_flight)
+                return self._value
+
+        self._refresh()
+        with self._lock:
+            return self._value
+
+
+class PositionBroadcaster:
+    """
+    Pushes position updates to all connected clients. A single producer
+    thread reads the cache every STREAM_INTERVAL seconds (only while clients
+    are connected) and hands the serialised update to every client queue.
+    """
+
+    def __init__(self, cache, interval=STREAM_INTERVAL):
+        self.cache = cache
+        self.interval = interval
+        self._clients = set()
+        self._lock = threading.Lock()
+        self._producer = None
+        self._latest = None
+
+    def subscribe(self):
+        client = queue.Queue(maxsize=1)
+        with self._lock:
+            self._clients.add(client)
+            if self._producer is None:
+                self._producer = threading.Thread(target=self._produce, daemon=True)
+                self._producer.start()
+            if self._latest is not None:
+                client.put_nowait(self._latest)
+        return client
+
+    def unsubscribe(self, client):
+        with self._lock:
+            self._clients.discard(client)
+
+    def _produce(self):
+        while True:
+            with self._lock:
+                has_clients = bool(self._clients)
+            if has_clients:
+                position = self.cache.get()
+                message = f"data: {json.dumps(position)}\n\n"
+                # Within the cache TTL the position does not change; send updates only
+                if position is not None and message != self._latest:
+                    self._publish(message)
+            time.sleep(self.interval)
+
+    def _publish(self, message):
+        with self._lock:
+            self._latest = message
+            clients = list(self._clients)
+        for client in clients:
+            # A slow client only ever gets the newest update
+            try:
+                client.get_nowait()
+            except queue.Empty:
+                pass
+            client.put_nowait(message)
+
+
+position_cache = PositionCache()
+broadcaster = PositionBroadcaster(position_cache)
+
 
 @app.route("/iss-location", methods=["GET"])
 def get_iss_location():
-    response = requests.get(ISS_API)
-    if response.status_code == 200:
-        data = response.json()
-        return jsonify(data)
-    else:
+    data = position_cache.get()
+    if data is None:
         return jsonify({"error": "Failed to fetch ISS location"}), 500
+    return jsonify(data)
+
+
+@app.route("/iss-stream", methods=["GET"])
+def stream_iss_location():
+    """Server-Sent Events stream of the ISS position."""
+    client = broadcaster.subscribe()
+
+    def events():
+        try:
+            while True:
+                try:
+                    yield client.get(timeout=15.0)
+                except queue.Empty:
+                    # Comment line keeps proxies from closing an idle connection
+                    yield ": keep-alive\n\n"
+        finally:
+            broadcaster.unsubscribe(client)
+
+    return Response(events(), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
 
 if __name__ == "__main__":
-    app.run(debug=True)
+    app.run(debug=True, threaded=True)
@@ -0,0 +1,108 @@
+"""
+Load test of the /iss-location endpoint with and without the position cache.
+
+The upstream API is replaced by a local stand-in with a configurable latency,
+so the numbers only depend on this machine:
+
+    python load_test.py --clients 32 --seconds 10 --upstream-latency 0.2
+"""
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from concurrent.futures import ThreadPoolExecutor
+from werkzeug.serving import WSGIRequestHandler, make_server
+import numpy as np
+import argparse
+import json
+import threading
+import time
+import requests
+
+import app as backend
+
+
+class FakeUpstreamHandler(BaseHTTPRequestHandler):
+    latency = 0.2
+
+    def do_GET(self):
+        time.sleep(self.latency)
+        body = json.dumps({"message": "success", "timestamp": int(time.time()),
+                           "iss_position": {"latitude": "12.3456", "longitude": "-65.4321"}}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class QuietRequestHandler(WSGIRequestHandler):
+    def log_request(self, *args, **kwargs):
+        pass
+
+
+def run_clients(url, clients, seconds):
+    # Every client sends requests back to back over its own keep-alive session
+    deadline = time.perf_counter() + seconds
+
+    def client():
+        latencies = []
+        with requests.Session() as session:
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                session.get(url, timeout=30).raise_for_status()
+                latencies.append(time.perf_counter() - start)
+        return latencies
+
+    with ThreadPoolExecutor(max_workers=clients) as executor:
+        futures = [executor.submit(client) for _ in range(clients)]
+        return np.concatenate([future.result() for future in futures])
+
+
+def measure(cache_ttl, upstream_url, clients, seconds):
+    def fetch():
+        return backend.fetch_iss_position(upstream_url)
+
+    backend.position_cache = backend.PositionCache(fetch=fetch, ttl=cache_ttl)
+
+    server = make_server("127.0.0.1", 0, backend.app, threaded=True,
+                         request_handler=QuietRequestHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        latencies = run_clients(f"http://127.0.0.1:{server.server_port}/iss-location",
+                                clients, seconds)
+    finally:
+        server.shutdown()
+
+    return {
+        "requests_per_s": len(latencies) / seconds,
+        "p50_ms": 1e3 * np.percentile(latencies, 50),
+        "p99_ms": 1e3 * np.percentile(latencies, 99),
+        "upstream_calls": backend.position_cache.upstream_calls,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test of the ISS backend")
+    parser.add_argument("--clients", type=int, default=32, help="concurrent clients")
+    parser.add_argument("--seconds", type=float, default=10.0, help="duration per run")
+    parser.add_argument("--upstream-latency", type=float, default=0.2,
+                        help="latency of the fake upstream API in seconds")
+    args = parser.parse_args()
+
+    FakeUpstreamHandler.latency = args.upstream_latency
+    upstream = ThreadingHTTPServer(("127.0.0.1", 0), FakeUpstreamHandler)
+    threading.Thread(target=upstream.serve_forever, daemon=True).start()
+    upstream_url = f"http://127.0.0.1:{upstream.server_port}/iss-now.json"
+
+    print(f"{'cache':<10} {'req/s':>9} {'p50 ms':>9} {'p99 ms':>9} {'upstream calls':>15}")
+    for label, ttl in (("off", None), (f"{backend.CACHE_TTL:g} s TTL", backend.CACHE_TTL)):
+        result = measure(ttl, upstream_url, args.clients, args.seconds)
+        print(f"{label:<10} {result['requests_per_s']:>9.1f} {result['p50_ms']:>9.1f} "
+              f"{result['p99_ms']:>9.1f} {result['upstream_calls']:>15}")
+
+    upstream.shutdown()
+
+
+if __name__ == "__main__":
+    main()
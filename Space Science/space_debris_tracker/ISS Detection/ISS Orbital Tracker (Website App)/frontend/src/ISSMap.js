@@ -1,6 +1,5 @@
 import React, { useState, useEffect } from "react";
 import { MapContainer, TileLayer, Marker, Popup } from "react-leaflet";
-import axios from "axios";
 import "leaflet/dist/leaflet.css";
 import L from "leaflet";
 
@@ -15,24 +14,20 @@ L.Icon.Default.mergeOptions({
 const ISSMap = () => {
   const [position, setPosition] = useState([0, 0]);
 
-  const fetchISSData = async () => {
-    try {
-      // Fetch ISS location from our Flask backend
-      const response = await axios.get("http://localhost:5000/iss-location");
-      const { iss_position } = response.data;
+  useEffect(() => {
+    // The backend pushes every new ISS location (Server-Sent Events); the
+    // browser reconnects automatically if the connection drops
+    const source = new EventSource("http://localhost:5000/iss-stream");
+    source.onmessage = (event) => {
+      const { iss_position } = JSON.parse(event.data);
       const lat = parseFloat(iss_position.latitude);
       const lon = parseFloat(iss_position.longitude);
       setPosition([lat, lon]);
-    } catch (error) {
-      console.error("Error fetching ISS location:", error);
-    }
-  };
-
-  useEffect(() => {
-    fetchISSData();
-    // Update ISS location every 5 seconds
-    const interval = setInterval(fetchISSData, 5000);
-    return () => clearInterval(interval);
+    };
+    source.onerror = (error) => {
+      console.error("ISS location stream error:", error);
+    };
+    return () => source.close();
   }, []);
 
   return (
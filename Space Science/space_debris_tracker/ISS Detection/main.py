@@ -1,11 +1,17 @@
-import requests
 import smtplib
 import time
-import math
+import os
+import sys
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 import datetime
 
+# The pass predictor and the TLE catalog live in the parent folder
+TRACKER_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(1, TRACKER_DIR)
+from pass_prediction import next_visible_pass
+from tle_catalog import get_catalog
+
 # ====================
 # USER CONFIGURATION
 # ====================
@@ -14,8 +20,19 @@ import datetime
 MY_LAT = 23.184445      # e.g., 40.7128 for New York City; fill in your latitude
 MY_LON = 72.611403      # e.g., -74.0060 for New York City; fill in your longitude
 
-# Overhead threshold (in km): ISS must be within this distance of your subpoint
-THRESHOLD_KM = 300
+MY_ALT_KM = 0.05        # Height above the WGS84 ellipsoid in km
+
+# Only passes that culminate at least this high above the horizon (in degrees) are reported
+MIN_ELEVATION_DEG = 10
+
+# NORAD catalog number of the ISS (ZARYA) in the local TLE file
+ISS_NORAD_ID = 25544
+
+# Send the alert this many minutes before the ISS rises
+ALERT_LEAD_MINUTES = 5
+
+# Refresh the local TLE file (one conditional HTTP request) if it is older than this many hours
+TLE_MAX_AGE_HOURS = 24
 
 # Email configuration (using Gmail in this example)
 SENDER_EMAIL = "fenilmmodi162@gmail.com"         # Replace with your Gmail address
@@ -28,78 +45,65 @@ SMTP_PORT = 587
 # HELPER FUNCTIONS
 # ====================
 
-def haversine_distance(lat1, lon1, lat2, lon2):
+def refresh_tles():
     """
-    Compute the great-circle distance between two points on Earth.
-    All latitudes/longitudes are in decimal degrees.
-    Returns distance in kilometers.
-    """
-    R = 6371  # Earth radius in km
-    phi1 = math.radians(lat1)
-    phi2 = math.radians(lat2)
-    delta_phi = math.radians(lat2 - lat1)
-    delta_lambda = math.radians(lon2 - lon1)
-    a = math.sin(delta_phi/2)**2 + math.cos(phi1) * math.cos(phi2) * math.sin(delta_lambda/2)**2
-    c = 2 * math.asin(math.sqrt(a))
-    return R * c
-
-def iss_is_overhead():
-    """
-    Fetch the current ISS position and return True if it is within THRESHOLD_KM of your location.
+    Refresh the local TLE file if it was last checked more than
+    TLE_MAX_AGE_HOURS ago. Pass prediction itself works offline, so a failed
+    refresh is not fatal.
     """
     try:
-        response = requests.get("http://api.open-notify.org/iss-now.json")
-        response.raise_for_status()
+        from fetch_tle_data import refresh_tle_data
+        if time.time() - last_tle_check() < TLE_MAX_AGE_HOURS * 3600:
+            return
+        refresh_tle_data()
     except Exception as e:
-        print("Error fetching ISS data:", e)
-        return False
+        print("Error refreshing TLE data (using the local file):", e)
 
-    data = response.json()
-    iss_position = data["iss_position"]
-    iss_lat = float(iss_position["latitude"])
-    iss_lon = float(iss_position["longitude"])
-    
-    distance = haversine_distance(MY_LAT, MY_LON, iss_lat, iss_lon)
-    print(f"ISS position: ({iss_lat}, {iss_lon}); Your position: ({MY_LAT}, {MY_LON}); Distance: {distance:.2f} km")
-    
-    return distance <= THRESHOLD_KM
+def last_tle_check():
+    """
+    POSIX time of the last TLE refresh, or 0 if there is no local TLE file.
+    A refresh that finds no changes (e.g. HTTP 304) leaves the file as it is,
+    so the check time stored in the refresh state takes precedence over the
+    file's modification time.
+    """
+    from fetch_tle_data import read_refresh_state
+    tle_path = os.path.join(TRACKER_DIR, "tle_data.txt")
+    if not os.path.exists(tle_path):
+        return 0.0
+
+    checked_at = read_refresh_state().get("checked_at")
+    if checked_at:
+        return datetime.datetime.fromisoformat(checked_at).timestamp()
+    return os.path.getmtime(tle_path)
 
-def is_night_time(lat, lon):
+def iss_satellite():
     """
-    Determine whether it is currently night time at the given latitude and longitude.
-    Uses the Sunrise-Sunset API (which returns times in UTC).
-    Returns True if it's night (i.e., current UTC time is before sunrise or after sunset).
+    Return the SGP4 satellite of the ISS from the local TLE catalog.
     """
-    try:
-        params = {
-            "lat": lat,
-            "lng": lon,
-            "formatted": 0  # Returns ISO 8601 formatted times in UTC
-        }
-        response = requests.get("https://api.sunrise-sunset.org/json", params=params)
-        response.raise_for_status()
-        data = response.json()
-        sunrise_str = data["results"]["sunrise"]
-        sunset_str = data["results"]["sunset"]
-        # Convert ISO 8601 strings to datetime objects
-        sunrise = datetime.datetime.fromisoformat(sunrise_str)
-        sunset = datetime.datetime.fromisoformat(sunset_str)
-        now = datetime.datetime.utcnow()
-        # It's night if current UTC time is before sunrise or after sunset.
-        if now < sunrise or now > sunset:
-            return True
-        else:
-            return False
-    except Exception as e:
-        print("Error determining day/night:", e)
-        return False
+    catalog = get_catalog()
+    return catalog.satrec(catalog.index_of(ISS_NORAD_ID))
+
+def sleep_until(moment):
+    """
+    Sleep until the given UTC datetime. Sleeping in slices of at most an hour
+    keeps the schedule correct after a system suspend.
+    """
+    while True:
+        remaining = (moment - datetime.datetime.now(datetime.UTC)).total_seconds()
+        if remaining <= 0:
+            return
+        time.sleep(min(remaining, 3600))
 
-def send_email_alert():
+def send_email_alert(iss_pass):
     """
-    Sends an email alert that the ISS is overhead.
+    Sends an email alert about an upcoming visible ISS pass.
     """
     subject = "ISS Overhead Alert!"
-    body = "The ISS is currently overhead your location. Look up and enjoy the view!"
+    body = (f"The ISS will be visible from your location. Look up and enjoy the view!\n\n"
+            f"Rise:        {iss_pass.rise:%Y-%m-%d %H:%M:%S} UTC\n"
+            f"Culmination: {iss_pass.culmination:%Y-%m-%d %H:%M:%S} UTC "
+            f"({iss_pass.max_elevation_deg:.0f} deg above the horizon)\n"
+            f"Set:         {iss_pass.set:%Y-%m-%d %H:%M:%S} UTC")
     
     # Set up the MIME message
     msg = MIMEMultipart()
@@ -123,18 +127,26 @@ def send_email_alert():
 # ====================
 
 def main():
-    print("Starting ISS overhead notifier. Checking every 10 minutes...")
+    print("Starting ISS overhead notifier. Sleeping until the next visible pass...")
     while True:
-        if iss_is_overhead():
-            if is_night_time(MY_LAT, MY_LON):
-                print("ISS is overhead and it's night time! Sending email alert.")
-                send_email_alert()
-            else:
-                print("ISS is overhead but it's daytime. No alert sent.")
-        else:
-            print("ISS is not overhead.")
-        # Wait for 10 minutes (600 seconds) before checking again
-        time.sleep(600)
+        refresh_tles()
+        now = datetime.datetime.now(datetime.UTC)
+        iss_pass = next_visible_pass(iss_satellite(), MY_LAT, MY_LON, MY_ALT_KM, start=now,
+                                     min_elevation_deg=MIN_ELEVATION_DEG)
+        if iss_pass is None:
+            # Nothing visible within the prediction window; check again with fresh TLEs later
+            print("No visible pass in the next days.")
+            sleep_until(now + datetime.timedelta(hours=TLE_MAX_AGE_HOURS))
+            continue
+
+        print(f"Next visible pass: rise {iss_pass.rise:%Y-%m-%d %H:%M:%S} UTC, "
+              f"max. elevation {iss_pass.max_elevation_deg:.0f} deg")
+        sleep_until(iss_pass.rise - datetime.timedelta(minutes=ALERT_LEAD_MINUTES))
+        print("The ISS is about to rise! Sending email alert.")
+        send_email_alert(iss_pass)
+
+        # Do not report the same pass twice
+        sleep_until(iss_pass.set)
 
 if __name__ == "__main__":
     main()
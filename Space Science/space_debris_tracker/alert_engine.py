@@ -0,0 +1,266 @@
+# alert_engine.py
+
+from pass_prediction import (TWILIGHT_DEG, EARTH_RADIUS_KM, elevation_azimuth, is_sunlit,
+                             jd_to_datetime, observer_ecef, sun_position, teme_to_ecef)
+from predict_orbit import propagate_catalog, time_grid
+from tle_catalog import get_catalog
+from email.mime.text import MIMEText
+import numpy as np
+import argparse
+import smtplib
+import csv
+import os
+
+# Observers are bucketed in cells of GRID_DEG x GRID_DEG degrees. A satellite
+# sample is only evaluated for the observers of a cell if the cell lies within
+# the satellite's visibility footprint.
+GRID_DEG = 5.0
+
+# Upper bound of the angular distance between a cell centre and any point of
+# the cell (half the diagonal at the equator), in radians
+CELL_RADIUS = np.radians(GRID_DEG * np.sqrt(2.0) / 2.0)
+
+SUBSCRIBER_DTYPE = np.dtype([
+    ("email", "U64"),
+    ("lat_deg", np.float64),
+    ("lon_deg", np.float64),
+    ("alt_km", np.float64),
+    ("min_elevation_deg", np.float64),
+])
+
+ALERT_DTYPE = np.dtype([
+    ("subscriber", np.int64),
+    ("norad_id", np.int32),
+    ("name", "U24"),
+    ("first_visible_jd", np.float64),
+    ("max_elevation_deg", np.float64),
+])
+
+def load_subscribers(filename="subscribers.csv"):
+    """
+    Reads subscribers from a CSV file (relative to this folder) with the
+    columns email, lat_deg, lon_deg and optionally alt_km and
+    min_elevation_deg (default 0 km and 10 deg).
+    """
+    current_dir = os.path.dirname(os.path.abspath(__file__))
+    with open(os.path.join(current_dir, filename), "r", newline="") as file:
+        rows = list(csv.DictReader(file))
+
+    subscribers = np.zeros(len(rows), dtype=SUBSCRIBER_DTYPE)
+    subscribers["email"] = [row["email"] for row in rows]
+    subscribers["lat_deg"] = [float(row["lat_deg"]) for row in rows]
+    subscribers["lon_deg"] = [float(row["lon_deg"]) for row in rows]
+    subscribers["alt_km"] = [float(row.get("alt_km") or 0.0) for row in rows]
+    subscribers["min_elevation_deg"] = [float(row.get("min_elevation_deg") or 10.0) for row in rows]
+    return subscribers
+
+def unit_vectors(lat_deg, lon_deg):
+    """
+    Unit vectors (..., 3) of latitudes and longitudes. For geodetic latitudes
+    this is the local vertical of the ellipsoid.
+    """
+    lat, lon = np.radians(lat_deg), np.radians(lon_deg)
+    return np.stack([np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)], axis=-1)
+
+def footprint_angle(radius_km, min_elevation_deg):
+    """
+    Earth central angle (radians) around the sub-satellite point from which a
+    satellite at geocentric radius_km is seen at least min_elevation_deg high.
+    """
+    elevation = np.radians(min_elevation_deg)
+    return np.arccos(np.clip(EARTH_RADIUS_KM / radius_km * np.cos(elevation), -1.0, 1.0)) - elevation
+
+def grid_cells(lat_deg, lon_deg):
+    """
+    Buckets locations into GRID_DEG cells. Returns the cell of every location,
+    the sorted unique cells and the latitudes/longitudes of their centres.
+    """
+    n_cols = int(round(360.0 / GRID_DEG))
+    row = np.clip(np.floor((np.asarray(lat_deg) + 90.0) / GRID_DEG), 0, 180.0 / GRID_DEG - 1)
+    col = np.floor(np.mod(np.asarray(lon_deg) + 180.0, 360.0) / GRID_DEG)
+    cells = (row * n_cols + col).astype(np.int64)
+
+    unique_cells = np.unique(cells)
+    center_lat = (unique_cells // n_cols + 0.5) * GRID_DEG - 90.0
+    center_lon = (unique_cells % n_cols + 0.5) * GRID_DEG - 180.0
+    return cells, unique_cells, center_lat, center_lon
+
+def _first_and_max(subscriber, sat, step, elevation):
+    # One record per (subscriber, satellite): the first visible step and the
+    # highest visible elevation over the window. The records arrive in step order, so
+    # a stable sort by (subscriber, satellite) keeps the steps ascending.
+    order = np.argsort(subscriber * (sat.max() + 1) + sat, kind="stable")
+    subscriber, sat, step, elevation = subscriber[order], sat[order], step[order], elevation[order]
+
+    starts = np.flatnonzero(np.r_[True, (subscriber[1:] != subscriber[:-1]) | (sat[1:] != sat[:-1])])
+    return subscriber[starts], sat[starts], step[starts], np.maximum.reduceat(elevation, starts)
+
+def _expand_cells(bounds, cell_idx):
+    # Positions (into the cell-sorted observer order) of all observers of the
+    # given cells, and the index into cell_idx each of them belongs to
+    starts = bounds[cell_idx]
+    counts = bounds[cell_idx + 1] - starts
+    offsets = np.repeat(starts - np.cumsum(counts) + counts, counts)
+    return offsets + np.arange(counts.sum()), np.repeat(np.arange(len(cell_idx)), counts)
+
+def find_visible(subscribers, norad_ids, catalog=None, start=None, hours=24.0, step_seconds=60.0,
+                 processes=1):
+    """
+    Finds which subscribers can see which satellites within the window.
+
+    All satellites are propagated in one batch and the observers are bucketed
+    in a GRID_DEG grid. For every time step, the cells where it is dark
+    (at the cell centre, with a margin for the cell size) are matched against
+    the sunlit satellites in one broadcast of central angle cosines; a pair is kept
+    if the cell lies within the satellite's footprint for the lowest minimum
+    elevation of all subscribers. Elevations and sun elevations are then
+    evaluated exactly for all observers of the matched cells at once.
+
+    Returns an ALERT_DTYPE array with one entry per visible (subscriber,
+    satellite) combination, sorted by subscriber and time. first_visible_jd
+    has the resolution of step_seconds.
+    """
+    if catalog is None:
+        catalog = get_catalog()
+    rows = np.array([catalog.index_of(norad_id) for norad_id in norad_ids], dtype=np.int64)
+
+    jd, fr = time_grid(start, n_steps=max(1, int(np.ceil(hours * 3600.0 / step_seconds))) + 1,
+                       step_minutes=step_seconds / 60.0)
+    _, r_teme, _ = propagate_catalog(catalog.tle_pairs(rows), jd, fr, processes=processes)
+
+    sun_teme = sun_position(jd, fr)
+    sun_ecef = teme_to_ecef(sun_teme, jd, fr)
+    r_ecef = teme_to_ecef(r_teme, jd, fr)
+    radius = np.linalg.norm(r_ecef, axis=-1)
+
+    # Only valid, sunlit samples can be visible; (satellites, steps)
+    with np.errstate(invalid="ignore"):
+        candidate = ~np.isnan(radius) & is_sunlit(r_teme, sun_teme)
+    sat_dirs = r_ecef / radius[..., np.newaxis]
+    reach = footprint_angle(radius, subscribers["min_elevation_deg"].min()) + CELL_RADIUS
+
+    cells, unique_cells, center_lat, center_lon = grid_cells(subscribers["lat_deg"],
+                                                             subscribers["lon_deg"])
+    order = np.argsort(cells, kind="stable")
+    bounds = np.r_[np.searchsorted(cells[order], unique_cells), len(order)]
+    center_dirs = unit_vectors(center_lat, center_lon)
+
+    # Sun elevation at the cell centres, (cells, steps)
+    center_dark = elevation_azimuth(sun_ecef, center_lat[:, np.newaxis],
+                                    center_lon[:, np.newaxis])[0] <= TWILIGHT_DEG + np.degrees(CELL_RADIUS)
+
+    # Observer positions and local vertical (geodetic normal), in cell order.
+    # Elevations are compared through their sines to avoid trigonometry per pair;
+    # the Sun is far enough away for its elevation to follow from the vertical alone.
+    obs_ecef = observer_ecef(subscribers["lat_deg"][order], subscribers["lon_deg"][order],
+                             subscribers["alt_km"][order])
+    obs_up = unit_vectors(subscribers["lat_deg"][order], subscribers["lon_deg"][order])
+    sin_min_elevation = np.sin(np.radians(subscribers["min_elevation_deg"][order]))
+    sun_dirs = sun_ecef / np.linalg.norm(sun_ecef, axis=-1, keepdims=True)
+    cos_reach = np.cos(np.minimum(reach, np.pi))
+
+    hits = []
+    for step in range(len(jd)):
+        sats = np.flatnonzero(candidate[:, step])
+        dark = np.flatnonzero(center_dark[:, step])
+        if len(sats) == 0 or len(dark) == 0:
+            continue
+
+        # Grid level: which dark cells lie within which footprints
+        cos_angle = center_dirs[dark] @ sat_dirs[sats, step].T
+        cell_idx, sat_idx = np.nonzero(cos_angle >= cos_reach[sats, step])
+        if len(cell_idx) == 0:
+            continue
+
+        # Observer level: exact geometry for every observer of the matched cells
+        positions, pair = _expand_cells(bounds, dark[cell_idx])
+        pair_sats = sats[sat_idx[pair]]
+        d = r_ecef[pair_sats, step] - obs_ecef[positions]
+        sin_elevation = np.einsum("ij,ij->i", d, obs_up[positions]) / np.linalg.norm(d, axis=-1)
+        visible = ((sin_elevation >= sin_min_elevation[positions])
+                   & (obs_up[positions] @ sun_dirs[step] <= np.sin(np.radians(TWILIGHT_DEG))))
+
+        hits.append((order[positions[visible]], pair_sats[visible], np.full(visible.sum(), step),
+                     np.degrees(np.arcsin(sin_elevation[visible]))))
+
+    hits = [np.concatenate(part) for part in zip(*hits)]
+    if not hits or len(hits[0]) == 0:
+        return np.zeros(0, dtype=ALERT_DTYPE)
+
+    subscriber, sat, step, max_elevation = _first_and_max(*hits)
+
+    alerts = np.zeros(len(subscriber), dtype=ALERT_DTYPE)
+    alerts["subscriber"] = subscriber
+    alerts["norad_id"] = catalog["norad_id"][rows[sat]]
+    alerts["name"] = catalog["name"][rows[sat]]
+    alerts["first_visible_jd"] = jd[step] + fr[step]
+    alerts["max_elevation_deg"] = max_elevation
+    return alerts[np.lexsort((alerts["first_visible_jd"], alerts["subscriber"]))]
+
+def format_alert_email(alerts):
+    """Builds the message text for the alerts of one subscriber."""
+    lines = ["Upcoming visible passes over your location:", ""]
+    for entry in alerts:
+        lines.append(f"{jd_to_datetime(entry['first_visible_jd']):%Y-%m-%d %H:%M} UTC  "
+                     f"{entry['name']:<24} (NORAD {entry['norad_id']}), "
+                     f"up to {entry['max_elevation_deg']:.0f} deg above the horizon")
+    return "\n".join(lines)
+
+def send_alerts(alerts, subscribers, sender, host="localhost", port=25, username=None,
+                password=None, starttls=False):
+    """
+    Sends one email per subscriber, listing all of their alerts, over a single
+    SMTP connection. A refused recipient does not abort the batch.
+
+    Returns the number of emails that were accepted by the server.
+    """
+    if len(alerts) == 0:
+        return 0
+
+    starts = np.flatnonzero(np.r_[True, alerts["subscriber"][1:] != alerts["subscriber"][:-1]])
+    sent = 0
+    with smtplib.SMTP(host, port) as server:
+        if starttls:
+            server.starttls()
+        if username is not None:
+            server.login(username, password)
+
+        for batch in np.split(alerts, starts[1:]):
+            recipient = str(subscribers["email"][batch["subscriber"][0]])
+            msg = MIMEText(format_alert_email(batch), "plain")
+            msg["From"] = sender
+            msg["To"] = recipient
+            msg["Subject"] = "Satellite pass alert"
+            try:
+                server.send_message(msg)
+                sent += 1
+            except smtplib.SMTPRecipientsRefused as e:
+                print("Recipient refused:", recipient, e)
+    return sent
+
+def main():
+    parser = argparse.ArgumentParser(description="Visibility alerts for many subscribers and satellites")
+    parser.add_argument("--subscribers", default="subscribers.csv", help="subscriber CSV file")
+    parser.add_argument("--norad", type=int, nargs="+", default=[25544], help="NORAD IDs")
+    parser.add_argument("--hours", type=float, default=24.0, help="alert window")
+    parser.add_argument("--step", type=float, default=60.0, help="sampling step in seconds")
+    parser.add_argument("--sender", default="alerts@localhost", help="sender address")
+    parser.add_argument("--smtp-host", default="localhost")
+    parser.add_argument("--smtp-port", type=int, default=25)
+    parser.add_argument("--dry-run", action="store_true", help="print the alerts instead of sending")
+    args = parser.parse_args()
+
+    subscribers = load_subscribers(args.subscribers)
+    alerts = find_visible(subscribers, args.norad, hours=args.hours, step_seconds=args.step)
+    if args.dry_run:
+        for entry in alerts:
+            print(f"{subscribers['email'][entry['subscriber']]:<32} "
+                  f"{jd_to_datetime(entry['first_visible_jd']):%Y-%m-%d %H:%M} "
+                  f"{entry['name']:<24} {entry['max_elevation_deg']:5.1f} deg")
+        return
+
+    sent = send_alerts(alerts, subscribers, args.sender, args.smtp_host, args.smtp_port)
+    print(f"Sent {sent} emails for {len(alerts)} alerts")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,305 @@
+# conjunction.py
+
+from predict_orbit import catalog_pool, propagate_catalog, time_grid
+from tle_catalog import get_catalog
+from scipy.spatial import cKDTree
+import numpy as np
+import argparse
+import datetime
+import time
+
+# Upper bound of the relative speed of two Earth-orbiting objects (km/s): two
+# bound objects at 200 km altitude move slower than the escape speed (11.0 km/s)
+# each, so head-on encounters stay below 22 km/s (eccentric orbits near perigee
+# exceed the circular 2 x 7.8 km/s). Between two samples an encounter can hide
+# inside a sphere of radius MAX_RELATIVE_SPEED * step / 2, so the spatial search
+# radius is padded by it.
+MAX_RELATIVE_SPEED = 22.0
+
+# Radial band width (km) of the shell groups, and the largest number of bands
+# an object joins before it is searched against the whole catalog instead
+SHELL_BAND_KM = 25.0
+MAX_SHELL_BANDS = 8
+
+CONJUNCTION_DTYPE = np.dtype([
+    ("norad_id_1", np.int32),
+    ("name_1", "U24"),
+    ("norad_id_2", np.int32),
+    ("name_2", "U24"),
+    ("tca_jd", np.float64),
+    ("miss_km", np.float64),
+    ("relative_speed_km_s", np.float64),
+])
+
+def orbit_shells_overlap(perigee_km, apogee_km, rows_1, rows_2, threshold_km):
+    """
+    Apogee/perigee filter: two objects can only come within threshold_km of
+    each other if their [perigee, apogee] radial shells overlap (padded by the
+    threshold). Returns a boolean mask over the given row pairs.
+    """
+    lower = np.maximum(perigee_km[rows_1], perigee_km[rows_2])
+    upper = np.minimum(apogee_km[rows_1], apogee_km[rows_2])
+    return lower - upper <= threshold_km
+
+def shell_groups(perigee_km, apogee_km, threshold_km, band_km=SHELL_BAND_KM,
+                 max_bands=MAX_SHELL_BANDS):
+    """
+    Precomputes the radial shells that can overlap: the radius axis is cut
+    into bands of band_km, and every object joins the bands its [perigee,
+    apogee] shell (padded by half the threshold on both sides) touches. Two
+    objects pass orbit_shells_overlap only if they share a band, so the
+    candidate search only pairs objects within the same band.
+
+    Objects that span more than max_bands bands (eccentric orbits) would join
+    too many bands; they are returned separately as wide rows and searched
+    against all objects. Returns the list of band member rows (bands with at
+    least two members) and the wide rows.
+    """
+    low = np.floor((perigee_km - 0.5 * threshold_km) / band_km)
+    high = np.floor((apogee_km + 0.5 * threshold_km) / band_km)
+    wide = ~np.isfinite(low + high) | (high - low >= max_bands)
+
+    narrow = np.flatnonzero(~wide)
+    counts = (high[narrow] - low[narrow]).astype(np.int64) + 1
+    members = np.repeat(narrow, counts)
+    offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    bands = np.repeat(low[narrow].astype(np.int64), counts) + offsets
+
+    order = np.argsort(bands, kind="stable")
+    members, bands = members[order], bands[order]
+    groups = np.split(members, np.flatnonzero(np.diff(bands)) + 1)
+    return [group for group in groups if len(group) > 1], np.flatnonzero(wide)
+
+def _candidate_pairs(positions, search_radius_km, groups, wide):
+    # positions: (N, 3) array of one time step. Failed propagations are NaN
+    # and are left out. Pairs are only searched within the shell groups and
+    # between the wide rows and all objects (see shell_groups).
+    valid = ~np.isnan(positions[:, 0])
+    pairs = []
+    for group in groups:
+        group = group[valid[group]]
+        if len(group) > 1:
+            found = cKDTree(positions[group]).query_pairs(search_radius_km, output_type="ndarray")
+            pairs.append(group[found])
+
+    wide = wide[valid[wide]]
+    if len(wide):
+        others = np.flatnonzero(valid)
+        found = cKDTree(positions[wide]).sparse_distance_matrix(
+            cKDTree(positions[others]), search_radius_km, output_type="ndarray")
+        pairs.append(np.column_stack([wide[found["i"]], others[found["j"]]]))
+
+    pairs = np.sort(np.concatenate(pairs), axis=1) if pairs else np.empty((0, 2), dtype=np.intp)
+    pairs = pairs[pairs[:, 0] != pairs[:, 1]]
+    if len(pairs) == 0:
+        return np.empty((0, 3))
+
+    # Objects in several bands (and wide pairs) are found more than once
+    keys = np.unique(pairs[:, 0].astype(np.int64) * len(positions) + pairs[:, 1])
+    rows = np.column_stack([keys // len(positions), keys % len(positions)])
+    distances = np.linalg.norm(positions[rows[:, 0]] - positions[rows[:, 1]], axis=1)
+    return np.column_stack([rows, distances])
+
+def _merge_runs(runs):
+    """
+    Merges (row_1, row_2, first_step, last_step, best_step, distance) runs:
+    runs of the same pair at consecutive steps form one encounter, which is
+    represented by the step with the smallest sampled distance. A single
+    sample is a run with first_step = last_step = best_step.
+    """
+    order = np.lexsort((runs[:, 2], runs[:, 1], runs[:, 0]))
+    runs = runs[order]
+
+    new_run = np.ones(len(runs), dtype=bool)
+    new_run[1:] = (
+        (runs[1:, 0] != runs[:-1, 0])
+        | (runs[1:, 1] != runs[:-1, 1])
+        | (runs[1:, 2] != runs[:-1, 3] + 1)
+    )
+    starts = np.flatnonzero(new_run)
+    run_id = np.cumsum(new_run) - 1
+
+    # Sort by (run, distance) so that the first entry of each run is its minimum
+    order = np.lexsort((runs[:, 5], run_id))
+    first = np.ones(len(order), dtype=bool)
+    first[1:] = run_id[order][1:] != run_id[order][:-1]
+    best = runs[order[first]]
+
+    return np.column_stack([runs[starts, :3], np.maximum.reduceat(runs[:, 3], starts),
+                            best[:, 4:]])
+
+def _refine_tca(sat_1, sat_2, jd, fr, step_seconds, iterations=5):
+    # Newton-like refinement on the relative motion: under linear relative
+    # motion the closest approach lies at dt = -(dr . dv) / |dv|^2 from the
+    # current estimate. The shift is clamped to one coarse step.
+    offset = 0.0
+    for _ in range(iterations):
+        e1, r1, v1 = sat_1.sgp4(jd, fr + offset / 86400.0)
+        e2, r2, v2 = sat_2.sgp4(jd, fr + offset / 86400.0)
+        if e1 != 0 or e2 != 0:
+            return None
+
+        dr = np.subtract(r2, r1)
+        dv = np.subtract(v2, v1)
+        dv2 = np.dot(dv, dv)
+        if dv2 == 0.0:
+            break
+
+        shift = np.clip(-np.dot(dr, dv) / dv2, -step_seconds, step_seconds)
+        offset = np.clip(offset + shift, -step_seconds, step_seconds)
+        if abs(shift) < 1e-3:
+            break
+
+    e1, r1, v1 = sat_1.sgp4(jd, fr + offset / 86400.0)
+    e2, r2, v2 = sat_2.sgp4(jd, fr + offset / 86400.0)
+    if e1 != 0 or e2 != 0:
+        return None
+
+    miss = float(np.linalg.norm(np.subtract(r2, r1)))
+    speed = float(np.linalg.norm(np.subtract(v2, v1)))
+    return jd + fr + offset / 86400.0, miss, speed
+
+def screen_conjunctions(catalog=None, rows=None, start=None, hours=24.0, step_seconds=20.0,
+                        threshold_km=5.0, block_steps=90, processes=1):
+    """
+    Screens a TLE catalog for close approaches over a time window.
+
+    The catalog is propagated in blocks of block_steps samples. At every
+    sample, KD-trees over the positions yield the pairs closer than the
+    threshold plus the distance an encounter can travel in half a step; only
+    objects whose apogee/perigee shells can overlap are paired (see
+    shell_groups). The samples of each block are merged into encounters
+    right away; encounters still in progress at the block's last sample are
+    carried into the next block, so memory grows with block_steps and not
+    with hours. Each finished encounter is refined with SGP4 to its time of
+    closest approach (TCA). With processes > 1, one worker pool propagates
+    all blocks.
+
+    Returns a structured array (CONJUNCTION_DTYPE) of the encounters with a
+    miss distance below threshold_km, sorted by TCA.
+    """
+    if catalog is None:
+        catalog = get_catalog()
+    if rows is None:
+        rows = np.arange(len(catalog))
+    rows = np.asarray(rows)
+
+    table = catalog.table[rows]
+    perigee_km = np.asarray(table["perigee_km"])
+    apogee_km = np.asarray(table["apogee_km"])
+    tle_pairs = catalog.tle_pairs(rows)
+
+    n_steps = int(round(hours * 3600.0 / step_seconds))
+    jd, fr = time_grid(start=start, n_steps=n_steps, step_minutes=step_seconds / 60.0)
+    search_radius_km = threshold_km + 0.5 * MAX_RELATIVE_SPEED * step_seconds
+    groups, wide = shell_groups(perigee_km, apogee_km, threshold_km)
+
+    satellites = {}
+    conjunctions = []
+
+    def refine(encounters):
+        for row_1, row_2, _, _, step, _ in encounters:
+            row_1, row_2, step = int(row_1), int(row_2), int(step)
+            for row in (row_1, row_2):
+                if row not in satellites:
+                    satellites[row] = catalog.satrec(rows[row])
+
+            result = _refine_tca(satellites[row_1], satellites[row_2], jd[step], fr[step],
+                                 step_seconds)
+            if result is None or result[1] > threshold_km:
+                continue
+
+            tca_jd, miss_km, speed = result
+            conjunctions.append((table["norad_id"][row_1], table["name"][row_1],
+                                 table["norad_id"][row_2], table["name"][row_2],
+                                 tca_jd, miss_km, speed))
+
+    # The pool (and the TLE lines sent to its workers) is shared by all blocks
+    executor = catalog_pool(tle_pairs, processes) if processes is None or processes > 1 else None
+
+    # Runs: (row_1, row_2, first_step, last_step, best_step, distance), see _merge_runs
+    open_runs = np.empty((0, 6))
+    try:
+        for block_start in range(0, n_steps, block_steps):
+            block_end = min(block_start + block_steps, n_steps)
+            _, positions, _ = propagate_catalog(tle_pairs, jd[block_start:block_end],
+                                                fr[block_start:block_end], processes=processes,
+                                                executor=executor)
+
+            runs = [open_runs]
+            for k in range(positions.shape[1]):
+                candidates = _candidate_pairs(positions[:, k], search_radius_km, groups, wide)
+                if len(candidates) == 0:
+                    continue
+
+                rows_1 = candidates[:, 0].astype(np.intp)
+                rows_2 = candidates[:, 1].astype(np.intp)
+                keep = orbit_shells_overlap(perigee_km, apogee_km, rows_1, rows_2, threshold_km)
+                keep &= table["norad_id"][rows_1] != table["norad_id"][rows_2]
+
+                candidates = candidates[keep]
+                steps = np.full((len(candidates), 3), block_start + k)
+                runs.append(np.column_stack([candidates[:, :2], steps, candidates[:, 2]]))
+
+            # Encounters that reach the block's last sample may continue in the next block
+            runs = _merge_runs(np.concatenate(runs))
+            still_open = (runs[:, 3] == block_end - 1) & (block_end < n_steps)
+            refine(runs[~still_open])
+            open_runs = runs[still_open]
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    conjunctions = np.array(conjunctions, dtype=CONJUNCTION_DTYPE)
+    return np.sort(conjunctions, order="tca_jd")
+
+def jd_to_datetime(jd):
+    """Converts a (UTC) Julian date to a timezone-aware datetime."""
+    return datetime.datetime(2000, 1, 1, 12, tzinfo=datetime.UTC) \
+        + datetime.timedelta(days=float(jd) - 2451545.0)
+
+def benchmark_screening(sizes=(500, 1000, 2000, 5000, 10000), hours=1.0, step_seconds=20.0,
+                        threshold_km=5.0):
+    """
+    Times screen_conjunctions on the first n objects of the catalog for every
+    n in sizes. Returns a list of (n, seconds, n_conjunctions) tuples.
+    """
+    catalog = get_catalog()
+    start = datetime.datetime.now(datetime.UTC)
+
+    results = []
+    for size in sizes:
+        size = min(size, len(catalog))
+        t0 = time.perf_counter()
+        conjunctions = screen_conjunctions(catalog, rows=np.arange(size), start=start,
+                                           hours=hours, step_seconds=step_seconds,
+                                           threshold_km=threshold_km)
+        results.append((size, time.perf_counter() - t0, len(conjunctions)))
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Conjunction screening of the TLE catalog")
+    parser.add_argument("--hours", type=float, default=24.0, help="screening window")
+    parser.add_argument("--step", type=float, default=20.0, help="sampling step in seconds")
+    parser.add_argument("--threshold", type=float, default=5.0, help="miss distance in km")
+    parser.add_argument("--processes", type=int, default=1, help="propagation processes")
+    parser.add_argument("--benchmark", action="store_true",
+                        help="time the screening for growing catalog sizes instead")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        print(f"{'objects':>8} {'seconds':>9} {'conjunctions':>13}")
+        for size, seconds, count in benchmark_screening(hours=args.hours, step_seconds=args.step,
+                                                        threshold_km=args.threshold):
+            print(f"{size:>8} {seconds:>9.2f} {count:>13}")
+        return
+
+    conjunctions = screen_conjunctions(hours=args.hours, step_seconds=args.step,
+                                       threshold_km=args.threshold, processes=args.processes)
+    for entry in conjunctions:
+        print(f"{jd_to_datetime(entry['tca_jd']):%Y-%m-%d %H:%M:%S} "
+              f"{entry['name_1']:<24} {entry['name_2']:<24} "
+              f"miss {entry['miss_km']:8.3f} km  v_rel {entry['relative_speed_km_s']:6.3f} km/s")
+
+if __name__ == "__main__":
+    main()
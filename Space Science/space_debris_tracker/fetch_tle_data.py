@@ -1,28 +1,183 @@
 # fetch_tle_data.py
 
+from requests.adapters import HTTPAdapter
 import requests
+import datetime
+import json
 import os
+import sys
+import tempfile
 
-def fetch_tle_data():
+sys.path.insert(1, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "auxiliary"))
+import instrumentation # type: ignore
+
+TLE_URL = "https://celestrak.org/NORAD/elements/gp.php?GROUP=active&FORMAT=tle"
+
+# Conditional-request validators and the result of the last refresh are kept
+# next to the TLE file
+STATE_FILENAME = "tle_state.json"
+
+REQUEST_TIMEOUT = 30
+
+_session = None
+
+def get_session():
+    """
+    Returns the module's shared HTTP session (connection pooling, gzip).
+    """
+    global _session
+    if _session is None:
+        _session = requests.Session()
+        _session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=4))
+        _session.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=4))
+        _session.headers.update({"Accept-Encoding": "gzip, deflate"})
+        instrumentation.instrument_session(_session, "http.celestrak")
+    return _session
+
+def _project_path(filename):
+    # Get the parent folder (space_debris_tracker) no matter where you run from
+    project_folder = os.path.dirname(os.path.abspath(__file__))
+    return os.path.join(project_folder, filename)
+
+def parse_tle_text(text):
+    """
+    Parses three-line element sets into a dict NORAD ID -> (name, line1, line2),
+    keeping the order of the text. The IDs are the stripped catalog number
+    fields (strings), so Alpha-5 numbers such as "A0001" are kept as well.
+    """
+    lines = [line.strip() for line in text.splitlines() if line.strip() != '']
+
+    records = {}
+    for i in range(0, len(lines) - 2, 3):
+        name, line1, line2 = lines[i:i + 3]
+        records[line1[2:7].strip()] = (name, line1, line2)
+    return records
+
+def _catalog_order(norad_id):
+    # Numeric order of catalog number strings: Alpha-5 numbers ("A0001") follow
+    # the five-digit ones, and shorter numbers precede longer ones
+    return len(norad_id), norad_id
+
+def _write_atomic(path, text):
+    # Write into a temporary file in the same folder and swap it in, so that
+    # readers see either the old or the new file, never a partial one
+    folder = os.path.dirname(path)
+    fd, tmp_path = tempfile.mkstemp(dir=folder, prefix=".tmp-", suffix=os.path.basename(path))
+    try:
+        with os.fdopen(fd, "w") as file:
+            file.write(text)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+def read_refresh_state(filename=STATE_FILENAME):
+    """
+    Returns the state of the last refresh (validators, changed and removed
+    NORAD IDs), or an empty dict if there was none.
+    """
+    try:
+        with open(_project_path(filename), "r") as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return {}
+
+def fetch_tle_data(url=TLE_URL, filename="tle_data.txt", session=None):
     """
     Fetches TLE data for active satellites from CelesTrak and saves it in the main project folder.
     """
-    url = "https://celestrak.org/NORAD/elements/gp.php?GROUP=active&FORMAT=tle"
-    response = requests.get(url)
-    
+    session = session or get_session()
+    response = session.get(url, timeout=REQUEST_TIMEOUT)
+
     if response.status_code == 200:
         tle_data = response.text
 
-        # Get the parent folder (space_debris_tracker) no matter where you run from
-        project_folder = os.path.dirname(os.path.abspath(__file__))
-        tle_path = os.path.join(project_folder, "tle_data.txt")
+        tle_path = _project_path(filename)
+        _write_atomic(tle_path, tle_data)
 
-        with open(tle_path, "w") as file:
-            file.write(tle_data)
-        
         print(f"[INFO] TLE data fetched and saved to {tle_path}")
     else:
         print(f"[ERROR] Failed to fetch TLE data. Status code: {response.status_code}")
 
+def refresh_tle_data(url=TLE_URL, filename="tle_data.txt", state_filename=STATE_FILENAME,
+                     session=None):
+    """
+    Incrementally refreshes the local TLE file.
+
+    A conditional request (If-None-Match / If-Modified-Since) is sent with the
+    validators of the previous refresh of the same URL and file; on 304
+    nothing is touched. Otherwise the response is compared per NORAD ID with
+    the local file, which is only rewritten (atomically) if an element set
+    was added, changed or removed.
+
+    Returns a dict with the sorted lists "changed" (new or updated NORAD IDs,
+    as strings) and "removed", which are also stored in the state file, so
+    downstream propagation can redo only those objects. Returns None if the
+    request failed.
+    """
+    session = session or get_session()
+    tle_path = _project_path(filename)
+    state = read_refresh_state(state_filename)
+
+    # Only reuse the validators if they were issued for this URL and file, and
+    # the file they describe is still there
+    headers = {}
+    same_source = state.get("url") == url and state.get("filename", filename) == filename
+    if os.path.isfile(tle_path) and same_source:
+        if state.get("etag"):
+            headers["If-None-Match"] = state["etag"]
+        if state.get("last_modified"):
+            headers["If-Modified-Since"] = state["last_modified"]
+
+    try:
+        response = session.get(url, headers=headers, timeout=REQUEST_TIMEOUT)
+    except requests.RequestException as e:
+        print(f"[ERROR] Failed to fetch TLE data: {e}")
+        return None
+
+    now = datetime.datetime.now(datetime.UTC).isoformat()
+    if response.status_code == 304:
+        state.update({"checked_at": now, "changed": [], "removed": []})
+        _write_atomic(_project_path(state_filename), json.dumps(state, indent=2))
+        print("[INFO] TLE data not modified since the last refresh")
+        return {"changed": [], "removed": []}
+
+    if response.status_code != 200:
+        print(f"[ERROR] Failed to fetch TLE data. Status code: {response.status_code}")
+        return None
+
+    remote = parse_tle_text(response.text)
+    local = {}
+    if os.path.isfile(tle_path):
+        with open(tle_path, "r") as file:
+            local = parse_tle_text(file.read())
+
+    # Element sets are compared by their two data lines; the name alone
+    # changing does not require a new propagation, but is still written
+    changed = sorted((norad_id for norad_id, record in remote.items()
+                      if norad_id not in local or local[norad_id][1:] != record[1:]), key=_catalog_order)
+    removed = sorted(set(local) - set(remote), key=_catalog_order)
+    renamed = any(local[norad_id][0] != record[0]
+                  for norad_id, record in remote.items() if norad_id in local)
+
+    if changed or removed or renamed:
+        text = "".join(f"{name}\n{line1}\n{line2}\n" for name, line1, line2 in remote.values())
+        _write_atomic(tle_path, text)
+
+    state.update({
+        "url": url,
+        "filename": filename,
+        "etag": response.headers.get("ETag"),
+        "last_modified": response.headers.get("Last-Modified"),
+        "checked_at": now,
+        "changed": changed,
+        "removed": removed,
+    })
+    _write_atomic(_project_path(state_filename), json.dumps(state, indent=2))
+
+    print(f"[INFO] TLE refresh: {len(changed)} changed, {len(removed)} removed, "
+          f"{len(remote)} total")
+    return {"changed": changed, "removed": removed}
+
 if __name__ == "__main__":
-    fetch_tle_data()
+    refresh_tle_data()
@@ -0,0 +1,200 @@
+# pass_prediction.py
+
+from predict_orbit import time_grid
+from collections import namedtuple
+import numpy as np
+import datetime
+import os
+import sys
+
+# The event finder lives in the auxiliary folder of the repository
+sys.path.insert(1, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "auxiliary"))
+import events # type: ignore
+
+# WGS84 ellipsoid
+EARTH_RADIUS_KM = 6378.137
+EARTH_FLATTENING = 1.0 / 298.257223563
+AU_KM = 149597870.7
+
+# The sky counts as dark enough to see a satellite below this sun elevation (civil twilight)
+TWILIGHT_DEG = -6.0
+
+Pass = namedtuple("Pass", ["rise", "culmination", "set", "max_elevation_deg", "visible"])
+
+def gmst(jd, fr):
+    """
+    Greenwich mean sidereal time (IAU 1982, as used by SGP4) in radians for
+    UT1 Julian dates split into jd + fr.
+    """
+    t_ut1 = ((np.asarray(jd) - 2451545.0) + np.asarray(fr)) / 36525.0
+    seconds = (-6.2e-6 * t_ut1 ** 3 + 0.093104 * t_ut1 ** 2
+               + (876600.0 * 3600.0 + 8640184.812866) * t_ut1 + 67310.54841)
+    return np.mod(np.radians(seconds / 240.0), 2.0 * np.pi)
+
+def teme_to_ecef(r_teme, jd, fr):
+    """
+    Rotates TEME positions (..., 3) into the Earth-fixed frame (polar motion
+    is neglected).
+    """
+    theta = gmst(jd, fr)
+    cos_t, sin_t = np.cos(theta), np.sin(theta)
+    x, y, z = r_teme[..., 0], r_teme[..., 1], r_teme[..., 2]
+    return np.stack([cos_t * x + sin_t * y, -sin_t * x + cos_t * y, z], axis=-1)
+
+def observer_ecef(lat_deg, lon_deg, alt_km=0.0):
+    """Earth-fixed position (km) of a geodetic location."""
+    lat, lon = np.radians(lat_deg), np.radians(lon_deg)
+    e2 = EARTH_FLATTENING * (2.0 - EARTH_FLATTENING)
+    n = EARTH_RADIUS_KM / np.sqrt(1.0 - e2 * np.sin(lat) ** 2)
+    return np.stack([(n + alt_km) * np.cos(lat) * np.cos(lon),
+                     (n + alt_km) * np.cos(lat) * np.sin(lon),
+                     (n * (1.0 - e2) + alt_km) * np.sin(lat)], axis=-1)
+
+def geodetic_subpoint(r_ecef):
+    """
+    Geodetic latitude and longitude (degrees) and height (km) of Earth-fixed
+    positions (..., 3).
+    """
+    x, y, z = r_ecef[..., 0], r_ecef[..., 1], r_ecef[..., 2]
+    e2 = EARTH_FLATTENING * (2.0 - EARTH_FLATTENING)
+    p = np.hypot(x, y)
+
+    # A few fixed-point iterations converge to well below a millimetre
+    lat = np.arctan2(z, p * (1.0 - e2))
+    for _ in range(4):
+        n = EARTH_RADIUS_KM / np.sqrt(1.0 - e2 * np.sin(lat) ** 2)
+        lat = np.arctan2(z + e2 * n * np.sin(lat), p)
+    n = EARTH_RADIUS_KM / np.sqrt(1.0 - e2 * np.sin(lat) ** 2)
+    return np.degrees(lat), np.degrees(np.arctan2(y, x)), p / np.cos(lat) - n
+
+def elevation_azimuth(r_ecef, lat_deg, lon_deg, alt_km=0.0):
+    """
+    Elevation and azimuth (degrees) and range (km) of Earth-fixed positions
+    (..., 3) as seen by an observer.
+    """
+    lat, lon = np.radians(lat_deg), np.radians(lon_deg)
+    d = r_ecef - observer_ecef(lat_deg, lon_deg, alt_km)
+    dx, dy, dz = d[..., 0], d[..., 1], d[..., 2]
+
+    # East-north-up components
+    east = -np.sin(lon) * dx + np.cos(lon) * dy
+    north = -np.sin(lat) * np.cos(lon) * dx - np.sin(lat) * np.sin(lon) * dy + np.cos(lat) * dz
+    up = np.cos(lat) * np.cos(lon) * dx + np.cos(lat) * np.sin(lon) * dy + np.sin(lat) * dz
+
+    elevation = np.degrees(np.arctan2(up, np.hypot(east, north)))
+    azimuth = np.mod(np.degrees(np.arctan2(east, north)), 360.0)
+    return elevation, azimuth, np.sqrt(dx ** 2 + dy ** 2 + dz ** 2)
+
+def sun_position(jd, fr):
+    """
+    Low-precision geocentric position of the Sun (km, equator and equinox of
+    date, ~0.01 deg), which is close enough to TEME for shadow and twilight
+    checks.
+    """
+    t = ((np.asarray(jd) - 2451545.0) + np.asarray(fr)) / 36525.0
+    mean_long = np.radians(280.460 + 36000.771 * t)
+    mean_anomaly = np.radians(357.5291092 + 35999.05034 * t)
+    ecl_long = mean_long + np.radians(1.914666471 * np.sin(mean_anomaly)
+                                      + 0.019994643 * np.sin(2.0 * mean_anomaly))
+    obliquity = np.radians(23.439291 - 0.0130042 * t)
+    distance = AU_KM * (1.000140612 - 0.016708617 * np.cos(mean_anomaly)
+                        - 0.000139589 * np.cos(2.0 * mean_anomaly))
+    return distance[..., np.newaxis] * np.stack([np.cos(ecl_long),
+                                                 np.cos(obliquity) * np.sin(ecl_long),
+                                                 np.sin(obliquity) * np.sin(ecl_long)], axis=-1)
+
+def is_sunlit(r_teme, r_sun):
+    """
+    True where a satellite is outside of the Earth's (cylindrical) shadow.
+    """
+    sun_dir = r_sun / np.linalg.norm(r_sun, axis=-1, keepdims=True)
+    along = np.sum(r_teme * sun_dir, axis=-1)
+    across = np.linalg.norm(r_teme - along[..., np.newaxis] * sun_dir, axis=-1)
+    return (along > 0.0) | (across > EARTH_RADIUS_KM)
+
+def sun_elevation(jd, fr, lat_deg, lon_deg, alt_km=0.0):
+    """Elevation of the Sun (degrees) for an observer."""
+    sun_ecef = teme_to_ecef(sun_position(jd, fr), jd, fr)
+    return elevation_azimuth(sun_ecef, lat_deg, lon_deg, alt_km)[0]
+
+def jd_to_datetime(jd, fr=0.0):
+    """Converts a (UTC) Julian date to a timezone-aware datetime."""
+    return datetime.datetime(2000, 1, 1, 12, tzinfo=datetime.UTC) \
+        + datetime.timedelta(days=(float(jd) - 2451545.0) + float(fr))
+
+def predict_passes(satellite, lat_deg, lon_deg, alt_km=0.0, start=None, hours=48.0,
+                   min_elevation_deg=10.0, step_seconds=30.0):
+    """
+    Predicts the passes of a satellite over an observer.
+
+    The elevation is sampled every step_seconds with SGP4 over the window;
+    horizon crossings and culminations are refined to well below a second
+    with the event finder of the auxiliary folder. A pass is returned if its
+    culmination reaches min_elevation_deg; it is visible if the satellite is
+    sunlit above min_elevation_deg while the Sun is below TWILIGHT_DEG for
+    the observer.
+
+    Returns a list of Pass tuples (UTC datetimes and degrees). A pass that is
+    already in progress at the start has its rise set to the start.
+    """
+    if start is None:
+        start = datetime.datetime.now(datetime.UTC)
+    (jd0,), (fr0,) = time_grid(start, n_steps=1)
+
+    def epochs(seconds):
+        fr = fr0 + np.asarray(seconds) / 86400.0
+        whole_days = np.floor(fr)
+        return jd0 + whole_days, fr - whole_days
+
+    def elevation(seconds):
+        jd, fr = epochs(seconds)
+        _, r, _ = satellite.sgp4_array(np.atleast_1d(jd), np.atleast_1d(fr))
+        return elevation_azimuth(teme_to_ecef(r, jd, fr), lat_deg, lon_deg, alt_km)[0]
+
+    window = hours * 3600.0
+    crossings, direction = events.find_crossings(elevation, 0.0, window, step_seconds, 0.0)
+    culminations, neg_elevations = events.find_minima(lambda s: -elevation(s), 0.0, window,
+                                                      step_seconds)
+
+    # Pair every rise with the following set
+    rises = list(crossings[direction > 0])
+    sets = list(crossings[direction < 0])
+    if sets and (not rises or sets[0] < rises[0]):
+        rises.insert(0, 0.0)
+    if len(rises) > len(sets):
+        sets.append(window)
+
+    passes = []
+    for rise, set_ in zip(rises, sets):
+        in_pass = (culminations >= rise) & (culminations <= set_)
+        if in_pass.any():
+            culmination = culminations[in_pass][np.argmin(neg_elevations[in_pass])]
+        else:
+            culmination = rise if elevation(rise)[0] > elevation(set_)[0] else set_
+        max_elevation = float(elevation(culmination)[0])
+        if max_elevation < min_elevation_deg:
+            continue
+
+        # Visibility check on a fine grid over the pass
+        samples = np.linspace(rise, set_, max(2, int((set_ - rise) / 10.0) + 1))
+        jd, fr = epochs(samples)
+        _, r, _ = satellite.sgp4_array(jd, fr)
+        el = elevation_azimuth(teme_to_ecef(r, jd, fr), lat_deg, lon_deg, alt_km)[0]
+        visible = bool(np.any((el >= min_elevation_deg)
+                              & is_sunlit(r, sun_position(jd, fr))
+                              & (sun_elevation(jd, fr, lat_deg, lon_deg, alt_km) <= TWILIGHT_DEG)))
+
+        passes.append(Pass(jd_to_datetime(jd0, fr0 + rise / 86400.0),
+                           jd_to_datetime(jd0, fr0 + culmination / 86400.0),
+                           jd_to_datetime(jd0, fr0 + set_ / 86400.0),
+                           max_elevation, visible))
+    return passes
+
+def next_visible_pass(satellite, lat_deg, lon_deg, alt_km=0.0, start=None, hours=72.0,
+                      min_elevation_deg=10.0):
+    """Returns the first visible Pass within the window, or None."""
+    for sat_pass in predict_passes(satellite, lat_deg, lon_deg, alt_km, start, hours,
+                                   min_elevation_deg):
+        if sat_pass.visible:
+            return sat_pass
+    return None
@@ -1,43 +1,134 @@
-from sgp4.api import Satrec, jday
+from sgp4.api import Satrec, SatrecArray
+from concurrent.futures import ProcessPoolExecutor
+from tle_catalog import get_catalog
+import numpy as np
 import datetime
 import os
+import sys
+
+# Time scales and the (opt-in) instrumentation of SGP4 batches live in the auxiliary folder
+sys.path.insert(1, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "auxiliary"))
+import instrumentation # type: ignore
+import time_scales # type: ignore
 
 def read_tle(filename="tle_data.txt", satellite_index=0):
-    current_dir = os.path.dirname(os.path.abspath(__file__))
-    filepath = os.path.join(current_dir, filename)
+    return get_catalog(filename).satrec(satellite_index)
 
-    with open(filepath, "r") as file:
-        lines = file.readlines()
+def read_tle_lines(filename="tle_data.txt"):
+    """
+    Returns every element set of the TLE file as a list of
+    (name, line1, line2) tuples, in file order.
+    """
+    catalog = get_catalog(filename)
+    return [(name,) + pair for name, pair in zip(catalog["name"], catalog.tle_pairs())]
 
-    # Remove blank lines
-    lines = [line.strip() for line in lines if line.strip() != '']
+def time_grid(start=None, n_steps=90, step_minutes=1.0):
+    """
+    Builds a regular grid of n_steps epochs, step_minutes apart from start,
+    as the (jd, fr) array pair expected by SGP4.
 
-    line0 = lines[satellite_index * 3 + 0]
-    line1 = lines[satellite_index * 3 + 1]
-    line2 = lines[satellite_index * 3 + 2]
+    The grid is built in integer microseconds and converted as a whole (see
+    time_scales.jd_grid), so no datetime objects are created per step and the
+    fraction stays in [0, 1) over long grids.
+    """
+    if start is None:
+        start = datetime.datetime.now(datetime.UTC)
 
-    satellite = Satrec.twoline2rv(line1, line2)
-    return satellite
+    return time_scales.jd_grid(start, step_minutes * 60.0, int(n_steps))
 
-def propagate_satellite(satellite, minutes=90):
-    positions = []
-    now = datetime.datetime.now(datetime.UTC)
+# Per-process state of the worker pools created by catalog_pool
+_WORKER = {}
+
+def _propagate_chunk(tle_pairs, jd, fr):
+    # Satrec objects cannot be pickled, so every process parses its own share
+    # of the catalog from the raw TLE lines.
+    satellites = SatrecArray([Satrec.twoline2rv(line1, line2) for line1, line2 in tle_pairs])
+    return _propagate_array(satellites, jd, fr)
+
+def _propagate_array(satellites, jd, fr):
+    e, r, v = satellites.sgp4(jd, fr)
+
+    # SGP4 leaves the last state in place on failure; blank it out
+    failed = e != 0
+    r[failed] = np.nan
+    v[failed] = np.nan
+    return e, r, v
+
+def _init_worker(tle_pairs):
+    _WORKER.update(tle_pairs=tle_pairs, satellites={})
+
+def _propagate_rows(lo, hi, jd, fr):
+    # Worker entry point. The TLE pairs were sent once by the pool initializer;
+    # every chunk is parsed on its first use and kept for the later calls.
+    satellites = _WORKER["satellites"]
+    if (lo, hi) not in satellites:
+        satellites[lo, hi] = SatrecArray([Satrec.twoline2rv(line1, line2)
+                                          for line1, line2 in _WORKER["tle_pairs"][lo:hi]])
+    return _propagate_array(satellites[lo, hi], jd, fr)
+
+def catalog_pool(tle_pairs, processes=None):
+    """
+    Returns a process pool for repeated propagate_catalog calls on the same
+    tle_pairs (e.g. consecutive time blocks). The TLE lines are sent to every
+    worker once, and each worker parses a chunk only on its first use.
+    """
+    return ProcessPoolExecutor(max_workers=processes, initializer=_init_worker,
+                               initargs=(list(tle_pairs),))
 
-    for minute in range(0, minutes):
-        future_time = now + datetime.timedelta(minutes=minute)
+def propagate_catalog(tle_pairs, jd, fr, processes=1, chunk_size=1000, executor=None):
+    """
+    Propagates N satellites over a grid of T epochs in one batch.
 
-        year = future_time.year
-        month = future_time.month
-        day = future_time.day
-        hour = future_time.hour
-        minute_part = future_time.minute
-        second = future_time.second
+    tle_pairs is a sequence of (line1, line2) tuples and jd/fr are the arrays
+    returned by time_grid. Returns the SGP4 error codes as an (N, T) uint8
+    array and positions/velocities (km, km/s, TEME) as contiguous (N, T, 3)
+    float64 arrays. Entries with a non-zero error code are NaN.
 
-        jd, fr = jday(year, month, day, hour, minute_part, second)
-        e, r, v = satellite.sgp4(jd, fr)
+    With processes > 1 the catalog is split into chunks of chunk_size
+    satellites that are propagated in worker processes. A pool created by
+    catalog_pool for the same tle_pairs can be passed as executor instead;
+    it is reused and not shut down here.
+    """
+    jd = np.ascontiguousarray(jd, dtype=np.float64)
+    fr = np.ascontiguousarray(fr, dtype=np.float64)
+    tle_pairs = list(tle_pairs)
 
-        if e == 0:
-            positions.append(r)
+    n_sats, n_times = len(tle_pairs), len(jd)
+    errors = np.empty((n_sats, n_times), dtype=np.uint8)
+    positions = np.empty((n_sats, n_times, 3), dtype=np.float64)
+    velocities = np.empty((n_sats, n_times, 3), dtype=np.float64)
+
+    bounds = [(i, min(i + chunk_size, n_sats)) for i in range(0, n_sats, chunk_size)]
+
+    with instrumentation.span("sgp4.propagate_catalog") as span:
+        if executor is None and processes is not None and processes <= 1:
+            results = (_propagate_chunk(tle_pairs[lo:hi], jd, fr) for lo, hi in bounds)
+            for (lo, hi), (e, r, v) in zip(bounds, results):
+                errors[lo:hi], positions[lo:hi], velocities[lo:hi] = e, r, v
+        else:
+            pool = executor if executor is not None else catalog_pool(tle_pairs, processes)
+            try:
+                futures = [pool.submit(_propagate_rows, lo, hi, jd, fr) for lo, hi in bounds]
+                for (lo, hi), future in zip(bounds, futures):
+                    errors[lo:hi], positions[lo:hi], velocities[lo:hi] = future.result()
+            finally:
+                if executor is None:
+                    pool.shutdown()
+        span.error_codes(errors)
+
+    return errors, positions, velocities
+
+def propagate_satellite(satellite, minutes=90):
+    jd, fr = time_grid(n_steps=minutes)
+    # Failed epochs become None tuples below; their error codes are recorded here
+    with instrumentation.span("sgp4.propagate_satellite") as span:
+        e, r, v = satellite.sgp4_array(jd, fr)
+        span.error_codes(e)
+
+    positions = []
+    for error, position in zip(e, r.tolist()):
+        if error == 0:
+            positions.append(tuple(position))
         else:
             positions.append((None, None, None))
 
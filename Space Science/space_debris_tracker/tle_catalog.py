@@ -0,0 +1,187 @@
+# tle_catalog.py
+
+from sgp4.api import Satrec
+import numpy as np
+import json
+import os
+
+# Row layout of the catalog table. Angles are stored in degrees, the mean
+# motion in revolutions per day (as printed in the TLE) and perigee / apogee as
+# radial distances from the Earth's centre in km.
+CATALOG_DTYPE = np.dtype([
+    ("norad_id", np.int32),
+    ("name", "U24"),
+    ("epoch_jd", np.float64),
+    ("inclination_deg", np.float64),
+    ("raan_deg", np.float64),
+    ("eccentricity", np.float64),
+    ("arg_perigee_deg", np.float64),
+    ("mean_anomaly_deg", np.float64),
+    ("mean_motion_rev_day", np.float64),
+    ("bstar", np.float64),
+    ("perigee_km", np.float64),
+    ("apogee_km", np.float64),
+    ("line1", "S69"),
+    ("line2", "S69"),
+])
+
+# Bump whenever CATALOG_DTYPE changes so that stale caches are rebuilt
+CACHE_VERSION = 1
+
+def _parse_tle_file(filepath):
+    with open(filepath, "r") as file:
+        lines = [line.strip() for line in file if line.strip() != '']
+
+    n_entries = len(lines) // 3
+    table = np.zeros(n_entries, dtype=CATALOG_DTYPE)
+
+    for i in range(n_entries):
+        name, line1, line2 = lines[i * 3:i * 3 + 3]
+        sat = Satrec.twoline2rv(line1, line2)
+
+        table[i] = (
+            sat.satnum,
+            name,
+            sat.jdsatepoch + sat.jdsatepochF,
+            np.degrees(sat.inclo),
+            np.degrees(sat.nodeo),
+            sat.ecco,
+            np.degrees(sat.argpo),
+            np.degrees(sat.mo),
+            sat.no_kozai * 1440.0 / (2.0 * np.pi),
+            sat.bstar,
+            (1.0 + sat.altp) * sat.radiusearthkm,
+            (1.0 + sat.alta) * sat.radiusearthkm,
+            line1,
+            line2,
+        )
+
+    return table
+
+def _cache_paths(filepath):
+    return filepath + ".catalog.npy", filepath + ".catalog.json"
+
+def _source_key(filepath):
+    stat = os.stat(filepath)
+    return {"version": CACHE_VERSION, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+def _load_cache(filepath):
+    table_path, key_path = _cache_paths(filepath)
+    try:
+        with open(key_path, "r") as file:
+            key = json.load(file)
+        if key != _source_key(filepath):
+            return None
+        return np.load(table_path, mmap_mode="r")
+    except (OSError, ValueError):
+        return None
+
+def _write_cache(filepath, table):
+    table_path, key_path = _cache_paths(filepath)
+
+    # Write to temporary files first so a reader never sees half a cache
+    with open(table_path + ".tmp", "wb") as file:
+        np.save(file, table)
+    os.replace(table_path + ".tmp", table_path)
+
+    with open(key_path + ".tmp", "w") as file:
+        json.dump(_source_key(filepath), file)
+    os.replace(key_path + ".tmp", key_path)
+
+class TLECatalog:
+    """
+    Parsed TLE catalog backed by a NumPy structured array (see CATALOG_DTYPE).
+
+    Rows keep the file order, so row i is the satellite that read_tle used to
+    address with satellite_index=i. Lookups by NORAD ID and name go through
+    hash indexes that are built on first use.
+    """
+
+    def __init__(self, table):
+        self.table = table
+        self._norad_index = None
+        self._name_index = None
+
+    @classmethod
+    def load(cls, filename="tle_data.txt", use_cache=True):
+        """
+        Loads the catalog of a TLE file (relative to this folder).
+
+        The parsed table is cached next to the file as a memory-mappable .npy
+        and is only re-parsed when the size or modification time of the TLE
+        file changes.
+        """
+        current_dir = os.path.dirname(os.path.abspath(__file__))
+        filepath = os.path.join(current_dir, filename)
+
+        table = _load_cache(filepath) if use_cache else None
+        if table is None:
+            table = _parse_tle_file(filepath)
+            if use_cache:
+                _write_cache(filepath, table)
+
+        return cls(table)
+
+    def __len__(self):
+        return len(self.table)
+
+    def __getitem__(self, column):
+        return self.table[column]
+
+    def index_of(self, norad_id):
+        """Returns the row of a NORAD ID. Raises KeyError if it is unknown."""
+        if self._norad_index is None:
+            self._norad_index = {int(norad_id): row
+                                 for row, norad_id in enumerate(self.table["norad_id"])}
+        return self._norad_index[int(norad_id)]
+
+    def index_of_name(self, name):
+        """
+        Returns the row of a satellite name (case-insensitive). If a name occurs
+        more than once, the first entry wins. Raises KeyError if it is unknown.
+        """
+        if self._name_index is None:
+            self._name_index = {}
+            for row, entry in enumerate(self.table["name"]):
+                self._name_index.setdefault(entry.upper(), row)
+        return self._name_index[name.strip().upper()]
+
+    def lines(self, row):
+        """Returns the (line1, line2) pair of a row."""
+        entry = self.table[row]
+        return entry["line1"].decode("ascii"), entry["line2"].decode("ascii")
+
+    def satrec(self, row):
+        """Returns an initialised Satrec for a row."""
+        return Satrec.twoline2rv(*self.lines(row))
+
+    def tle_pairs(self, rows=None):
+        """
+        Returns the (line1, line2) pairs of the given rows (default: all), ready
+        for predict_orbit.propagate_catalog.
+        """
+        if rows is None:
+            rows = range(len(self.table))
+        line1 = self.table["line1"]
+        line2 = self.table["line2"]
+        return [(line1[row].decode("ascii"), line2[row].decode("ascii")) for row in rows]
+
+# Catalogs already loaded in this process, keyed by file path
+_loaded_catalogs = {}
+
+def get_catalog(filename="tle_data.txt"):
+    """
+    Returns the catalog of a TLE file, loading it once per process. A changed
+    file on disk is picked up on the next call.
+    """
+    current_dir = os.path.dirname(os.path.abspath(__file__))
+    filepath = os.path.join(current_dir, filename)
+
+    key = _source_key(filepath)
+    cached = _loaded_catalogs.get(filepath)
+    if cached is not None and cached[0] == key:
+        return cached[1]
+
+    catalog = TLECatalog.load(filename)
+    _loaded_catalogs[filepath] = (key, catalog)
+    return catalog